@@ -3,4 +3,8 @@ from django.apps import AppConfig
 class InventarioConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.inventario'
-    verbose_name = 'Inventario'
\ No newline at end of file
+    verbose_name = 'Inventario'
+
+    def ready(self):
+        # Sincroniza el índice de búsqueda de productos al guardar/eliminar
+        from . import busqueda  # noqa: F401
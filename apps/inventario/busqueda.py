@@ -0,0 +1,194 @@
+# apps/inventario/busqueda.py
+
+import re
+import threading
+import time
+import unicodedata
+
+from django.db import connection
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from .models import Producto
+
+
+LIMITE_RESULTADOS = 20
+LIMITE_MAXIMO = 50
+
+TABLA_FTS = 'productos_fts'
+
+
+def normalizar(texto):
+    """Minúsculas y sin acentos: 'Pastillas Freno Hónda' → 'pastillas freno honda'"""
+    texto = unicodedata.normalize('NFKD', texto or '')
+    return ''.join(c for c in texto if not unicodedata.combining(c)).lower()
+
+
+def _terminos(texto):
+    return re.findall(r'\w+', normalizar(texto))
+
+
+# ======================================================
+#  ÍNDICE FTS5 (SQLite)
+# ======================================================
+
+_fts_disponible = None
+
+
+def fts_disponible():
+    """True si la base es SQLite y existe la tabla virtual FTS5 (migración 0003)"""
+    global _fts_disponible
+    if _fts_disponible is None:
+        if connection.vendor != 'sqlite':
+            _fts_disponible = False
+        else:
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = %s", [TABLA_FTS]
+                )
+                _fts_disponible = cursor.fetchone() is not None
+    return _fts_disponible
+
+
+def _buscar_fts(terminos, limite):
+    # Cada término como prefijo entre comillas ("pastilla"* "freno"*) → AND implícito
+    consulta = ' '.join(f'"{termino}"*' for termino in terminos)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"SELECT rowid FROM {TABLA_FTS} WHERE {TABLA_FTS} MATCH %s "
+            f"ORDER BY bm25({TABLA_FTS}, 2.0, 1.0) LIMIT %s",
+            [consulta, limite]
+        )
+        return [fila[0] for fila in cursor.fetchall()]
+
+
+def _actualizar_fts(producto):
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {TABLA_FTS} WHERE rowid = %s", [producto.pk])
+        if producto.estado == 1:
+            cursor.execute(
+                f"INSERT INTO {TABLA_FTS} (rowid, codigo, descripcion) VALUES (%s, %s, %s)",
+                [producto.pk, str(producto.codigo), producto.descripcion or '']
+            )
+
+
+def _eliminar_fts(producto_id):
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {TABLA_FTS} WHERE rowid = %s", [producto_id])
+
+
+# ======================================================
+#  ÍNDICE EN MEMORIA (otras bases o SQLite sin FTS5)
+# ======================================================
+
+class _IndiceMemoria:
+    """
+    Índice de palabras por producto, construido una vez por proceso y
+    marcado como viejo cuando se guarda/elimina un producto (o tras `ttl`
+    segundos, por los cambios hechos desde otros procesos).
+    """
+
+    def __init__(self, ttl=300):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entradas = None
+        self._construido = 0
+
+    def invalidar(self):
+        with self._lock:
+            self._entradas = None
+
+    def _cargar(self):
+        with self._lock:
+            if self._entradas is None or time.monotonic() - self._construido > self.ttl:
+                self._entradas = [
+                    (producto_id, str(codigo), tuple(_terminos(descripcion)))
+                    for producto_id, codigo, descripcion in
+                    Producto.objects.filter(estado=1).values_list('id', 'codigo', 'descripcion').iterator()
+                ]
+                self._construido = time.monotonic()
+            return self._entradas
+
+    def buscar(self, terminos, limite):
+        resultados = []
+        for producto_id, codigo, palabras in self._cargar():
+            puntaje = 0
+            for termino in terminos:
+                if codigo.startswith(termino):
+                    puntaje += 3
+                elif termino in palabras:
+                    puntaje += 2
+                elif any(palabra.startswith(termino) for palabra in palabras):
+                    puntaje += 1
+                else:
+                    puntaje = 0
+                    break
+            if puntaje:
+                resultados.append((-puntaje, producto_id))
+
+        resultados.sort()
+        return [producto_id for _, producto_id in resultados[:limite]]
+
+
+_indice_memoria = _IndiceMemoria()
+
+
+# ======================================================
+#  API
+# ======================================================
+
+def buscar_productos(texto, limite=LIMITE_RESULTADOS, solo_con_stock=False):
+    """
+    Búsqueda para el autocompletado del POS. Orden de los resultados:
+      1. Código exacto (lectura con escáner de código de barras).
+      2. Coincidencias por prefijo en código/descripción, ordenadas por
+         relevancia (bm25 en FTS5, puntaje simple en el índice en memoria).
+    """
+    limite = max(1, min(int(limite), LIMITE_MAXIMO))
+    terminos = _terminos(texto)
+    if not terminos:
+        return []
+
+    productos = Producto.objects.filter(estado=1).select_related('categoria')
+    if solo_con_stock:
+        productos = productos.filter(stock__gt=0)
+
+    ids = []
+    texto = texto.strip()
+    if texto.isascii() and texto.isdigit():  # '²'.isdigit() también es True
+        exacto = productos.filter(codigo=int(texto)).values_list('id', flat=True).first()
+        if exacto:
+            ids.append(exacto)
+
+    # Se piden candidatos de más para descontar los que no tienen stock
+    candidatos = limite * 3 if solo_con_stock else limite
+    if fts_disponible():
+        ids += _buscar_fts(terminos, candidatos)
+    else:
+        ids += _indice_memoria.buscar(terminos, candidatos)
+
+    encontrados = productos.in_bulk(ids)
+    resultado = []
+    for producto_id in dict.fromkeys(ids):
+        if producto_id in encontrados:
+            resultado.append(encontrados[producto_id])
+            if len(resultado) == limite:
+                break
+
+    return resultado
+
+
+@receiver(post_save, sender=Producto)
+def _producto_guardado(sender, instance, **kwargs):
+    if fts_disponible():
+        _actualizar_fts(instance)
+    else:
+        _indice_memoria.invalidar()
+
+
+@receiver(post_delete, sender=Producto)
+def _producto_eliminado(sender, instance, **kwargs):
+    if fts_disponible():
+        _eliminar_fts(instance.pk)
+    else:
+        _indice_memoria.invalidar()
@@ -0,0 +1,125 @@
+# apps/inventario/catalogo.py
+
+import base64
+import json
+
+from django.db.models import F, Q
+
+from .models import Producto
+
+
+TAMANO_PAGINA = 50
+TAMANO_PAGINA_MAXIMO = 200
+
+# Orden → columnas del cursor (la última siempre es única)
+ORDENES = {
+    'descripcion': ('descripcion', 'id'),
+    'codigo': ('codigo',),
+}
+
+
+def filtrar_productos(params):
+    """Aplica los filtros del listado (texto, categoría, proveedor y nivel de stock)"""
+    productos = Producto.objects.filter(estado=1)
+
+    # Todas las palabras en la descripción, o el código exacto si son solo dígitos
+    texto = (params.get('q') or '').strip()
+    if texto:
+        condicion = Q()
+        for palabra in texto.split():
+            condicion &= Q(descripcion__icontains=palabra)
+        if texto.isascii() and texto.isdigit():
+            condicion |= Q(codigo=int(texto))
+        productos = productos.filter(condicion)
+
+    categoria_id = params.get('categoria')
+    if categoria_id:
+        productos = productos.filter(categoria_id=categoria_id)
+
+    proveedor_id = params.get('proveedor')
+    if proveedor_id:
+        productos = productos.filter(proveedor_id=proveedor_id)
+
+    # Mismo criterio que Producto.nivel_stock
+    nivel_stock = params.get('nivel_stock')
+    if nivel_stock == 'bajo':
+        productos = productos.filter(stock__lte=F('stock_minimo'))
+    elif nivel_stock == 'medio':
+        productos = productos.filter(stock__gt=F('stock_minimo'), stock__lte=F('stock_minimo') * 3)
+    elif nivel_stock == 'alto':
+        productos = productos.filter(stock__gt=F('stock_minimo') * 3)
+
+    return productos
+
+
+def codificar_cursor(valores):
+    return base64.urlsafe_b64encode(json.dumps(valores).encode()).decode()
+
+
+def decodificar_cursor(cursor, orden):
+    """
+    Valores del cursor: una lista con las columnas de ORDENES[orden], la
+    última un id o código entero y la descripción texto o NULL.
+    Lanza ValueError si el cursor no tiene esa forma (lo arma el cliente).
+    """
+    try:
+        valores = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        *anteriores, clave = valores
+    except (ValueError, TypeError):
+        raise ValueError('Cursor de paginación inválido')
+
+    if (
+        not isinstance(valores, list)
+        or len(valores) != len(ORDENES[orden])
+        or not isinstance(clave, int) or isinstance(clave, bool)
+        or any(valor is not None and not isinstance(valor, str) for valor in anteriores)
+    ):
+        raise ValueError('Cursor de paginación inválido')
+    return valores
+
+
+def _despues_de(orden, valores):
+    """Condición keyset: filas posteriores a `valores` según el orden"""
+    if orden == 'codigo':
+        return Q(codigo__gt=valores[0])
+
+    descripcion, producto_id = valores
+    # Las descripciones NULL van primero (NULLS FIRST)
+    if descripcion is None:
+        return Q(descripcion__isnull=True, id__gt=producto_id) | Q(descripcion__isnull=False)
+    # El primer término (descripcion >= x) le da al índice el punto de inicio del rango
+    return Q(descripcion__gte=descripcion) & (
+        Q(descripcion__gt=descripcion) | Q(descripcion=descripcion, id__gt=producto_id)
+    )
+
+
+def pagina_productos(productos, orden='descripcion', cursor=None, limite=TAMANO_PAGINA):
+    """
+    Paginación por clave (seek): en lugar de OFFSET filtra desde la última fila
+    vista, así el costo de cada página es el mismo sin importar la profundidad.
+
+    Devuelve (lista_de_productos, cursor_siguiente o None).
+    """
+    if orden not in ORDENES:
+        raise ValueError(f'Orden inválido: {orden}')
+
+    limite = max(1, min(int(limite), TAMANO_PAGINA_MAXIMO))
+    columnas = ORDENES[orden]
+
+    if cursor:
+        productos = productos.filter(_despues_de(orden, decodificar_cursor(cursor, orden)))
+
+    if orden == 'descripcion':
+        productos = productos.order_by(F('descripcion').asc(nulls_first=True), 'id')
+    else:
+        productos = productos.order_by('codigo')
+
+    pagina = list(productos.select_related('categoria', 'proveedor')[:limite + 1])
+
+    siguiente = None
+    if len(pagina) > limite:
+        pagina = pagina[:limite]
+        ultimo = pagina[-1]
+        siguiente = codificar_cursor([getattr(ultimo, columna) for columna in columnas])
+
+    return pagina, siguiente
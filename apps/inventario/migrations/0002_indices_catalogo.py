@@ -0,0 +1,21 @@
+# Generated by Django 5.2.18 on 2026-10-17 18:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventario', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='producto',
+            index=models.Index(fields=['estado', 'descripcion', 'id'], name='productos_estado_desc_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='producto',
+            index=models.Index(fields=['estado', 'codigo'], name='productos_estado_codigo_idx'),
+        ),
+    ]
@@ -0,0 +1,40 @@
+from django.db import migrations, transaction
+from django.db.utils import OperationalError
+
+
+def crear_indice_fts(apps, schema_editor):
+    """Tabla virtual FTS5 con el código y la descripción de los productos activos (sólo SQLite)"""
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+
+    with schema_editor.connection.cursor() as cursor:
+        try:
+            with transaction.atomic(using=schema_editor.connection.alias):
+                cursor.execute(
+                    "CREATE VIRTUAL TABLE IF NOT EXISTS productos_fts USING fts5("
+                    "codigo, descripcion, tokenize = 'unicode61 remove_diacritics 2')"
+                )
+        except OperationalError:
+            # SQLite compilado sin FTS5: se usa el índice en memoria de apps.inventario.busqueda
+            return
+
+        cursor.execute(
+            "INSERT INTO productos_fts (rowid, codigo, descripcion) "
+            "SELECT id, CAST(codigo AS TEXT), COALESCE(descripcion, '') FROM productos WHERE estado = 1"
+        )
+
+
+def eliminar_indice_fts(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        schema_editor.execute("DROP TABLE IF EXISTS productos_fts")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventario', '0002_indices_catalogo'),
+    ]
+
+    operations = [
+        migrations.RunPython(crear_indice_fts, eliminar_indice_fts),
+    ]
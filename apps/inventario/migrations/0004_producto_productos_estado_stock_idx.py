@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-17 19:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventario', '0003_productos_fts'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='producto',
+            index=models.Index(fields=['estado', 'stock'], name='productos_estado_stock_idx'),
+        ),
+    ]
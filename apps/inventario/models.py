@@ -57,6 +57,13 @@ class Producto(models.Model):
         db_table = 'productos'
         verbose_name = 'Producto'
         verbose_name_plural = 'Productos'
+        indexes = [
+            # Paginación por clave del catálogo (ver catalogo.py)
+            models.Index(fields=['estado', 'descripcion', 'id'], name='productos_estado_desc_idx'),
+            models.Index(fields=['estado', 'codigo'], name='productos_estado_codigo_idx'),
+            # Alertas de stock (sin stock / por debajo del mínimo)
+            models.Index(fields=['estado', 'stock'], name='productos_estado_stock_idx'),
+        ]
 
     def __str__(self):
         return f"{self.codigo} - {self.descripcion}"
@@ -0,0 +1,76 @@
+# apps/inventario/tests.py
+
+import base64
+import json
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.test import TestCase
+from django.urls import reverse
+
+from .catalogo import codificar_cursor
+from .models import Producto
+
+
+class CursorCatalogoTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = User.objects.create_user('vendedor')
+        Producto.objects.bulk_create([
+            Producto(
+                codigo=codigo, descripcion=f'Producto {codigo}',
+                precio_costo=Decimal('100.00'), precio_venta=Decimal('150.00'),
+            )
+            for codigo in range(1, 4)
+        ])
+
+    def setUp(self):
+        self.client.force_login(self.usuario)
+
+    def pagina(self, **parametros):
+        return self.client.get(reverse('lista_productos_json'), {'limite': 2, **parametros})
+
+    def test_cursor_siguiente(self):
+        primera = self.pagina().json()
+        segunda = self.pagina(cursor=primera['siguiente'])
+
+        self.assertEqual(segunda.status_code, 200)
+        self.assertEqual([producto['codigo'] for producto in segunda.json()['productos']], [3])
+
+    def test_cursores_invalidos(self):
+        crudos = ['no-es-base64!', base64.urlsafe_b64encode(b'{no json').decode()]
+        formas = [{'a': 1}, 5, [], ['Producto 1'], ['Producto 1', 1, 2], ['Producto 1', 'x'], [{'a': 1}, 1]]
+        for cursor in crudos + [codificar_cursor(valores) for valores in formas]:
+            with self.subTest(cursor=cursor):
+                self.assertEqual(self.pagina(cursor=cursor).status_code, 400)
+
+    def test_busqueda_en_el_servidor(self):
+        Producto.objects.filter(codigo=3).update(descripcion='Casco integral')
+        codigos = lambda datos: [producto['codigo'] for producto in datos['productos']]
+
+        self.assertEqual(codigos(self.pagina(q='casco').json()), [3])
+        self.assertEqual(codigos(self.pagina(q='producto 2').json()), [2])
+        self.assertEqual(codigos(self.pagina(q='1').json()), [1])
+        # La búsqueda se aplica también a las páginas siguientes
+        primera = self.pagina(q='producto', limite=1).json()
+        self.assertEqual(codigos(self.pagina(q='producto', limite=1, cursor=primera['siguiente']).json()), [2])
+
+    def test_cursor_de_otro_orden(self):
+        cursor = codificar_cursor(['Producto 1', 1])
+        self.assertEqual(self.pagina(orden='codigo', cursor=cursor).status_code, 400)
+
+
+class BuscarProductosTest(TestCase):
+
+    def test_digitos_unicode_no_son_un_codigo(self):
+        Producto.objects.create(
+            codigo=2, descripcion='Casco', precio_costo=Decimal('100.00'), precio_venta=Decimal('150.00')
+        )
+        self.client.force_login(User.objects.create_user('vendedor'))
+
+        for texto in ('²', '٣', '2'):
+            with self.subTest(texto=texto):
+                respuesta = self.client.get(reverse('buscar_productos_json'), {'q': texto})
+                self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual(respuesta.json()['productos'][0]['codigo'], 2)
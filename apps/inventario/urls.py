@@ -6,6 +6,8 @@ from . import views
 urlpatterns = [
     # Productos
     path('productos/', views.lista_productos, name='lista_productos'),
+    path('productos/json/', views.lista_productos_json, name='lista_productos_json'),
+    path('productos/buscar/', views.buscar_productos_json, name='buscar_productos_json'),
     path('productos/crear/', views.crear_producto, name='crear_producto'),
     path('productos/editar/<int:pk>/', views.editar_producto, name='editar_producto'),
     path('productos/eliminar/<int:pk>/', views.eliminar_producto, name='eliminar_producto'),
@@ -4,33 +4,109 @@ from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from django.http import JsonResponse
+from django.template.loader import render_to_string
 from django.db import models  # ← IMPORTACIÓN AGREGADA
 from .models import Producto, Categoria, Proveedor
 from .forms import ProductoForm, CategoriaForm, ProveedorForm
+from .catalogo import filtrar_productos, pagina_productos, TAMANO_PAGINA
+from .busqueda import buscar_productos, LIMITE_RESULTADOS
+from apps.ventas.secuencias import siguiente_codigo, asegurar_minimo, consultar_siguiente
 
 @login_required
 def lista_productos(request):
-    productos = Producto.objects.filter(estado=1).select_related('categoria', 'proveedor')
+    """Primera página del catálogo; las siguientes se piden a lista_productos_json"""
+    try:
+        productos, siguiente = pagina_productos(
+            filtrar_productos(request.GET),
+            orden=request.GET.get('orden', 'descripcion')
+        )
+    except ValueError as e:
+        messages.error(request, str(e))
+        productos, siguiente = pagina_productos(filtrar_productos({}))
     
-    # Calcular estadísticas
-    productos_stock_bajo = productos.filter(stock__lte=models.F('stock_minimo')).count()
+    # Calcular estadísticas en una sola consulta
+    estadisticas = Producto.objects.filter(estado=1).aggregate(
+        total=models.Count('id'),
+        stock_bajo=models.Count('id', filter=models.Q(stock__lte=models.F('stock_minimo')))
+    )
     
     context = {
         'productos': productos,
-        'productos_stock_bajo': productos_stock_bajo,
+        'siguiente_cursor': siguiente,
+        'total_productos': estadisticas['total'],
+        'productos_stock_bajo': estadisticas['stock_bajo'],
+        'categorias': Categoria.objects.filter(estado=1).order_by('nombre'),
+        'proveedores': Proveedor.objects.filter(estado=1).order_by('razon_social'),
+        'filtros': request.GET,
     }
     return render(request, 'inventario/lista_productos.html', context)
 
+@login_required
+def lista_productos_json(request):
+    """API paginada del catálogo (keyset) para el scroll infinito del listado"""
+    try:
+        productos, siguiente = pagina_productos(
+            filtrar_productos(request.GET),
+            orden=request.GET.get('orden', 'descripcion'),
+            cursor=request.GET.get('cursor'),
+            limite=request.GET.get('limite', TAMANO_PAGINA)
+        )
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    
+    data = [{
+        'id': producto.id,
+        'codigo': producto.codigo,
+        'descripcion': producto.descripcion,
+        'precio_costo': str(producto.precio_costo),
+        'precio_venta': str(producto.precio_venta),
+        'stock': producto.stock,
+        'stock_minimo': producto.stock_minimo,
+        'categoria_id': producto.categoria_id,
+        'proveedor_id': producto.proveedor_id,
+        'nivel_stock': producto.nivel_stock,
+    } for producto in productos]
+    
+    html = render_to_string('inventario/_filas_productos.html', {'productos': productos}, request=request)
+    
+    return JsonResponse({'productos': data, 'html': html, 'siguiente': siguiente})
+
+@login_required
+def buscar_productos_json(request):
+    """Autocompletado de productos para el POS (por código o descripción)"""
+    try:
+        productos = buscar_productos(
+            request.GET.get('q', ''),
+            limite=request.GET.get('limite', LIMITE_RESULTADOS),
+            solo_con_stock=request.GET.get('con_stock') == '1'
+        )
+    except ValueError:
+        return JsonResponse({'error': 'Límite inválido'}, status=400)
+    
+    data = [{
+        'id': producto.id,
+        'codigo': producto.codigo,
+        'descripcion': producto.descripcion,
+        'precio_venta': str(producto.precio_venta),
+        'stock': producto.stock,
+        'categoria': producto.categoria.nombre if producto.categoria else None,
+    } for producto in productos]
+    
+    return JsonResponse({'productos': data})
+
 @login_required
 def crear_producto(request):
     if request.method == 'POST':
         # Generar código automático si no viene
         codigo = request.POST.get('codigo')
-        if not codigo:
-            ultimo_producto = Producto.objects.order_by('-codigo').first()
-            codigo = (ultimo_producto.codigo + 1) if ultimo_producto else 1000
         
         try:
+            if not codigo:
+                codigo = siguiente_codigo('producto')
+            else:
+                # Código manual: adelantar la secuencia para no repetirlo después
+                asegurar_minimo('producto', codigo)
+            
             producto = Producto.objects.create(
                 codigo=codigo,
                 descripcion=request.POST.get('descripcion'),
@@ -72,6 +148,7 @@ def editar_producto(request, pk):
             producto.proveedor_id = proveedor_id if proveedor_id else None
             
             producto.save()
+            asegurar_minimo('producto', producto.codigo)
             
             messages.success(request, f'Producto #{producto.codigo} actualizado exitosamente.')
             return redirect('lista_productos')
@@ -119,10 +196,8 @@ def detalle_producto_json(request, pk):
 
 @login_required
 def obtener_siguiente_codigo(request):
-    """API endpoint para obtener el siguiente código disponible"""
-    ultimo_producto = Producto.objects.order_by('-codigo').first()
-    siguiente_codigo = (ultimo_producto.codigo + 1) if ultimo_producto else 1000
-    return JsonResponse({'codigo': siguiente_codigo})
+    """API endpoint para obtener el siguiente código disponible (sin reservarlo)"""
+    return JsonResponse({'codigo': consultar_siguiente('producto')})
 
 # === VISTAS PARA CATEGORÍAS ===
 
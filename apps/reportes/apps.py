@@ -3,4 +3,8 @@ from django.apps import AppConfig
 class ReportesConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.reportes'
-    verbose_name = 'Reportes'
\ No newline at end of file
+    verbose_name = 'Reportes'
+
+    def ready(self):
+        # Invalida la caché de métricas del dashboard ante ventas y cambios de stock
+        from . import metricas  # noqa: F401
@@ -0,0 +1,179 @@
+# apps/reportes/diagnostico.py
+"""
+Perfil de consultas por pedido (opcional, para producción con muestreo).
+
+Con DIAGNOSTICO_MUESTREO > 0, PerfilConsultasMiddleware mide esa fracción
+de los pedidos: cantidad de consultas, tiempo en la base, consultas que se
+repiten con la misma forma (típico N+1) y la línea del proyecto que las
+origina. Agrega el encabezado Server-Timing y acumula por endpoint en la
+caché; ver /diagnostico/queries/. Con 0 el middleware ni se carga.
+
+Las consultas de respuestas en streaming que ocurren después de la vista no
+se cuentan.
+"""
+
+import inspect
+import random
+import re
+import time
+from contextlib import ExitStack
+from pathlib import Path
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+
+CLAVE_CACHE = 'diagnostico:consultas'
+MAXIMO_ENDPOINTS = 200
+MAXIMO_REPETIDAS = 5
+
+# IN (%s, %s, ...) con distinta cantidad de valores es la misma consulta
+_LISTA_IN = re.compile(r'IN \((?:%s, )*%s\)')
+
+
+def huella(sql):
+    """Forma de la consulta: el SQL sin parámetros (Django ya los separa) y con las listas IN colapsadas"""
+    return _LISTA_IN.sub('IN (...)', sql)
+
+
+def _origen(raiz):
+    """Primera línea del proyecto (apps/) en la pila: la vista o función que disparó la consulta"""
+    marco = inspect.currentframe()
+    while marco is not None:
+        archivo = marco.f_code.co_filename
+        if archivo.startswith(raiz) and archivo != __file__:
+            relativo = Path(archivo).relative_to(Path(raiz).parent)
+            return f'{relativo}:{marco.f_lineno} ({marco.f_code.co_name})'
+        marco = marco.f_back
+    return ''
+
+
+class _Medicion:
+    """execute_wrapper que cuenta y cronometra las consultas de un pedido"""
+
+    def __init__(self, raiz):
+        self.raiz = raiz
+        self.cantidad = 0
+        self.segundos = 0.0
+        self.huellas = {}  # huella → [veces, segundos, origen]
+
+    def __call__(self, execute, sql, params, many, context):
+        inicio = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duracion = time.perf_counter() - inicio
+            self.cantidad += 1
+            self.segundos += duracion
+
+            clave = huella(sql)
+            datos = self.huellas.get(clave)
+            if datos is None:
+                self.huellas[clave] = [1, duracion, '']
+            else:
+                datos[0] += 1
+                datos[1] += duracion
+                # La pila se recorre sólo al repetirse, y una sola vez
+                if not datos[2]:
+                    datos[2] = _origen(self.raiz)
+
+    def repetidas(self):
+        filas = [
+            {'sql': clave[:500], 'veces': veces, 'ms': round(segundos * 1000, 1), 'origen': origen}
+            for clave, (veces, segundos, origen) in self.huellas.items()
+            if veces > 1
+        ]
+        filas.sort(key=lambda fila: fila['veces'], reverse=True)
+        return filas[:MAXIMO_REPETIDAS]
+
+
+def registrar(endpoint, ruta, segundos, medicion):
+    """Acumula la medición de un pedido en las estadísticas de su endpoint"""
+    datos = cache.get(CLAVE_CACHE) or {}
+    fila = datos.get(endpoint) or {
+        'endpoint': endpoint, 'pedidos': 0, 'segundos': 0.0, 'segundos_max': 0.0,
+        'db_segundos': 0.0, 'consultas': 0, 'consultas_max': 0, 'peor': None,
+    }
+    fila['pedidos'] += 1
+    fila['segundos'] += segundos
+    fila['db_segundos'] += medicion.segundos
+    fila['consultas'] += medicion.cantidad
+    fila['consultas_max'] = max(fila['consultas_max'], medicion.cantidad)
+
+    # Del pedido más lento se guarda el detalle
+    if segundos >= fila['segundos_max']:
+        fila['segundos_max'] = segundos
+        fila['peor'] = {
+            'ruta': ruta,
+            'ms': round(segundos * 1000, 1),
+            'consultas': medicion.cantidad,
+            'db_ms': round(medicion.segundos * 1000, 1),
+            'repetidas': medicion.repetidas(),
+        }
+    datos[endpoint] = fila
+
+    if len(datos) > MAXIMO_ENDPOINTS:
+        menos_pedidos = min(datos, key=lambda clave: datos[clave]['pedidos'])
+        del datos[menos_pedidos]
+
+    cache.set(CLAVE_CACHE, datos, getattr(settings, 'DIAGNOSTICO_RETENCION_HORAS', 24) * 3600)
+
+
+def endpoints_mas_lentos(cantidad=50):
+    """Endpoints medidos, del de mayor tiempo promedio al de menor"""
+    filas = []
+    for fila in (cache.get(CLAVE_CACHE) or {}).values():
+        pedidos = fila['pedidos']
+        filas.append({
+            **fila,
+            'ms_promedio': fila['segundos'] * 1000 / pedidos,
+            'ms_max': fila['segundos_max'] * 1000,
+            'db_ms_promedio': fila['db_segundos'] * 1000 / pedidos,
+            'consultas_promedio': fila['consultas'] / pedidos,
+        })
+    filas.sort(key=lambda fila: fila['ms_promedio'], reverse=True)
+    return filas[:cantidad]
+
+
+def limpiar():
+    cache.delete(CLAVE_CACHE)
+
+
+def _endpoint(request):
+    coincidencia = getattr(request, 'resolver_match', None)
+    return f"{request.method} /{coincidencia.route if coincidencia else '(sin ruta)'}"
+
+
+class PerfilConsultasMiddleware:
+    """
+    Mide las consultas de una fracción (DIAGNOSTICO_MUESTREO) de los pedidos.
+    Va primero en MIDDLEWARE para contar también las de sesión y usuario.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.muestreo = getattr(settings, 'DIAGNOSTICO_MUESTREO', 0)
+        if not self.muestreo:
+            raise MiddlewareNotUsed
+        self.raiz = str(Path(settings.BASE_DIR) / 'apps')
+
+    def __call__(self, request):
+        if random.random() >= self.muestreo:
+            return self.get_response(request)
+
+        medicion = _Medicion(self.raiz)
+        inicio = time.perf_counter()
+        with ExitStack() as pila:
+            for conexion in connections.all():
+                pila.enter_context(conexion.execute_wrapper(medicion))
+            response = self.get_response(request)
+        segundos = time.perf_counter() - inicio
+
+        response['Server-Timing'] = (
+            f'db;dur={medicion.segundos * 1000:.1f};desc="{medicion.cantidad} consultas", '
+            f'total;dur={segundos * 1000:.1f}'
+        )
+        registrar(_endpoint(request), request.get_full_path(), segundos, medicion)
+        return response
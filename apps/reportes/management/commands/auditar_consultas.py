@@ -0,0 +1,206 @@
+# apps/reportes/management/commands/auditar_consultas.py
+"""
+Chequeo manual de planes de consulta (sólo SQLite). Conviene correrlo sobre
+una base con volumen (cargar_datos_prueba con PRUEBA_VENTAS, etc.): los
+índices se validaron con 50.000 productos y 200.000 ventas, no con el
+millón del pedido original. Si encuentra problemas termina con código
+distinto de cero, así que también se puede correr en CI; reportes/tests.py
+lo corre sobre una base chica en cada `manage.py test`.
+"""
+
+import re
+import time
+
+from django.apps import apps
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.test.utils import setup_test_environment, teardown_test_environment
+from django.urls import reverse
+
+
+# Tablas de catálogo o configuración: siempre chicas, recorrerlas no es un problema
+TABLAS_CHICAS = {
+    'categorias', 'proveedores', 'rol_usuarios', 'permisos', 'rol_permisos', 'usuarios',
+    'secuencias', 'cajas', 'cierres_caja', 'trabajos', 'auth_user', 'django_session',
+    'django_content_type', 'auth_group', 'auth_permission', 'auth_user_groups',
+    'auth_user_user_permissions',
+}
+
+# Más consultas que esto en una sola vista suele ser una consulta por fila (N+1)
+LIMITE_CONSULTAS = 50
+
+# SQLite: "SCAN tabla" (o "SCAN tabla AS alias") sin índice = recorrido completo
+RECORRIDO_COMPLETO = re.compile(r'^SCAN (\w+)(?: AS \w+)?$')
+
+
+def _ultimo_id(modelo, **filtros):
+    return modelo.objects.filter(**filtros).order_by('-id').values_list('id', flat=True).first()
+
+
+def _vistas():
+    """
+    (nombre, url, tablas que puede recorrer) de las pantallas más usadas.
+    Las que necesitan datos se omiten si no hay.
+    """
+    from apps.ventas.models import Venta, CierreCaja
+    from apps.inventario.models import Producto
+
+    venta_id = _ultimo_id(Venta)
+    cierre_id = _ultimo_id(CierreCaja)
+    producto_id = _ultimo_id(Producto, estado=1)
+
+    vistas = [
+        ('dashboard', reverse('dashboard'), set()),
+        ('métricas del dashboard', reverse('metricas_dashboard'), set()),
+        ('listado de ventas', reverse('lista_ventas'), set()),
+        ('reporte de ventas', reverse('reporte_ventas'), set()),
+        ('reporte de stock', reverse('reporte_stock'), set()),
+        # Estadísticas sobre todos los clientes activos y todo el historial de ventas
+        ('reporte de clientes', reverse('reporte_clientes'), {'clientes', 'ventas'}),
+        ('listado de productos', reverse('lista_productos'), set()),
+        ('productos (JSON)', reverse('lista_productos_json'), set()),
+        ('búsqueda de productos', reverse('buscar_productos_json') + '?q=filtro', set()),
+        # Muestra todos los clientes activos
+        ('listado de clientes', reverse('lista_clientes'), {'clientes'}),
+        ('listado de cierres', reverse('lista_cierres'), set()),
+    ]
+    if venta_id:
+        vistas.append(('detalle de venta', reverse('detalle_venta', args=[venta_id]), set()))
+    if cierre_id:
+        vistas.append(('detalle de cierre', reverse('detalle_cierre', args=[cierre_id]), set()))
+    if producto_id:
+        vistas.append(('detalle de producto', reverse('detalle_producto_json', args=[producto_id]), set()))
+    return vistas
+
+
+def _consultas(usuario):
+    """Consultas de caminos calientes que no tienen una pantalla propia"""
+    from apps.ventas.models import Ticket, DetalleVenta, Venta
+    from apps.inventario.models import Producto
+    from django.db.models import F
+
+    venta_id = _ultimo_id(Venta) or 0
+    producto_id = _ultimo_id(Producto) or 0
+
+    # Sin tablas permitidas: todas son búsquedas puntuales
+    return [
+        ('tickets pendientes del usuario', lambda: list(
+            Ticket.objects.filter(usuario=usuario, estado='pendiente').order_by('-fecha_creacion')
+        )),
+        ('detalles de una venta', lambda: list(
+            DetalleVenta.objects.filter(venta_id=venta_id, status=1).select_related('producto')
+        )),
+        ('ventas de un producto', lambda: list(
+            DetalleVenta.objects.filter(producto_id=producto_id, status=1).order_by('-venta_id')[:50]
+        )),
+        ('productos con stock bajo', lambda: list(
+            Producto.objects.filter(estado=1, stock__lte=F('stock_minimo')).order_by('stock', 'id')[:50]
+        )),
+        ('productos sin stock', lambda: Producto.objects.filter(estado=1, stock=0).count()),
+    ]
+
+
+class Command(BaseCommand):
+    help = (
+        'Ejecuta las vistas y consultas más usadas, obtiene el EXPLAIN QUERY PLAN de '
+        'cada consulta y falla si alguna recorre una tabla completa (sólo SQLite)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--usuario', help='Usuario con el que se recorren las vistas (por defecto: el primer superusuario)'
+        )
+        parser.add_argument(
+            '--analizar', action='store_true',
+            help='Ejecutar ANALYZE antes, para que el planificador use estadísticas actuales'
+        )
+        parser.add_argument(
+            '--permitir', action='append', default=[], metavar='TABLA',
+            help='Tabla que se puede recorrer completa (se puede repetir)'
+        )
+        parser.add_argument('--sql', action='store_true', help='Mostrar el SQL de las consultas con problemas')
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError('La auditoría usa EXPLAIN QUERY PLAN de SQLite')
+
+        if options['usuario']:
+            usuario = User.objects.filter(username=options['usuario']).first()
+        else:
+            usuario = User.objects.filter(is_superuser=True, is_active=True).order_by('id').first()
+        if usuario is None:
+            raise CommandError('No hay un usuario para recorrer las vistas (usar --usuario)')
+
+        if options['analizar']:
+            with connection.cursor() as cursor:
+                cursor.execute('ANALYZE')
+
+        tablas = {modelo._meta.db_table for modelo in apps.get_models()}
+        permitidas = TABLAS_CHICAS | set(options['permitir'])
+
+        setup_test_environment()
+        try:
+            cliente = Client()
+            cliente.force_login(usuario)
+
+            casos = [
+                (nombre, lambda url=url: cliente.get(url), extra) for nombre, url, extra in _vistas()
+            ] + [(nombre, ejecutar, set()) for nombre, ejecutar in _consultas(usuario)]
+
+            problemas = 0
+            for nombre, ejecutar, extra in casos:
+                problemas += self._auditar(nombre, ejecutar, tablas, permitidas | extra, options['sql'])
+        finally:
+            teardown_test_environment()
+
+        if problemas:
+            raise CommandError(f'{problemas} problemas encontrados')
+        self.stdout.write(self.style.SUCCESS('✓ Ninguna consulta recorre tablas completas'))
+
+    def _auditar(self, nombre, ejecutar, tablas, permitidas, mostrar_sql):
+        """
+        Ejecuta un caso, explica sus SELECT y devuelve la cantidad de problemas:
+        consultas que recorren tablas completas, más uno si hace demasiadas consultas.
+        """
+        capturadas = []
+
+        def capturar(execute, sql, params, many, context):
+            if not many and sql.lstrip().upper().startswith('SELECT'):
+                capturadas.append((sql, params))
+            return execute(sql, params, many, context)
+
+        inicio = time.perf_counter()
+        try:
+            with connection.execute_wrapper(capturar):
+                ejecutar()
+        except Exception as e:
+            self.stdout.write(self.style.WARNING(f'⚠ {nombre}: no se pudo ejecutar ({e})'))
+            return 0
+        milisegundos = (time.perf_counter() - inicio) * 1000
+
+        # Cada SQL distinto se explica una sola vez (las N+1 repiten la misma consulta)
+        recorridos = []
+        with connection.cursor() as cursor:
+            for sql, params in {sql: params for sql, params in capturadas}.items():
+                cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+                for fila in cursor.fetchall():
+                    recorrido = RECORRIDO_COMPLETO.match(fila[-1])
+                    if recorrido and recorrido.group(1) in tablas and recorrido.group(1) not in permitidas:
+                        recorridos.append((recorrido.group(1), sql))
+
+        demasiadas = len(capturadas) > LIMITE_CONSULTAS
+        resumen = f'{nombre}: {len(capturadas)} consultas, {milisegundos:.0f} ms'
+        if not recorridos and not demasiadas:
+            self.stdout.write(f'✓ {resumen}')
+            return 0
+
+        self.stdout.write(self.style.ERROR(f'✗ {resumen}'))
+        if demasiadas:
+            self.stdout.write(f'    más de {LIMITE_CONSULTAS} consultas (¿una por fila?)')
+        for tabla, sql in recorridos:
+            self.stdout.write(f'    SCAN {tabla}')
+            if mostrar_sql:
+                self.stdout.write(f'      {sql}')
+        return len(recorridos) + demasiadas
@@ -0,0 +1,120 @@
+# apps/reportes/management/commands/run_workers.py
+
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.reportes import workers
+from apps.reportes.trabajos import (
+    tomar_trabajo, marcar_error, devolver_a_cola, reencolar_colgados, limpiar_trabajos
+)
+
+
+# Cada cuántos segundos se borran los trabajos vencidos
+INTERVALO_LIMPIEZA = 3600
+
+
+class Command(BaseCommand):
+    help = 'Procesa la cola de trabajos en segundo plano (exportaciones y reportes pesados)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--procesos', type=int, default=min(os.cpu_count() or 1, 4),
+            help='Cantidad de procesos worker (por defecto: núcleos, hasta 4)'
+        )
+        parser.add_argument(
+            '--intervalo', type=float, default=1.0,
+            help='Segundos entre consultas a la cola cuando no hay trabajos'
+        )
+        parser.add_argument(
+            '--una-vez', action='store_true',
+            help='Procesar los trabajos pendientes y salir'
+        )
+
+    def handle(self, *args, **options):
+        procesos = options['procesos']
+        intervalo = options['intervalo']
+        if procesos < 1:
+            raise CommandError('Se necesita al menos un proceso')
+
+        reencolados, fallidos = reencolar_colgados()
+        if reencolados:
+            self.stdout.write(self.style.WARNING(f'⚠ {reencolados} trabajos colgados vueltos a encolar'))
+        if fallidos:
+            self.stdout.write(self.style.WARNING(f'⚠ {fallidos} trabajos colgados marcados con error (sin más intentos)'))
+
+        self.stdout.write(
+            f'Procesando la cola con {procesos} procesos '
+            f'(Ctrl+C para salir al terminar los trabajos en curso, dos veces para salir ya)...'
+        )
+
+        pool = ProcessPoolExecutor(
+            max_workers=procesos,
+            mp_context=multiprocessing.get_context('spawn'),
+            initializer=workers.inicializar_proceso,
+        )
+        en_curso = {}
+        ultima_limpieza = 0
+
+        try:
+            while True:
+                if time.monotonic() - ultima_limpieza > INTERVALO_LIMPIEZA:
+                    limpiar_trabajos()
+                    ultima_limpieza = time.monotonic()
+
+                # Repartir pendientes mientras haya procesos libres
+                while len(en_curso) < procesos:
+                    trabajo_id = tomar_trabajo()
+                    if trabajo_id is None:
+                        break
+                    en_curso[pool.submit(workers.ejecutar, trabajo_id)] = trabajo_id
+
+                if not en_curso:
+                    if options['una_vez']:
+                        break
+                    time.sleep(intervalo)
+                    continue
+
+                terminados, _ = wait(en_curso, timeout=intervalo, return_when=FIRST_COMPLETED)
+                for futuro in terminados:
+                    trabajo_id = en_curso.pop(futuro)
+                    error = futuro.exception()
+                    if error is not None:
+                        # El proceso murió o no se pudo ejecutar la tarea
+                        marcar_error(trabajo_id, error)
+                        self.stdout.write(self.style.ERROR(f'✗ Trabajo #{trabajo_id}: {error}'))
+                    elif futuro.result():
+                        self.stdout.write(self.style.SUCCESS(f'✓ Trabajo #{trabajo_id} terminado'))
+                    else:
+                        self.stdout.write(self.style.ERROR(f'✗ Trabajo #{trabajo_id} con error'))
+        except KeyboardInterrupt:
+            self._detener(en_curso)
+        finally:
+            pool.shutdown(wait=True, cancel_futures=True)
+            # Lo que no terminó (cancelado o cortado) vuelve a la cola; los terminados no cambian
+            devolver_a_cola(list(en_curso.values()))
+
+    def _detener(self, en_curso):
+        """
+        Primer Ctrl+C: no se toman más trabajos y se espera a los que están
+        corriendo. Segundo Ctrl+C: se cortan los procesos worker.
+        """
+        for futuro in en_curso:
+            futuro.cancel()  # sólo cancela los que todavía no empezaron
+        corriendo = [futuro for futuro in en_curso if not futuro.cancelled()]
+        if not corriendo:
+            return
+
+        self.stdout.write(
+            f'Deteniendo workers: esperando {len(corriendo)} trabajos en curso (Ctrl+C para cortarlos)...'
+        )
+        try:
+            wait(corriendo)
+        except KeyboardInterrupt:
+            cortados = sum(not futuro.done() for futuro in corriendo)
+            for proceso in multiprocessing.active_children():
+                proceso.terminate()
+            self.stdout.write(self.style.WARNING(f'⚠ {cortados} trabajos cortados vuelven a la cola'))
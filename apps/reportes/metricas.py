@@ -0,0 +1,97 @@
+# apps/reportes/metricas.py
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, F, Q, Sum
+from django.db.models.functions import TruncMonth
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from django.utils import timezone
+from decimal import Decimal
+
+from apps.inventario.models import Producto
+from apps.ventas.models import Caja, Venta, VentaDiaria
+
+
+CLAVE_CACHE = 'dashboard:metricas'
+
+MESES = ['Ene', 'Feb', 'Mar', 'Abr', 'May', 'Jun', 'Jul', 'Ago', 'Sep', 'Oct', 'Nov', 'Dic']
+
+
+def _segundos_cache():
+    return getattr(settings, 'DASHBOARD_CACHE_SEGUNDOS', 15)
+
+
+def _ultimos_meses(hoy, cantidad=12):
+    """Primer día de cada uno de los últimos `cantidad` meses (incluye el actual), del más viejo al más nuevo"""
+    anio, mes = hoy.year, hoy.month
+    meses = []
+    for _ in range(cantidad):
+        meses.append(hoy.replace(year=anio, month=mes, day=1))
+        mes -= 1
+        if mes == 0:
+            anio, mes = anio - 1, 12
+    return meses[::-1]
+
+
+def calcular_metricas():
+    """
+    Métricas del dashboard. Las ventas salen del resumen VentaDiaria,
+    así que el costo no depende de la cantidad de ventas.
+    """
+    hoy = timezone.localdate()
+
+    ventas_hoy = VentaDiaria.objects.filter(fecha=hoy).aggregate(
+        total=Sum('total'), cantidad=Sum('cantidad')
+    )
+
+    meses = _ultimos_meses(hoy)
+    por_mes = {
+        fila['mes']: fila['total_mes']
+        for fila in VentaDiaria.objects.filter(fecha__gte=meses[0]).order_by().annotate(
+            mes=TruncMonth('fecha')
+        ).values('mes').annotate(total_mes=Sum('total'))
+    }
+    ingresos = [float(por_mes.get(mes) or 0) for mes in meses]
+
+    productos = Producto.objects.filter(estado=1).aggregate(
+        en_stock=Count('id', filter=Q(stock__gt=0)),
+        stock_bajo=Count('id', filter=Q(stock__lte=F('stock_minimo'))),
+    )
+
+    return {
+        'ventas_hoy_total': float(ventas_hoy['total'] or Decimal('0')),
+        'ventas_hoy_cantidad': ventas_hoy['cantidad'] or 0,
+        'cajas_abiertas': Caja.objects.filter(estado='abierta').count(),
+        'productos_en_stock': productos['en_stock'],
+        'productos_stock_bajo': productos['stock_bajo'],
+        'ingresos_meses': [f"{MESES[mes.month - 1]} {mes.year % 100:02d}" for mes in meses],
+        'ingresos_valores': ingresos,
+        'ingresos_total': sum(ingresos),
+        'actualizado': timezone.localtime().strftime('%H:%M:%S'),
+    }
+
+
+def obtener_metricas():
+    """Métricas desde la caché (TTL corto); se recalculan al vencer o al invalidarse"""
+    metricas = cache.get(CLAVE_CACHE)
+    if metricas is None:
+        metricas = calcular_metricas()
+        cache.set(CLAVE_CACHE, metricas, _segundos_cache())
+    return metricas
+
+
+def invalidar_metricas():
+    cache.delete(CLAVE_CACHE)
+
+
+# Ventas, anulaciones, cambios de stock y apertura/cierre de caja invalidan la
+# caché. Se espera al commit para no volver a cachear datos sin confirmar.
+@receiver(post_save, sender=Venta)
+@receiver(post_save, sender=Producto)
+@receiver(post_save, sender=Caja)
+@receiver(post_delete, sender=Venta)
+@receiver(post_delete, sender=Producto)
+def _invalidar_por_cambio(sender, **kwargs):
+    transaction.on_commit(invalidar_metricas)
@@ -0,0 +1,42 @@
+# Generated by Django 5.2.18 on 2026-10-17 19:12
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Trabajo',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tipo', models.CharField(max_length=50)),
+                ('parametros', models.JSONField(blank=True, default=dict)),
+                ('clave', models.CharField(db_index=True, max_length=64)),
+                ('estado', models.CharField(choices=[('pendiente', 'Pendiente'), ('procesando', 'Procesando'), ('terminado', 'Terminado'), ('error', 'Error')], default='pendiente', max_length=20)),
+                ('progreso', models.PositiveSmallIntegerField(default=0)),
+                ('intentos', models.IntegerField(default=0)),
+                ('error', models.TextField(blank=True)),
+                ('archivo', models.CharField(blank=True, max_length=500)),
+                ('nombre_archivo', models.CharField(blank=True, max_length=255)),
+                ('content_type', models.CharField(blank=True, max_length=100)),
+                ('creado', models.DateTimeField(auto_now_add=True)),
+                ('iniciado', models.DateTimeField(blank=True, null=True)),
+                ('terminado', models.DateTimeField(blank=True, null=True)),
+                ('usuario', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'db_table': 'trabajos',
+                'ordering': ['-creado'],
+                'indexes': [models.Index(fields=['estado', 'id'], name='trabajos_estado_id_idx')],
+            },
+        ),
+    ]
@@ -1,2 +1,51 @@
-# Este archivo puede estar vacío
-# Los reportes se generan desde otros modelos
\ No newline at end of file
+from django.db import models
+from django.contrib.auth.models import User
+
+
+# =====================================================================
+# MODELO: TRABAJO EN SEGUNDO PLANO
+# =====================================================================
+
+class Trabajo(models.Model):
+    """
+    Exportación o reporte pesado encolado para `manage.py run_workers`.
+    `clave` es el hash de tipo + parámetros: dos pedidos iguales comparten
+    el resultado mientras no venza (TRABAJOS_CACHE_SEGUNDOS).
+    """
+    ESTADOS = [
+        ('pendiente', 'Pendiente'),
+        ('procesando', 'Procesando'),
+        ('terminado', 'Terminado'),
+        ('error', 'Error'),
+    ]
+
+    tipo = models.CharField(max_length=50)
+    parametros = models.JSONField(default=dict, blank=True)
+    clave = models.CharField(max_length=64, db_index=True)
+
+    estado = models.CharField(max_length=20, choices=ESTADOS, default='pendiente')
+    progreso = models.PositiveSmallIntegerField(default=0)
+    intentos = models.IntegerField(default=0)
+    error = models.TextField(blank=True)
+
+    usuario = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True)
+
+    # Resultado
+    archivo = models.CharField(max_length=500, blank=True)
+    nombre_archivo = models.CharField(max_length=255, blank=True)
+    content_type = models.CharField(max_length=100, blank=True)
+
+    creado = models.DateTimeField(auto_now_add=True)
+    iniciado = models.DateTimeField(null=True, blank=True)
+    terminado = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        db_table = 'trabajos'
+        ordering = ['-creado']
+        indexes = [
+            # Los workers toman el pendiente más viejo
+            models.Index(fields=['estado', 'id'], name='trabajos_estado_id_idx'),
+        ]
+
+    def __str__(self):
+        return f"Trabajo #{self.id} - {self.tipo} ({self.get_estado_display()})"
@@ -0,0 +1,103 @@
+# apps/reportes/tests.py
+
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from apps.inventario.models import Producto
+from apps.ventas.models import Caja, DetalleVenta, Venta
+from .models import Trabajo
+from .trabajos import devolver_a_cola, encolar, reencolar_colgados, tomar_trabajo
+
+
+COMANDO = 'apps.reportes.management.commands.auditar_consultas'
+
+
+class AuditarConsultasTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        usuario = User.objects.create_superuser('admin')
+        producto = Producto.objects.create(
+            codigo=1, descripcion='Casco', precio_costo=Decimal('100.00'), precio_venta=Decimal('150.00')
+        )
+        venta = Venta.objects.create(
+            caja=Caja.objects.create(usuario=usuario), usuario=usuario,
+            total=Decimal('150.00'), tipo_pago='efectivo', codigo_venta=1,
+        )
+        DetalleVenta.objects.create(venta=venta, producto=producto, cantidad=1, precio_unitario=Decimal('150.00'))
+
+    def test_ninguna_consulta_recorre_tablas_completas(self):
+        if connection.vendor != 'sqlite':
+            self.skipTest('La auditoría usa EXPLAIN QUERY PLAN de SQLite')
+
+        salida = StringIO()
+        # El runner ya preparó el entorno de pruebas (el comando lo prepara al correr solo)
+        with mock.patch(f'{COMANDO}.setup_test_environment'), mock.patch(f'{COMANDO}.teardown_test_environment'):
+            call_command('auditar_consultas', stdout=salida)  # CommandError si hay problemas
+
+        self.assertIn('Ninguna consulta recorre tablas completas', salida.getvalue())
+
+
+class TrabajosDelUsuarioTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.duenio = User.objects.create_user('duenio')
+        cls.otro = User.objects.create_user('otro')
+        cls.trabajo = encolar('ventas_excel', {}, cls.duenio)
+
+    def test_otro_usuario_no_ve_el_trabajo(self):
+        self.client.force_login(self.otro)
+        self.assertEqual(self.client.get(reverse('estado_trabajo', args=[self.trabajo.id])).status_code, 404)
+        self.assertEqual(self.client.get(reverse('descargar_trabajo', args=[self.trabajo.id])).status_code, 404)
+
+    def test_duenio_y_staff_ven_el_trabajo(self):
+        staff = User.objects.create_user('staff', is_staff=True)
+        for usuario in (self.duenio, staff):
+            self.client.force_login(usuario)
+            respuesta = self.client.get(reverse('estado_trabajo', args=[self.trabajo.id]))
+            self.assertEqual(respuesta.status_code, 200)
+
+    def test_el_mismo_pedido_de_otro_usuario_es_otro_trabajo(self):
+        self.assertEqual(encolar('ventas_excel', {}, self.duenio), self.trabajo)
+        self.assertNotEqual(encolar('ventas_excel', {}, self.otro), self.trabajo)
+        self.assertEqual(Trabajo.objects.count(), 2)
+
+
+@override_settings(TRABAJOS_TIMEOUT_SEGUNDOS=60, TRABAJOS_MAX_INTENTOS=2)
+class ReencolarColgadosTest(TestCase):
+
+    def colgar(self, trabajo):
+        """Simula un worker que tomó el trabajo y murió"""
+        self.assertEqual(tomar_trabajo(), trabajo.id)
+        Trabajo.objects.filter(pk=trabajo.pk).update(iniciado=timezone.now() - timedelta(minutes=5))
+
+    def test_error_al_agotar_los_intentos(self):
+        trabajo = encolar('ventas_excel', {})
+
+        self.colgar(trabajo)
+        self.assertEqual(reencolar_colgados(), (1, 0))
+        self.colgar(trabajo)
+        self.assertEqual(reencolar_colgados(), (0, 1))
+
+        trabajo.refresh_from_db()
+        self.assertEqual((trabajo.estado, trabajo.intentos), ('error', 2))
+        self.assertIn('2 intentos', trabajo.error)
+        self.assertIsNone(tomar_trabajo())
+
+    def test_devolver_a_cola_no_cuenta_como_intento(self):
+        trabajo = encolar('ventas_excel', {})
+
+        self.assertEqual(tomar_trabajo(), trabajo.id)
+        devolver_a_cola([trabajo.id])
+        self.colgar(trabajo)
+        self.assertEqual(reencolar_colgados(), (1, 0))
@@ -0,0 +1,308 @@
+# apps/reportes/trabajos.py
+
+import hashlib
+import json
+import logging
+import os
+from datetime import timedelta
+from pathlib import Path
+
+from django.conf import settings
+from django.db.models import F, Q
+from django.utils import timezone
+
+from motoshop_django.replicas import en_replica
+from apps.ventas.exportacion import (
+    FORMATOS, filtros_ventas, filtro_caja, ventas_filtradas, escribir_ventas_excel, escribir_ventas_pdf,
+    describir_filtros, filtros_datos, exportar_datos
+)
+from apps.ventas.comprobantes import lote_comprobantes, comprobantes_lote_pdf
+
+from .models import Trabajo
+
+
+logger = logging.getLogger(__name__)
+
+# tipo → (validar, ejecutar). Ver @tarea
+TAREAS = {}
+
+
+def tarea(tipo, validar):
+    """
+    Registra una tarea para la cola.
+
+    `validar(parametros)` recibe lo enviado por el usuario y devuelve los
+    parámetros normalizados (son los que se guardan y se usan para el hash),
+    o lanza ValueError.
+    `ejecutar(parametros, ruta, avance)` escribe el resultado en `ruta`,
+    llama a `avance(porcentaje)` cuando puede y devuelve
+    (nombre_de_descarga, content_type).
+    """
+    def registrar(funcion):
+        TAREAS[tipo] = (validar, funcion)
+        return funcion
+    return registrar
+
+
+def _directorio():
+    directorio = Path(getattr(settings, 'TRABAJOS_DIR', Path(settings.BASE_DIR) / 'trabajos'))
+    directorio.mkdir(parents=True, exist_ok=True)
+    return directorio
+
+
+def clave_trabajo(tipo, parametros):
+    """Hash estable de tipo + parámetros normalizados"""
+    texto = json.dumps({'tipo': tipo, 'parametros': parametros}, sort_keys=True, default=str)
+    return hashlib.sha256(texto.encode('utf-8')).hexdigest()
+
+
+# ======================================================
+#  ENCOLAR / CONSULTAR
+# ======================================================
+
+def encolar(tipo, parametros, usuario=None):
+    """
+    Encola un trabajo y lo devuelve. Si el usuario ya tiene uno igual en
+    curso, o terminado hace menos de TRABAJOS_CACHE_SEGUNDOS, devuelve ese
+    (cada usuario consulta y descarga sólo sus trabajos).
+    Lanza ValueError si el tipo o los parámetros no son válidos.
+    """
+    if tipo not in TAREAS:
+        raise ValueError(f"Tipo de trabajo inválido: {tipo}")
+    validar, _ = TAREAS[tipo]
+    parametros = validar(parametros)
+    clave = clave_trabajo(tipo, parametros)
+    usuario = usuario if usuario and usuario.is_authenticated else None
+
+    vigencia = timezone.now() - timedelta(seconds=getattr(settings, 'TRABAJOS_CACHE_SEGUNDOS', 600))
+    existente = Trabajo.objects.filter(clave=clave, usuario=usuario).filter(
+        Q(estado__in=['pendiente', 'procesando']) | Q(estado='terminado', terminado__gte=vigencia)
+    ).order_by('-id').first()
+
+    if existente and (existente.estado != 'terminado' or os.path.exists(existente.archivo)):
+        return existente
+
+    return Trabajo.objects.create(
+        tipo=tipo,
+        parametros=parametros,
+        clave=clave,
+        usuario=usuario,
+    )
+
+
+def estado_trabajo(trabajo):
+    """Datos para el sondeo desde el navegador"""
+    return {
+        'id': trabajo.id,
+        'tipo': trabajo.tipo,
+        'estado': trabajo.estado,
+        'progreso': trabajo.progreso,
+        'error': trabajo.error,
+        'listo': trabajo.estado == 'terminado',
+    }
+
+
+# ======================================================
+#  EJECUCIÓN (workers)
+# ======================================================
+
+def tomar_trabajo():
+    """
+    Marca como 'procesando' el pendiente más viejo y devuelve su id (o None).
+    El UPDATE condicional evita que dos workers tomen el mismo trabajo.
+    """
+    for _ in range(5):
+        trabajo_id = Trabajo.objects.filter(
+            estado='pendiente'
+        ).order_by('id').values_list('id', flat=True).first()
+        if trabajo_id is None:
+            return None
+
+        tomado = Trabajo.objects.filter(id=trabajo_id, estado='pendiente').update(
+            estado='procesando', iniciado=timezone.now(), intentos=F('intentos') + 1
+        )
+        if tomado:
+            return trabajo_id
+    return None
+
+
+def ejecutar_trabajo(trabajo_id):
+    """Corre la tarea del trabajo y guarda el resultado o el error"""
+    trabajo = Trabajo.objects.get(pk=trabajo_id)
+    _, ejecutar = TAREAS[trabajo.tipo]
+
+    ruta = _directorio() / f'{trabajo.id}-{trabajo.clave[:16]}'
+    temporal = ruta.with_suffix('.tmp')
+    ultimo = [0]
+
+    def avance(porcentaje):
+        porcentaje = max(0, min(int(porcentaje), 99))
+        # Sólo se escribe cuando el avance cambia lo suficiente
+        if porcentaje - ultimo[0] >= 5:
+            ultimo[0] = porcentaje
+            Trabajo.objects.filter(pk=trabajo_id).update(progreso=porcentaje)
+
+    try:
+        # Las lecturas de la tarea van a la réplica (si hay); el avance se escribe en la principal
+        with en_replica():
+            nombre, content_type = ejecutar(trabajo.parametros, temporal, avance)
+        os.replace(temporal, ruta)
+    except Exception as e:
+        logger.exception('Error en el trabajo #%s (%s)', trabajo_id, trabajo.tipo)
+        if temporal.exists():
+            temporal.unlink()
+        marcar_error(trabajo_id, e)
+        return False
+
+    Trabajo.objects.filter(pk=trabajo_id).update(
+        estado='terminado',
+        progreso=100,
+        archivo=str(ruta),
+        nombre_archivo=nombre,
+        content_type=content_type,
+        terminado=timezone.now(),
+    )
+    return True
+
+
+def marcar_error(trabajo_id, error):
+    Trabajo.objects.filter(pk=trabajo_id).update(
+        estado='error', error=str(error)[:1000] or error.__class__.__name__, terminado=timezone.now()
+    )
+
+
+def devolver_a_cola(trabajo_ids):
+    """
+    Trabajos tomados que no llegaron a ejecutarse (p. ej. al detener los
+    workers). No cuentan como intento.
+    """
+    return Trabajo.objects.filter(id__in=trabajo_ids, estado='procesando').update(
+        estado='pendiente', progreso=0, intentos=F('intentos') - 1
+    )
+
+
+def reencolar_colgados():
+    """
+    Vuelve a 'pendiente' los trabajos cuyo worker murió (procesando hace
+    demasiado). Los que ya tuvieron TRABAJOS_MAX_INTENTOS intentos quedan en
+    error, para que un trabajo que tumba al worker no se reintente sin fin.
+    Devuelve (reencolados, fallidos).
+    """
+    limite = timezone.now() - timedelta(seconds=getattr(settings, 'TRABAJOS_TIMEOUT_SEGUNDOS', 1800))
+    max_intentos = getattr(settings, 'TRABAJOS_MAX_INTENTOS', 3)
+    colgados = Trabajo.objects.filter(estado='procesando', iniciado__lt=limite)
+
+    fallidos = colgados.filter(intentos__gte=max_intentos).update(
+        estado='error',
+        error=f'El trabajo no terminó después de {max_intentos} intentos',
+        terminado=timezone.now(),
+    )
+    reencolados = colgados.filter(intentos__lt=max_intentos).update(estado='pendiente', progreso=0)
+    return reencolados, fallidos
+
+
+def limpiar_trabajos():
+    """Borra los trabajos terminados o fallidos más viejos que la retención, con sus archivos"""
+    limite = timezone.now() - timedelta(hours=getattr(settings, 'TRABAJOS_RETENCION_HORAS', 24))
+    viejos = Trabajo.objects.filter(estado__in=['terminado', 'error'], terminado__lt=limite)
+
+    for archivo in viejos.exclude(archivo='').values_list('archivo', flat=True).iterator():
+        try:
+            os.remove(archivo)
+        except FileNotFoundError:
+            pass
+
+    cantidad, _ = viejos.delete()
+    return cantidad
+
+
+# ======================================================
+#  TAREAS
+# ======================================================
+
+def _validar_ventas(parametros):
+    desde, hasta, tipo_pago = filtros_ventas(parametros)
+    return {
+        'fecha_desde': desde.isoformat() if desde else '',
+        'fecha_hasta': hasta.isoformat() if hasta else '',
+        'tipo_pago': tipo_pago or '',
+    }
+
+
+def _validar_ventas_pdf(parametros):
+    normalizados = _validar_ventas(parametros)
+    caja_id = filtro_caja(parametros)
+    normalizados['caja'] = str(caja_id) if caja_id else ''
+    return normalizados
+
+
+@tarea('ventas_excel', _validar_ventas)
+def _ventas_excel(parametros, ruta, avance):
+    ventas = ventas_filtradas(*filtros_ventas(parametros))
+    total = ventas.count() or 1
+    escribir_ventas_excel(ventas, ruta, avance=lambda filas: avance(filas * 100 / total))
+
+    return (
+        f'ventas_{timezone.localtime().strftime("%Y%m%d_%H%M%S")}.xlsx',
+        'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+    )
+
+
+@tarea('ventas_pdf', _validar_ventas_pdf)
+def _ventas_pdf(parametros, ruta, avance):
+    filtros = (*filtros_ventas(parametros), filtro_caja(parametros))
+    ventas = ventas_filtradas(*filtros)
+    total = ventas.count() or 1
+    escribir_ventas_pdf(
+        ventas, str(ruta),
+        subtitulo=describir_filtros(*filtros),
+        avance=lambda filas: avance(filas * 100 / total)
+    )
+
+    return f'ventas_{timezone.localtime().strftime("%Y%m%d_%H%M%S")}.pdf', 'application/pdf'
+
+
+def _validar_datos(parametros):
+    recurso = parametros.get('recurso', '')
+    formato = parametros.get('formato') or 'csv'
+    if formato not in FORMATOS:
+        raise ValueError(f"Formato inválido: {formato}")
+
+    normalizados = {
+        'recurso': recurso,
+        'formato': formato,
+        'gzip': '1' if parametros.get('gzip') == '1' else '',
+    }
+    for campo in ('fecha_desde', 'fecha_hasta', 'desde_id', 'desde_fecha'):
+        normalizados[campo] = parametros.get(campo) or ''
+
+    filtros_datos(recurso, normalizados)  # sólo para validar
+    return normalizados
+
+
+@tarea('datos', _validar_datos)
+def _datos(parametros, ruta, avance):
+    recurso, formato = parametros['recurso'], parametros['formato']
+    comprimir = parametros['gzip'] == '1'
+
+    with open(ruta, 'wb') as archivo:
+        for bloque in exportar_datos(filtros_datos(recurso, parametros), recurso, formato, comprimir):
+            archivo.write(bloque)
+
+    nombre = f'{recurso}_{timezone.localtime().strftime("%Y%m%d_%H%M%S")}.{formato}'
+    if comprimir:
+        return nombre + '.gz', 'application/gzip'
+    return nombre, 'text/csv' if formato == 'csv' else 'application/x-ndjson'
+
+
+def _validar_comprobantes(parametros):
+    lote_comprobantes(parametros)  # sólo para validar
+    return {'caja': parametros.get('caja') or '', 'cierre': parametros.get('cierre') or ''}
+
+
+@tarea('comprobantes', _validar_comprobantes)
+def _comprobantes(parametros, ruta, avance):
+    ventas, nombre = lote_comprobantes(parametros)
+    total = ventas.count() or 1
+    ruta.write_bytes(comprobantes_lote_pdf(ventas, avance=lambda listas: avance(listas * 100 / total)))
+    return nombre, 'application/pdf'
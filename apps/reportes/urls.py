@@ -5,9 +5,15 @@ from . import views
 
 urlpatterns = [
     path('', views.index, name='reportes'),
+    path('dashboard/metricas/', views.metricas_dashboard, name='metricas_dashboard'),
     path('ventas/', views.reporte_ventas, name='reporte_ventas'),
     path('stock/', views.reporte_stock, name='reporte_stock'),
     path('clientes/', views.reporte_clientes, name='reporte_clientes'),
+    
+    # Trabajos en segundo plano (manage.py run_workers)
+    path('trabajos/', views.encolar_trabajo, name='encolar_trabajo'),
+    path('trabajos/<int:trabajo_id>/', views.consultar_trabajo, name='estado_trabajo'),
+    path('trabajos/<int:trabajo_id>/descargar/', views.descargar_trabajo, name='descargar_trabajo'),
 ]
 
 from django.shortcuts import render
@@ -0,0 +1,80 @@
+# apps/reportes/valorizacion.py
+
+from django.db.models import Count, DecimalField, ExpressionWrapper, F, Q, Sum, Value
+from django.db.models.functions import Coalesce
+from decimal import Decimal
+
+
+TOP_VALIOSOS = 10
+
+_MONTO = DecimalField(max_digits=14, decimal_places=2)
+
+
+def valor_costo():
+    """stock × precio_costo calculado por la base"""
+    return ExpressionWrapper(F('stock') * F('precio_costo'), output_field=_MONTO)
+
+
+def valor_venta():
+    """stock × precio_venta calculado por la base"""
+    return ExpressionWrapper(F('stock') * F('precio_venta'), output_field=_MONTO)
+
+
+def _suma(expresion):
+    return Coalesce(Sum(expresion), Value(Decimal('0')), output_field=_MONTO)
+
+
+def _agregados_valor():
+    return {
+        'cantidad': Count('id'),
+        'valor_inventario': _suma(valor_costo()),
+        'valor_venta_potencial': _suma(valor_venta()),
+    }
+
+
+def resumen_inventario(productos):
+    """
+    Conteos y valorización del inventario en UNA consulta:
+    total_productos, productos_stock_bajo, productos_sin_stock,
+    valor_inventario, valor_venta_potencial y ganancia_potencial.
+    """
+    datos = productos.order_by().aggregate(
+        stock_bajo=Count('id', filter=Q(stock__lte=F('stock_minimo'))),
+        sin_stock=Count('id', filter=Q(stock=0)),
+        **_agregados_valor()
+    )
+
+    return {
+        'total_productos': datos['cantidad'],
+        'productos_stock_bajo': datos['stock_bajo'],
+        'productos_sin_stock': datos['sin_stock'],
+        'valor_inventario': datos['valor_inventario'],
+        'valor_venta_potencial': datos['valor_venta_potencial'],
+        'ganancia_potencial': datos['valor_venta_potencial'] - datos['valor_inventario'],
+    }
+
+
+def productos_mas_valiosos(productos, limite=TOP_VALIOSOS):
+    """Top N por valor en inventario (ORDER BY valor DESC LIMIT N en la base)"""
+    return list(
+        productos.annotate(valor=valor_costo()).order_by('-valor', 'id')[:limite]
+    )
+
+
+def valorizacion_por(productos, campo):
+    """
+    Valorización agrupada por una relación del producto ('categoria' o 'proveedor').
+    Devuelve una fila por grupo con id, nombre, cantidad, valor_inventario,
+    valor_venta_potencial y ganancia_potencial, ordenadas por valor.
+    """
+    nombre = {'categoria': 'categoria__nombre', 'proveedor': 'proveedor__razon_social'}[campo]
+
+    filas = productos.order_by().values(
+        grupo_id=F(f'{campo}_id'), nombre=F(nombre)
+    ).annotate(**_agregados_valor()).order_by('-valor_inventario')
+
+    resultado = []
+    for fila in filas:
+        fila['ganancia_potencial'] = fila['valor_venta_potencial'] - fila['valor_inventario']
+        resultado.append(fila)
+    return resultado
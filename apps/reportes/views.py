@@ -1,15 +1,47 @@
 # apps/reportes/views.py
 
-from django.shortcuts import render
+from django.shortcuts import render, redirect, get_object_or_404
+from django.conf import settings
+from django.http import JsonResponse, FileResponse, Http404
+from django.urls import reverse
+from django.views.decorators.http import require_http_methods
 from django.contrib.auth.decorators import login_required
+from django.contrib.admin.views.decorators import staff_member_required
+from django.contrib import messages
 from django.db.models import Sum, Count, Avg, F, Q
 from django.utils import timezone
 from datetime import timedelta, datetime
 from decimal import Decimal
+import json
 
-from apps.ventas.models import Venta, DetalleVenta
+from motoshop_django.replicas import usar_replica
+from apps.ventas.models import Venta, VentaDiaria
+from apps.ventas.resumenes import top_productos, productos_baja_rotacion, rotacion_por_categoria
+from apps.ventas.totales import METODOS_PAGO
 from apps.inventario.models import Producto
 from apps.clientes.models import Cliente
+from apps.inventario.catalogo import filtrar_productos, pagina_productos
+
+from .valorizacion import resumen_inventario, productos_mas_valiosos, valorizacion_por
+from .metricas import obtener_metricas
+from . import diagnostico
+from .models import Trabajo
+from .trabajos import encolar, estado_trabajo
+
+
+LIMITE_ALERTAS = 50
+
+
+@login_required
+def dashboard(request):
+    """Dashboard principal; los números se refrescan desde metricas_dashboard"""
+    return render(request, 'dashboard.html', {'metricas': obtener_metricas()})
+
+
+@login_required
+def metricas_dashboard(request):
+    """API de métricas del dashboard (cacheadas unos segundos)"""
+    return JsonResponse(obtener_metricas())
 
 
 @login_required
@@ -19,6 +51,7 @@ def index(request):
 
 
 @login_required
+@usar_replica
 def reporte_ventas(request):
     """Reporte de ventas por período con filtros"""
     # Obtener parámetros de filtro
@@ -28,69 +61,59 @@ def reporte_ventas(request):
     
     # Fechas por defecto: último mes
     if not fecha_desde:
-        fecha_desde = (timezone.now() - timedelta(days=30)).date()
+        fecha_desde = timezone.localdate() - timedelta(days=30)
     else:
         fecha_desde = datetime.strptime(fecha_desde, '%Y-%m-%d').date()
     
     if not fecha_hasta:
-        fecha_hasta = timezone.now().date()
+        fecha_hasta = timezone.localdate()
     else:
         fecha_hasta = datetime.strptime(fecha_hasta, '%Y-%m-%d').date()
     
-    # Filtrar ventas
-    ventas = Venta.objects.filter(
-        fecha__date__gte=fecha_desde,
-        fecha__date__lte=fecha_hasta,
-        estado_venta__in=[1, 2]  # Pendiente y Pagado
-    ).select_related('cliente', 'usuario')
-    
+    # Totales, métodos de pago y gráfico diario desde el resumen VentaDiaria
+    resumen = VentaDiaria.objects.filter(fecha__gte=fecha_desde, fecha__lte=fecha_hasta)
     if tipo_pago:
-        ventas = ventas.filter(tipo_pago=tipo_pago)
-    
-    # Calcular estadísticas
-    total_ventas = ventas.aggregate(Sum('total'))['total__sum'] or Decimal('0')
-    cantidad_ventas = ventas.count()
-    promedio_venta = ventas.aggregate(Avg('total'))['total__avg'] or Decimal('0')
+        resumen = resumen.filter(tipo_pago=tipo_pago)
     
     # Ventas por método de pago
     ventas_por_metodo = {
-        'efectivo': ventas.filter(tipo_pago='efectivo').aggregate(
-            total=Sum('total'), cantidad=Count('id')
-        ),
-        'debito': ventas.filter(tipo_pago='debito').aggregate(
-            total=Sum('total'), cantidad=Count('id')
-        ),
-        'credito': ventas.filter(tipo_pago='credito').aggregate(
-            total=Sum('total'), cantidad=Count('id')
-        ),
-        'transferencia': ventas.filter(tipo_pago='transferencia').aggregate(
-            total=Sum('total'), cantidad=Count('id')
-        ),
-        'mixto': ventas.filter(tipo_pago='mixto').aggregate(
-            total=Sum('total'), cantidad=Count('id')
-        ),
+        metodo: {'total': Decimal('0'), 'cantidad': 0} for metodo in METODOS_PAGO
     }
+    for fila in resumen.order_by().values('tipo_pago').annotate(
+        total_metodo=Sum('total'), cantidad_metodo=Sum('cantidad')
+    ):
+        ventas_por_metodo[fila['tipo_pago']] = {
+            'total': fila['total_metodo'],
+            'cantidad': fila['cantidad_metodo'],
+        }
+    
+    # Calcular estadísticas
+    total_ventas = sum(metodo['total'] for metodo in ventas_por_metodo.values())
+    cantidad_ventas = sum(metodo['cantidad'] for metodo in ventas_por_metodo.values())
+    promedio_venta = total_ventas / cantidad_ventas if cantidad_ventas else Decimal('0')
     
     # Ventas por día (para gráfico)
-    ventas_por_dia = ventas.extra(
-        select={'dia': 'date(fecha)'}
-    ).values('dia').annotate(
-        total=Sum('total'),
-        cantidad=Count('id')
-    ).order_by('dia')
-    
-    # Top 10 productos más vendidos en el período
-    productos_mas_vendidos = DetalleVenta.objects.filter(
-        venta__fecha__date__gte=fecha_desde,
-        venta__fecha__date__lte=fecha_hasta,
-        venta__estado_venta__in=[1, 2]
-    ).values(
-        'producto__descripcion',
-        'producto__codigo'
-    ).annotate(
-        cantidad_vendida=Sum('cantidad'),
-        total_vendido=Sum(F('cantidad') * F('precio_unitario'))
-    ).order_by('-cantidad_vendida')[:10]
+    ventas_por_dia = [
+        {'dia': fila['fecha'].isoformat(), 'total': float(fila['total_dia']), 'cantidad': fila['cantidad_dia']}
+        for fila in resumen.order_by().values('fecha').annotate(
+            total_dia=Sum('total'), cantidad_dia=Sum('cantidad')
+        ).order_by('fecha')
+    ]
+    
+    # Ventas del período (fecha_local está indexada junto con estado y método de pago)
+    ventas = Venta.objects.filter(
+        fecha_local__gte=fecha_desde,
+        fecha_local__lte=fecha_hasta,
+        estado_venta__in=[1, 2]  # Pendiente y Pagado
+    ).select_related('cliente', 'usuario')
+    
+    if tipo_pago:
+        ventas = ventas.filter(tipo_pago=tipo_pago)
+    
+    # Top 10 productos más vendidos, baja rotación y rotación por categoría (resumen ProductoDiario)
+    productos_mas_vendidos = top_productos(fecha_desde, fecha_hasta)
+    productos_lentos = productos_baja_rotacion(fecha_desde, fecha_hasta)
+    rotacion_categorias = rotacion_por_categoria(fecha_desde, fecha_hasta)
     
     # Top 10 clientes por monto
     clientes_top = ventas.filter(
@@ -111,8 +134,10 @@ def reporte_ventas(request):
         'cantidad_ventas': cantidad_ventas,
         'promedio_venta': promedio_venta,
         'ventas_por_metodo': ventas_por_metodo,
-        'ventas_por_dia': list(ventas_por_dia),
+        'ventas_por_dia': json.dumps(ventas_por_dia),
         'productos_mas_vendidos': productos_mas_vendidos,
+        'productos_lentos': productos_lentos,
+        'rotacion_categorias': rotacion_categorias,
         'clientes_top': clientes_top,
         'ventas': ventas[:50],  # Últimas 50 ventas
     }
@@ -121,79 +146,65 @@ def reporte_ventas(request):
 
 
 @login_required
+@usar_replica
 def reporte_stock(request):
     """Reporte de inventario y stock"""
     # Obtener filtros
     categoria_id = request.GET.get('categoria')
     nivel_stock = request.GET.get('nivel_stock', '')  # bajo, medio, alto
     
-    productos = Producto.objects.filter(estado=1).select_related('categoria', 'proveedor')
+    # Mismos filtros que el listado de productos (categoría, proveedor y nivel de stock)
+    productos = filtrar_productos(request.GET)
     
-    if categoria_id:
-        productos = productos.filter(categoria_id=categoria_id)
-    
-    # Filtrar por nivel de stock
-    if nivel_stock == 'bajo':
-        productos = productos.filter(stock__lte=F('stock_minimo'))
-    elif nivel_stock == 'medio':
-        productos = productos.filter(
-            stock__gt=F('stock_minimo'),
-            stock__lte=F('stock_minimo') * 3
-        )
-    elif nivel_stock == 'alto':
-        productos = productos.filter(stock__gt=F('stock_minimo') * 3)
-    
-    # Estadísticas generales
-    total_productos = productos.count()
-    productos_stock_bajo = productos.filter(stock__lte=F('stock_minimo')).count()
-    productos_sin_stock = productos.filter(stock=0).count()
-    
-    # Valor total del inventario
-    valor_inventario = sum(
-        (p.stock * p.precio_costo) for p in productos
-    )
-    
-    valor_venta_potencial = sum(
-        (p.stock * p.precio_venta) for p in productos
-    )
-    
-    ganancia_potencial = valor_venta_potencial - valor_inventario
+    # Estadísticas y valorización calculadas por la base en una sola consulta
+    resumen = resumen_inventario(productos)
     
     # Productos con alerta de stock
     productos_alertas = productos.filter(
         Q(stock__lte=F('stock_minimo')) | Q(stock=0)
-    ).order_by('stock')
+    ).select_related('categoria').order_by('stock', 'id')[:LIMITE_ALERTAS]
     
     # Productos más valiosos (por valor en inventario)
-    productos_valiosos = sorted(
-        productos,
-        key=lambda p: p.stock * p.precio_costo,
-        reverse=True
-    )[:10]
+    productos_valiosos = productos_mas_valiosos(productos)
+    
+    # Valorización por categoría y por proveedor
+    valor_por_categoria = valorizacion_por(productos, 'categoria')
+    valor_por_proveedor = valorizacion_por(productos, 'proveedor')
+    
+    # Inventario completo: una página por vez (keyset), nunca el catálogo entero
+    try:
+        pagina, siguiente = pagina_productos(productos, cursor=request.GET.get('cursor'))
+    except ValueError as e:
+        messages.error(request, str(e))
+        pagina, siguiente = pagina_productos(productos)
+    
+    parametros = request.GET.copy()
+    parametros.pop('cursor', None)
+    if siguiente:
+        parametros['cursor'] = siguiente
     
     # Categorías para filtro
     from apps.inventario.models import Categoria
     categorias = Categoria.objects.filter(estado=1)
     
     context = {
-        'productos': productos,
-        'total_productos': total_productos,
-        'productos_stock_bajo': productos_stock_bajo,
-        'productos_sin_stock': productos_sin_stock,
-        'valor_inventario': valor_inventario,
-        'valor_venta_potencial': valor_venta_potencial,
-        'ganancia_potencial': ganancia_potencial,
+        'productos': pagina,
+        'siguiente_pagina': parametros.urlencode() if siguiente else None,
         'productos_alertas': productos_alertas,
         'productos_valiosos': productos_valiosos,
+        'valor_por_categoria': valor_por_categoria,
+        'valor_por_proveedor': valor_por_proveedor,
         'categorias': categorias,
         'categoria_seleccionada': categoria_id,
         'nivel_stock': nivel_stock,
+        **resumen,
     }
     
     return render(request, 'reportes/reporte_stock.html', context)
 
 
 @login_required
+@usar_replica
 def reporte_clientes(request):
     """Reporte de análisis de clientes"""
     clientes = Cliente.objects.filter(estado=1)
@@ -251,4 +262,87 @@ def reporte_clientes(request):
         'valor_promedio': valor_promedio,
     }
     
-    return render(request, 'reportes/reporte_clientes.html', context)
\ No newline at end of file
+    return render(request, 'reportes/reporte_clientes.html', context)
+
+# ======================================================
+#  TRABAJOS EN SEGUNDO PLANO
+# ======================================================
+
+@login_required
+@require_http_methods(["POST"])
+def encolar_trabajo(request):
+    """
+    Encola una exportación pesada para `manage.py run_workers` y devuelve
+    su id. Si el mismo pedido ya se generó hace poco, devuelve ese trabajo.
+    """
+    parametros = request.POST.dict()
+    tipo = parametros.pop('tipo', '')
+    parametros.pop('csrfmiddlewaretoken', None)
+    
+    try:
+        trabajo = encolar(tipo, parametros, request.user)
+    except ValueError as e:
+        return JsonResponse({'success': False, 'error': str(e)}, status=400)
+    
+    return JsonResponse({
+        'success': True,
+        **estado_trabajo(trabajo),
+        'url_estado': reverse('estado_trabajo', args=[trabajo.id]),
+        'url_descarga': reverse('descargar_trabajo', args=[trabajo.id]),
+    }, status=202)
+
+
+def _trabajo_del_usuario(request, trabajo_id):
+    """El trabajo si lo pidió el usuario (el staff ve todos); 404 si no"""
+    trabajos = Trabajo.objects.all() if request.user.is_staff else Trabajo.objects.filter(usuario=request.user)
+    return get_object_or_404(trabajos, pk=trabajo_id)
+
+
+@login_required
+def consultar_trabajo(request, trabajo_id):
+    """Estado y progreso de un trabajo (para sondeo)"""
+    trabajo = _trabajo_del_usuario(request, trabajo_id)
+    return JsonResponse(estado_trabajo(trabajo))
+
+
+@login_required
+def descargar_trabajo(request, trabajo_id):
+    """Descarga el archivo de un trabajo terminado"""
+    trabajo = _trabajo_del_usuario(request, trabajo_id)
+    
+    if trabajo.estado != 'terminado':
+        return JsonResponse(estado_trabajo(trabajo), status=409)
+    
+    try:
+        archivo = open(trabajo.archivo, 'rb')
+    except FileNotFoundError:
+        raise Http404('El archivo del trabajo ya no existe')
+    
+    return FileResponse(
+        archivo,
+        as_attachment=True,
+        filename=trabajo.nombre_archivo,
+        content_type=trabajo.content_type
+    )
+
+
+# ======================================================
+#  DIAGNÓSTICO DE CONSULTAS
+# ======================================================
+
+@staff_member_required
+def diagnostico_consultas(request):
+    """
+    Endpoints más lentos según PerfilConsultasMiddleware (DIAGNOSTICO_MUESTREO),
+    con las consultas repetidas del pedido más lento de cada uno.
+    POST borra lo acumulado.
+    """
+    if request.method == 'POST':
+        diagnostico.limpiar()
+        messages.success(request, 'Estadísticas de consultas borradas.')
+        return redirect('diagnostico_consultas')
+    
+    return render(request, 'reportes/diagnostico_consultas.html', {
+        'endpoints': diagnostico.endpoints_mas_lentos(),
+        'muestreo': getattr(settings, 'DIAGNOSTICO_MUESTREO', 0) * 100,
+    })
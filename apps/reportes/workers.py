@@ -0,0 +1,26 @@
+# apps/reportes/workers.py
+#
+# Funciones que corren dentro de los procesos de `manage.py run_workers`.
+# Los procesos se crean con 'spawn' (sin Django ni conexiones heredadas), así
+# que este módulo no importa modelos al cargarse: lo hace después de django.setup().
+
+import signal
+
+import django
+
+
+def inicializar_proceso():
+    # Ctrl+C llega a todo el grupo de procesos: lo maneja sólo run_workers,
+    # que decide si espera el trabajo en curso o corta el proceso
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    django.setup()
+
+
+def ejecutar(trabajo_id):
+    from django.db import connections
+    from .trabajos import ejecutar_trabajo
+
+    try:
+        return ejecutar_trabajo(trabajo_id)
+    finally:
+        connections.close_all()
@@ -3,4 +3,8 @@ from django.apps import AppConfig
 class UsuariosConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.usuarios'
-    verbose_name = 'Usuarios'
\ No newline at end of file
+    verbose_name = 'Usuarios'
+
+    def ready(self):
+        # Invalida la caché de permisos al cambiar roles, permisos o perfiles
+        from . import permisos  # noqa: F401
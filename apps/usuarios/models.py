@@ -96,16 +96,9 @@ class UsuarioExtendido(models.Model):
         return self.rol and self.rol.tipo in ['superadmin', 'admin']
 
     def tiene_permiso(self, codigo_permiso):
-        if not self.rol:
-            return False
-
-        if self.rol.tipo == 'superadmin':
-            return True
-
-        return RolPermiso.objects.filter(
-            rol=self.rol,
-            permiso__codigo=codigo_permiso
-        ).exists()
+        # Conjunto de permisos del rol cacheado (ver apps/usuarios/permisos.py)
+        from .permisos import permisos_rol
+        return codigo_permiso in permisos_rol(self.rol_id)
 
     def obtener_permisos(self):
         if not self.rol:
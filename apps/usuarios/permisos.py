@@ -0,0 +1,257 @@
+# apps/usuarios/permisos.py
+
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Q
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from django.utils.functional import SimpleLazyObject
+
+from .models import Permiso, RolPermiso, RolUsuario, UsuarioExtendido
+
+
+SIN_PERMISOS = frozenset()
+
+
+class TodosLosPermisos(frozenset):
+    """Conjunto del superadmin: contiene cualquier código, como tiene_permiso"""
+
+    def __contains__(self, codigo):
+        return True
+
+
+TODOS_LOS_PERMISOS = TodosLosPermisos()
+
+# Marca "sin rol" en la caché (None no se distingue de una clave ausente)
+_SIN_ROL = 0
+
+_local = {}
+_lock = threading.Lock()
+
+
+def _segundos_local():
+    """
+    Cuánto vive una entrada en la memoria del proceso. La invalidación borra
+    la del proceso que hizo el cambio y la de la caché de Django; los demás
+    procesos la ven al vencer este plazo.
+    """
+    return getattr(settings, 'PERMISOS_CACHE_LOCAL_SEGUNDOS', 30)
+
+
+def _obtener(clave, cargar):
+    """Busca en memoria del proceso → caché de Django → base de datos (cargar)"""
+    ahora = time.monotonic()
+    entrada = _local.get(clave)
+    if entrada and entrada[1] > ahora:
+        return entrada[0]
+
+    valor = cache.get(clave)
+    if valor is None:
+        valor = cargar()
+        cache.set(clave, valor, None)
+
+    with _lock:
+        _local[clave] = (valor, ahora + _segundos_local())
+    return valor
+
+
+def _invalidar(*claves):
+    def borrar():
+        with _lock:
+            for clave in claves:
+                _local.pop(clave, None)
+        cache.delete_many(claves)
+
+    borrar()
+    # Otra petición pudo volver a cachear el estado viejo antes del commit
+    transaction.on_commit(borrar)
+
+
+def _clave_rol(rol_id):
+    return f'permisos:rol:{rol_id}'
+
+
+def _clave_usuario(user_id):
+    return f'permisos:usuario:{user_id}'
+
+
+# ======================================================
+#  CONSULTA
+# ======================================================
+
+def permisos_rol(rol_id):
+    """frozenset con los códigos de permiso del rol (superadmin: TODOS_LOS_PERMISOS)"""
+    if not rol_id:
+        return SIN_PERMISOS
+
+    def cargar():
+        if RolUsuario.objects.filter(pk=rol_id, tipo='superadmin').exists():
+            return TODOS_LOS_PERMISOS
+        return frozenset(
+            RolPermiso.objects.filter(rol_id=rol_id).values_list('permiso__codigo', flat=True)
+        )
+
+    return _obtener(_clave_rol(rol_id), cargar)
+
+
+def rol_de_usuario(user_id):
+    """id del rol del perfil del usuario, o None"""
+    def cargar():
+        rol_id = UsuarioExtendido.objects.filter(
+            user_id=user_id
+        ).values_list('rol_id', flat=True).first()
+        return rol_id or _SIN_ROL
+
+    return _obtener(_clave_usuario(user_id), cargar) or None
+
+
+def permisos_de_usuario(user):
+    """frozenset con los códigos de permiso del usuario"""
+    if not user.is_authenticated:
+        return SIN_PERMISOS
+    return permisos_rol(rol_de_usuario(user.pk))
+
+
+# ======================================================
+#  INVALIDACIÓN
+# ======================================================
+
+def invalidar_permisos_rol(rol_id):
+    _invalidar(_clave_rol(rol_id))
+
+
+def invalidar_todos_los_roles():
+    _invalidar(*[_clave_rol(rol_id) for rol_id in RolUsuario.objects.values_list('id', flat=True)])
+
+
+@receiver(post_save, sender=RolPermiso)
+@receiver(post_delete, sender=RolPermiso)
+def _rol_permiso_cambiado(sender, instance, **kwargs):
+    invalidar_permisos_rol(instance.rol_id)
+
+
+@receiver(post_save, sender=Permiso)
+@receiver(post_delete, sender=Permiso)
+def _permiso_cambiado(sender, **kwargs):
+    # Puede haber cambiado el código de un permiso asignado a cualquier rol
+    invalidar_todos_los_roles()
+
+
+@receiver(post_save, sender=RolUsuario)
+def _rol_cambiado(sender, instance, **kwargs):
+    invalidar_permisos_rol(instance.pk)
+
+
+@receiver(post_save, sender=UsuarioExtendido)
+@receiver(post_delete, sender=UsuarioExtendido)
+def _perfil_cambiado(sender, instance, **kwargs):
+    _invalidar(_clave_usuario(instance.user_id))
+
+
+# ======================================================
+#  ASIGNACIÓN EN BLOQUE
+# ======================================================
+
+def asignar_permisos_rol(rol, permiso_ids):
+    """
+    Deja al rol exactamente con `permiso_ids` aplicando sólo la diferencia:
+    un DELETE filtrado para los quitados y un bulk_create para los agregados.
+    Los ids que no existen se ignoran. Devuelve (agregados, quitados).
+    """
+    with transaction.atomic():
+        nuevos = set(Permiso.objects.filter(id__in=permiso_ids).values_list('id', flat=True))
+        actuales = set(RolPermiso.objects.filter(rol=rol).values_list('permiso_id', flat=True))
+
+        agregar = nuevos - actuales
+        quitar = actuales - nuevos
+
+        if quitar:
+            RolPermiso.objects.filter(rol=rol, permiso_id__in=quitar).delete()
+        if agregar:
+            RolPermiso.objects.bulk_create([RolPermiso(rol=rol, permiso_id=permiso_id) for permiso_id in agregar])
+
+        # delete() y bulk_create no disparan señales
+        invalidar_permisos_rol(rol.id)
+
+    return len(agregar), len(quitar)
+
+
+def aplicar_cambios_permisos(agregar=None, quitar=None):
+    """
+    Aplica cambios de permisos a varios roles con una cantidad fija de consultas.
+
+    `agregar` y `quitar` son diccionarios {tipo_de_rol: [códigos de permiso]}:
+        aplicar_cambios_permisos(
+            agregar={'ventas': ['ver_reportes'], 'caja': ['ver_clientes']},
+            quitar={'ventas': ['anular_ventas']},
+        )
+
+    Lanza ValueError si algún rol o código no existe (no se aplica nada).
+    Devuelve {'agregados': n, 'quitados': n}.
+    """
+    agregar = agregar or {}
+    quitar = quitar or {}
+
+    tipos = set(agregar) | set(quitar)
+    codigos = {codigo for lista in (*agregar.values(), *quitar.values()) for codigo in lista}
+
+    roles = dict(RolUsuario.objects.filter(tipo__in=tipos).values_list('tipo', 'id'))
+    permisos = dict(Permiso.objects.filter(codigo__in=codigos).values_list('codigo', 'id'))
+
+    faltantes = sorted(tipos - set(roles))
+    if faltantes:
+        raise ValueError(f"Roles inexistentes: {', '.join(faltantes)}")
+    faltantes = sorted(codigos - set(permisos))
+    if faltantes:
+        raise ValueError(f"Permisos inexistentes: {', '.join(faltantes)}")
+
+    pares_agregar = {(roles[tipo], permisos[codigo]) for tipo, lista in agregar.items() for codigo in lista}
+    pares_quitar = {(roles[tipo], permisos[codigo]) for tipo, lista in quitar.items() for codigo in lista}
+    pares_agregar -= pares_quitar
+
+    with transaction.atomic():
+        quitados = 0
+        if pares_quitar:
+            condicion = Q()
+            for rol_id, permiso_id in pares_quitar:
+                condicion |= Q(rol_id=rol_id, permiso_id=permiso_id)
+            quitados, _ = RolPermiso.objects.filter(condicion).delete()
+
+        nuevos = []
+        if pares_agregar:
+            existentes = set(RolPermiso.objects.filter(
+                rol_id__in={rol_id for rol_id, _ in pares_agregar}
+            ).values_list('rol_id', 'permiso_id'))
+            nuevos = [
+                RolPermiso(rol_id=rol_id, permiso_id=permiso_id)
+                for rol_id, permiso_id in pares_agregar - existentes
+            ]
+            RolPermiso.objects.bulk_create(nuevos)
+
+        _invalidar(*[_clave_rol(rol_id) for rol_id in roles.values()])
+
+    return {'agregados': len(nuevos), 'quitados': quitados}
+
+
+# ======================================================
+#  MIDDLEWARE
+# ======================================================
+
+class PermisosMiddleware:
+    """
+    Deja en request.permisos el frozenset de códigos del usuario, así
+    permiso_requerido y las plantillas verifican permisos sin consultas.
+    Va después de AuthenticationMiddleware.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        # Perezoso como request.user: sólo se resuelve si alguien lo usa
+        request.permisos = SimpleLazyObject(lambda: permisos_de_usuario(request.user))
+        return self.get_response(request)
@@ -9,5 +9,6 @@ urlpatterns = [
     path('editar/<int:pk>/', views.editar_usuario, name='editar_usuario'),
     path('eliminar/<int:pk>/', views.eliminar_usuario, name='eliminar_usuario'),
     path('rol/<int:rol_id>/permisos/', views.gestionar_permisos_rol, name='gestionar_permisos_rol'),
+    path('roles/permisos/masivo/', views.asignar_permisos_masivo, name='asignar_permisos_masivo'),
     path('cambiar-password/', views.cambiar_password, name='cambiar_password'),
 ]
\ No newline at end of file
@@ -5,15 +5,26 @@ from django.contrib import messages
 from django.contrib.auth.models import User
 from django.db import transaction
 from .models import UsuarioExtendido, RolUsuario, Permiso, RolPermiso
+from .permisos import permisos_de_usuario, asignar_permisos_rol, aplicar_cambios_permisos
+from django.http import JsonResponse
+from django.views.decorators.http import require_http_methods
 from functools import wraps
+from itertools import groupby
+from operator import attrgetter
+import json
 
 # Decorador para verificar permisos
+# (request.permisos lo deja PermisosMiddleware; sale de caché, sin consultas)
 def permiso_requerido(codigo_permiso):
     def decorator(view_func):
         @wraps(view_func)
         def _wrapped_view(request, *args, **kwargs):
             try:
-                if hasattr(request.user, 'perfil') and request.user.perfil.tiene_permiso(codigo_permiso):
+                permisos = getattr(request, 'permisos', None)
+                if permisos is None:
+                    permisos = permisos_de_usuario(request.user)
+                
+                if codigo_permiso in permisos:
                     return view_func(request, *args, **kwargs)
                 else:
                     messages.error(request, 'No tienes permisos para acceder a esta sección.')
@@ -208,26 +219,24 @@ def gestionar_permisos_rol(request, rol_id):
     rol = get_object_or_404(RolUsuario, pk=rol_id)
     
     if request.method == 'POST':
-        # Obtener permisos seleccionados
-        permisos_ids = request.POST.getlist('permisos')
-        
-        # Eliminar permisos actuales
-        RolPermiso.objects.filter(rol=rol).delete()
-        
-        # Asignar nuevos permisos
-        for permiso_id in permisos_ids:
-            permiso = Permiso.objects.get(id=permiso_id)
-            RolPermiso.objects.create(rol=rol, permiso=permiso)
+        # Aplicar sólo la diferencia con los permisos actuales
+        try:
+            agregados, quitados = asignar_permisos_rol(rol, request.POST.getlist('permisos'))
+        except ValueError:
+            messages.error(request, 'Permisos inválidos.')
+            return redirect('gestionar_permisos_rol', rol_id=rol.id)
         
-        messages.success(request, f'Permisos del rol {rol} actualizados exitosamente.')
+        messages.success(
+            request,
+            f'Permisos del rol {rol} actualizados exitosamente ({agregados} agregados, {quitados} quitados).'
+        )
         return redirect('lista_usuarios')
     
-    # Agrupar permisos por módulo
-    permisos_por_modulo = {}
-    for permiso in Permiso.objects.all():
-        if permiso.modulo not in permisos_por_modulo:
-            permisos_por_modulo[permiso.modulo] = []
-        permisos_por_modulo[permiso.modulo].append(permiso)
+    # Agrupar permisos por módulo (ya vienen ordenados por módulo)
+    permisos_por_modulo = {
+        modulo: list(permisos)
+        for modulo, permisos in groupby(Permiso.objects.order_by('modulo', 'nombre'), key=attrgetter('modulo'))
+    }
     
     # Obtener permisos actuales del rol
     permisos_actuales = RolPermiso.objects.filter(rol=rol).values_list('permiso_id', flat=True)
@@ -240,6 +249,28 @@ def gestionar_permisos_rol(request, rol_id):
     return render(request, 'usuarios/gestionar_permisos.html', context)
 
 
+@login_required
+@permiso_requerido('editar_usuarios')
+@require_http_methods(["POST"])
+def asignar_permisos_masivo(request):
+    """
+    Cambios de permisos para varios roles en una sola petición (JSON):
+        {"agregar": {"ventas": ["ver_reportes"]}, "quitar": {"caja": ["crear_clientes"]}}
+    """
+    try:
+        data = json.loads(request.body)
+        resultado = aplicar_cambios_permisos(
+            agregar=data.get('agregar'),
+            quitar=data.get('quitar')
+        )
+    except json.JSONDecodeError:
+        return JsonResponse({'success': False, 'error': 'JSON inválido'}, status=400)
+    except (ValueError, AttributeError, TypeError) as e:
+        return JsonResponse({'success': False, 'error': str(e)}, status=400)
+    
+    return JsonResponse({'success': True, **resultado})
+
+
 @login_required
 def cambiar_password(request):
     if request.method == 'POST':
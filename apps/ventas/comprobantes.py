@@ -0,0 +1,411 @@
+# apps/ventas/comprobantes.py
+
+import hashlib
+import io
+import os
+import threading
+from pathlib import Path
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Prefetch
+from django.utils import timezone
+
+from reportlab.lib import colors
+from reportlab.lib.enums import TA_CENTER
+from reportlab.lib.pagesizes import letter
+from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+from reportlab.lib.units import inch
+from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer, PageBreak
+
+from .models import Venta, DetalleVenta, Devolucion, Caja, CierreCaja
+
+
+# Cambiar al modificar el diseño del comprobante: invalida toda la caché
+VERSION_FORMATO = 1
+
+# Lotes con más ventas que esto se arman en la cola de trabajos (run_workers)
+LIMITE_LOTE_SINCRONO = 200
+
+
+# ======================================================
+#  DISEÑO
+# ======================================================
+
+_ESTILOS = getSampleStyleSheet()
+
+ESTILO_TITULO = ParagraphStyle(
+    'TituloComprobante',
+    parent=_ESTILOS['Heading1'],
+    fontSize=24,
+    textColor=colors.HexColor('#4472C4'),
+    spaceAfter=20,
+    alignment=TA_CENTER
+)
+
+ESTILO_ANULADA = ParagraphStyle(
+    'VentaAnulada',
+    parent=ESTILO_TITULO,
+    fontSize=16,
+    textColor=colors.HexColor('#EF4444'),
+    spaceAfter=10
+)
+
+ESTILO_SECCION = _ESTILOS['Heading2']
+
+ESTILO_INFO = TableStyle([
+    ('BACKGROUND', (0, 0), (0, -1), colors.HexColor('#E7E9EB')),
+    ('TEXTCOLOR', (0, 0), (0, -1), colors.black),
+    ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+    ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
+    ('GRID', (0, 0), (-1, -1), 1, colors.black),
+])
+
+ESTILO_PRODUCTOS = TableStyle([
+    ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#4472C4')),
+    ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+    ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+    ('ALIGN', (0, 1), (0, -1), 'LEFT'),
+    ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+    ('GRID', (0, 0), (-1, -1), 1, colors.black),
+])
+
+ESTILO_TOTALES = TableStyle([
+    ('ALIGN', (0, 0), (-1, -1), 'RIGHT'),
+    ('FONTNAME', (0, -1), (-1, -1), 'Helvetica-Bold'),
+    ('FONTSIZE', (0, -1), (-1, -1), 14),
+    ('TEXTCOLOR', (0, -1), (-1, -1), colors.HexColor('#4472C4')),
+])
+
+
+def _detalles(venta):
+    return list(venta.detalles.filter(status=1).select_related('producto'))
+
+
+def _devoluciones(venta):
+    return list(venta.devoluciones.filter(estado='procesada').select_related('nota_credito'))
+
+
+def elementos_comprobante(venta, detalles, devoluciones):
+    """Flowables de reportlab con el comprobante de una venta"""
+    elementos = [Paragraph(f"Venta #{venta.codigo_venta}", ESTILO_TITULO)]
+    if venta.estado_venta == 0:
+        elementos.append(Paragraph("ANULADA", ESTILO_ANULADA))
+
+    # Información general
+    cliente = f"{venta.cliente.nombre} {venta.cliente.apellido}" if venta.cliente else "Consumidor Final"
+    info_data = [
+        ['Fecha:', timezone.localtime(venta.fecha).strftime('%d/%m/%Y %H:%M')],
+        ['Cliente:', cliente],
+        ['Vendedor:', venta.usuario.get_full_name() or venta.usuario.username if venta.usuario else '-'],
+        ['Método de Pago:', venta.get_tipo_pago_display()],
+        ['Estado:', venta.get_estado_venta_display()],
+    ]
+    if venta.caja_id:
+        info_data.append(['Caja:', f"#{venta.caja_id}"])
+
+    info_table = Table(info_data, colWidths=[2*inch, 4*inch])
+    info_table.setStyle(ESTILO_INFO)
+    elementos += [info_table, Spacer(1, 0.4*inch)]
+
+    # Productos
+    elementos += [Paragraph("Productos", ESTILO_SECCION), Spacer(1, 0.15*inch)]
+
+    productos_data = [['Producto', 'Cantidad', 'Precio Unit.', 'Subtotal']]
+    for detalle in detalles:
+        productos_data.append([
+            (detalle.producto.descripcion or '')[:45] if detalle.producto else 'Producto eliminado',
+            str(detalle.cantidad),
+            f'${detalle.precio_unitario:.2f}',
+            f'${detalle.subtotal:.2f}'
+        ])
+
+    productos_table = Table(productos_data, colWidths=[3*inch, 1*inch, 1.5*inch, 1.5*inch], repeatRows=1)
+    productos_table.setStyle(ESTILO_PRODUCTOS)
+    elementos += [productos_table, Spacer(1, 0.3*inch)]
+
+    # Totales
+    totales_data = [['Subtotal:', f'${venta.subtotal:.2f}']]
+    if venta.descuento_monto:
+        totales_data.append([f'Descuento ({venta.descuento_porcentaje:.0f}%):', f'-${venta.descuento_monto:.2f}'])
+    if venta.tipo_pago == 'mixto':
+        totales_data.append(['Efectivo:', f'${venta.monto_efectivo:.2f}'])
+        totales_data.append(['Tarjeta:', f'${venta.monto_tarjeta:.2f}'])
+    totales_data.append(['TOTAL:', f'${venta.total:.2f}'])
+
+    totales_table = Table(totales_data, colWidths=[4.5*inch, 2*inch])
+    totales_table.setStyle(ESTILO_TOTALES)
+    elementos.append(totales_table)
+
+    # Devoluciones procesadas
+    if devoluciones:
+        elementos += [Spacer(1, 0.3*inch), Paragraph("Devoluciones", ESTILO_SECCION), Spacer(1, 0.15*inch)]
+        devoluciones_data = [['Devolución', 'Fecha', 'Nota de Crédito', 'Monto']]
+        for devolucion in devoluciones:
+            nota = getattr(devolucion, 'nota_credito', None)
+            devoluciones_data.append([
+                devolucion.codigo_devolucion,
+                timezone.localtime(devolucion.fecha_procesamiento).strftime('%d/%m/%Y')
+                if devolucion.fecha_procesamiento else '-',
+                nota.codigo_nota if nota else '-',
+                f'${devolucion.monto_total:.2f}'
+            ])
+        devoluciones_table = Table(devoluciones_data, colWidths=[1.5*inch, 1.5*inch, 2*inch, 1.5*inch])
+        devoluciones_table.setStyle(ESTILO_PRODUCTOS)
+        elementos.append(devoluciones_table)
+
+    return elementos
+
+
+def generar_comprobante(venta, detalles=None, devoluciones=None):
+    """PDF del comprobante en bytes (sin caché)"""
+    if detalles is None:
+        detalles = _detalles(venta)
+    if devoluciones is None:
+        devoluciones = _devoluciones(venta)
+
+    buffer = io.BytesIO()
+    SimpleDocTemplate(buffer, pagesize=letter).build(elementos_comprobante(venta, detalles, devoluciones))
+    return buffer.getvalue()
+
+
+# ======================================================
+#  CACHÉ EN DISCO
+# ======================================================
+#
+# Un archivo por (venta, versión): el nombre incluye un hash de id, versión
+# de la venta y VERSION_FORMATO, así que un comprobante viejo nunca se sirve
+# aunque quede en disco. Al anular o devolver se incrementa Venta.version y se
+# borran los archivos de esa venta. Tamaño acotado por COMPROBANTES_CACHE_MB:
+# al pasarse se borran los menos usados (mtime, que se actualiza en cada uso).
+
+_lock = threading.Lock()
+# Tamaño aproximado de la carpeta según este proceso (None = hay que medirla)
+_tamano_cache = None
+
+
+def _directorio():
+    directorio = Path(getattr(
+        settings, 'COMPROBANTES_CACHE_DIR', Path(settings.BASE_DIR) / 'cache' / 'comprobantes'
+    ))
+    directorio.mkdir(parents=True, exist_ok=True)
+    return directorio
+
+
+def _limite_bytes():
+    return getattr(settings, 'COMPROBANTES_CACHE_MB', 200) * 1024 * 1024
+
+
+def es_cacheable(venta):
+    """Pagadas y anuladas no cambian (salvo anulación/devolución); las pendientes sí"""
+    return venta.estado_venta != 1
+
+
+def ruta_comprobante(venta):
+    clave = hashlib.sha256(f'{venta.id}:{venta.version}:{VERSION_FORMATO}'.encode()).hexdigest()[:32]
+    return _directorio() / f'{venta.id}-{clave}.pdf'
+
+
+def _recortar():
+    """Borra los comprobantes menos usados hasta quedar en el 90% del límite"""
+    global _tamano_cache
+    archivos = []
+    total = 0
+    for entrada in os.scandir(_directorio()):
+        if entrada.name.endswith('.pdf'):
+            estado = entrada.stat()
+            archivos.append((estado.st_mtime, estado.st_size, entrada.path))
+            total += estado.st_size
+
+    limite = _limite_bytes()
+    if total > limite:
+        for _, tamano, ruta in sorted(archivos):
+            try:
+                os.remove(ruta)
+            except FileNotFoundError:
+                pass
+            total -= tamano
+            if total <= limite * 0.9:
+                break
+
+    _tamano_cache = total
+
+
+def _guardar(ruta, contenido):
+    global _tamano_cache
+    temporal = ruta.with_name(f'{ruta.name}.{os.getpid()}.{threading.get_ident()}.tmp')
+    temporal.write_bytes(contenido)
+    os.replace(temporal, ruta)
+
+    with _lock:
+        # Se mide la carpeta la primera vez y cuando la estimación pasa el límite
+        # (otros procesos también escriben, así que es aproximada)
+        if _tamano_cache is None or _tamano_cache + len(contenido) > _limite_bytes():
+            _recortar()
+        else:
+            _tamano_cache += len(contenido)
+
+
+def comprobante_pdf(venta, detalles=None, devoluciones=None):
+    """
+    PDF del comprobante en bytes. Las ventas cacheables se sirven desde
+    disco si ya se generaron; si no, se generan y se guardan.
+    `detalles` y `devoluciones` evitan consultas cuando ya están cargados.
+    """
+    if not es_cacheable(venta):
+        return generar_comprobante(venta, detalles, devoluciones)
+
+    ruta = ruta_comprobante(venta)
+    try:
+        contenido = ruta.read_bytes()
+        os.utime(ruta)  # uso reciente para el LRU
+        return contenido
+    except FileNotFoundError:
+        pass
+
+    contenido = generar_comprobante(venta, detalles, devoluciones)
+    _guardar(ruta, contenido)
+    return contenido
+
+
+def invalidar_comprobante(venta):
+    """
+    Llamar al anular la venta o procesar una devolución: incrementa la
+    versión (el comprobante cacheado deja de coincidir) y borra sus archivos.
+    """
+    Venta.objects.filter(pk=venta.pk).update(version=F('version') + 1)
+    venta.refresh_from_db(fields=['version'])
+
+    def borrar():
+        for ruta in _directorio().glob(f'{venta.pk}-*.pdf'):
+            try:
+                ruta.unlink()
+            except FileNotFoundError:
+                pass
+
+    transaction.on_commit(borrar)
+
+
+# ======================================================
+#  LOTES (todas las ventas de una caja o de un turno)
+# ======================================================
+
+def ventas_de_caja(caja):
+    """Ventas que cuenta la caja (pendientes y pagadas)"""
+    return Venta.objects.filter(caja=caja, estado_venta__in=[1, 2])
+
+
+def ventas_de_cierre(cierre):
+    """Ventas que cuenta el cierre de turno (pagadas dentro del horario)"""
+    return cierre.ventas_turno()
+
+
+def lote_comprobantes(parametros):
+    """
+    Lee `caja` o `cierre` (uno solo) de los parámetros y devuelve
+    (ventas, nombre_de_archivo). Lanza ValueError si no son válidos.
+    """
+    caja_id = parametros.get('caja') or ''
+    cierre_id = parametros.get('cierre') or ''
+    if bool(caja_id) == bool(cierre_id):
+        raise ValueError("Indicar una caja o un cierre de turno")
+
+    if caja_id:
+        caja = Caja.objects.filter(pk=caja_id).first() if str(caja_id).isdigit() else None
+        if caja is None:
+            raise ValueError(f"Caja inexistente: {caja_id}")
+        return ventas_de_caja(caja), f'comprobantes_caja_{caja.id}.pdf'
+
+    cierre = CierreCaja.objects.filter(pk=cierre_id).first() if str(cierre_id).isdigit() else None
+    if cierre is None:
+        raise ValueError(f"Cierre inexistente: {cierre_id}")
+    return ventas_de_cierre(cierre), f'comprobantes_{cierre.fecha.strftime("%Y%m%d")}_{cierre.turno}.pdf'
+
+
+def cargar_lote(ventas):
+    """
+    Ventas con todo lo que necesita el comprobante: una consulta para las
+    ventas (con cliente y usuario), otra para los detalles con sus productos
+    y otra para las devoluciones procesadas, sin importar cuántas ventas sean.
+    """
+    return list(
+        ventas.select_related('cliente', 'usuario').prefetch_related(
+            Prefetch(
+                'detalles',
+                queryset=DetalleVenta.objects.filter(status=1).select_related('producto').order_by('id'),
+                to_attr='detalles_comprobante'
+            ),
+            Prefetch(
+                'devoluciones',
+                queryset=Devolucion.objects.filter(estado='procesada').select_related('nota_credito').order_by('id'),
+                to_attr='devoluciones_comprobante'
+            ),
+        ).order_by('fecha', 'id')
+    )
+
+
+def ruta_lote(firma):
+    """
+    `firma`: pares (id, versión) de todas las ventas del lote. Si alguna se
+    anula o tiene una devolución, o entra una venta nueva, cambia el archivo.
+    """
+    texto = ','.join(f'{venta_id}:{version}' for venta_id, version in firma)
+    clave = hashlib.sha256(f'{texto}:{VERSION_FORMATO}'.encode()).hexdigest()[:32]
+    return _directorio() / f'lote-{clave}.pdf'
+
+
+def escribir_lote(ventas, destino, avance=None):
+    """
+    Un PDF con el comprobante de cada venta (uno por página o más si es
+    largo). `ventas` viene de cargar_lote. `avance(ventas_listas)` se llama
+    a medida que se arman los comprobantes.
+    """
+    elementos = []
+    for numero, venta in enumerate(ventas, start=1):
+        if elementos:
+            elementos.append(PageBreak())
+        elementos += elementos_comprobante(venta, venta.detalles_comprobante, venta.devoluciones_comprobante)
+        if avance and numero % 100 == 0:
+            avance(numero)
+
+    if not elementos:
+        elementos.append(Paragraph("Sin ventas", ESTILO_SECCION))
+
+    SimpleDocTemplate(destino, pagesize=letter).build(elementos)
+
+
+def _lote_cacheado(ventas):
+    """Ruta del lote en la caché, o None si tiene pendientes (no se cachea)"""
+    firma = list(ventas.order_by('fecha', 'id').values_list('id', 'version', 'estado_venta'))
+    if any(estado == 1 for _, _, estado in firma):
+        return None
+    return ruta_lote((venta_id, version) for venta_id, version, _ in firma)
+
+
+def lote_en_cache(ventas):
+    ruta = _lote_cacheado(ventas)
+    return ruta is not None and ruta.exists()
+
+
+def comprobantes_lote_pdf(ventas, avance=None):
+    """
+    PDF con los comprobantes de un queryset de ventas, en bytes. Si ninguna
+    está pendiente el lote se guarda en la caché de comprobantes (mismo
+    límite y LRU que los individuales); un acierto cuesta una sola consulta.
+    """
+    ruta = _lote_cacheado(ventas)
+    if ruta is not None:
+        try:
+            contenido = ruta.read_bytes()
+            os.utime(ruta)  # uso reciente para el LRU
+            return contenido
+        except FileNotFoundError:
+            pass
+
+    buffer = io.BytesIO()
+    escribir_lote(cargar_lote(ventas), buffer, avance)
+    contenido = buffer.getvalue()
+
+    if ruta is not None:
+        _guardar(ruta, contenido)
+    return contenido
@@ -0,0 +1,513 @@
+# apps/ventas/exportacion.py
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from datetime import datetime
+from decimal import Decimal
+import csv
+import json
+import zlib
+
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Font, Alignment, PatternFill
+from openpyxl.utils import get_column_letter
+
+from reportlab.lib import colors
+from reportlab.lib.enums import TA_CENTER
+from reportlab.lib.pagesizes import letter
+from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+from reportlab.lib.units import inch
+from reportlab.pdfgen import canvas
+from reportlab.platypus import Paragraph, Table, TableStyle
+
+from .models import Venta, DetalleVenta, AuditoriaMovimiento
+from .resumenes import rango_fechas
+from .totales import METODOS_PAGO
+
+
+# Filas que se traen de la base por vuelta (memoria constante)
+TAMANO_LOTE = 2000
+
+# Listados con más ventas que esto se arman en la cola de trabajos (run_workers)
+LIMITE_EXPORTACION_SINCRONA = 5000
+
+ESTADOS_VENTA = dict(Venta.ESTADO_VENTA)
+TIPOS_PAGO = dict(Venta.TIPO_PAGO)
+
+
+def filtros_ventas(params):
+    """
+    Lee fecha_desde, fecha_hasta (AAAA-MM-DD) y tipo_pago de un QueryDict,
+    con los mismos nombres que reporte_ventas. Los que faltan quedan en None.
+    Lanza ValueError si una fecha o el tipo de pago no son válidos.
+    """
+    desde = params.get('fecha_desde') or None
+    hasta = params.get('fecha_hasta') or None
+    tipo_pago = params.get('tipo_pago') or None
+
+    if desde:
+        desde = datetime.strptime(desde, '%Y-%m-%d').date()
+    if hasta:
+        hasta = datetime.strptime(hasta, '%Y-%m-%d').date()
+    if tipo_pago and tipo_pago not in METODOS_PAGO:
+        raise ValueError(f"Tipo de pago inválido: {tipo_pago}")
+
+    return desde, hasta, tipo_pago
+
+
+def filtro_caja(params):
+    """Id de caja del parámetro `caja`, o None. Lanza ValueError si no es un número"""
+    caja = params.get('caja') or None
+    return int(caja) if caja else None
+
+
+def ventas_filtradas(desde=None, hasta=None, tipo_pago=None, caja_id=None):
+    """Ventas del rango de días locales [desde, hasta], ordenadas por id"""
+    ventas = Venta.objects.order_by('id')
+    if caja_id:
+        ventas = ventas.filter(caja_id=caja_id)
+    if desde:
+        ventas = ventas.filter(fecha_local__gte=desde)
+    if hasta:
+        ventas = ventas.filter(fecha_local__lte=hasta)
+    if tipo_pago:
+        ventas = ventas.filter(tipo_pago=tipo_pago)
+    return ventas
+
+
+# ======================================================
+#  EXCEL (modo sólo escritura)
+# ======================================================
+
+# (encabezado, ancho): anchos fijos, no se recorren las celdas para calcularlos
+COLUMNAS_EXCEL = [
+    ('Código', 10),
+    ('Fecha', 17),
+    ('Cliente', 30),
+    ('Vendedor', 16),
+    ('Tipo de Pago', 18),
+    ('Subtotal', 13),
+    ('Descuento', 13),
+    ('Total', 13),
+    ('Estado', 11),
+    ('Caja', 9),
+]
+
+CAMPOS_EXCEL = (
+    'codigo_venta', 'fecha', 'cliente__nombre', 'cliente__apellido', 'usuario__username',
+    'tipo_pago', 'subtotal', 'descuento_monto', 'total', 'estado_venta', 'caja_id',
+)
+
+FORMATO_MONTO = '#,##0.00'
+FORMATO_FECHA = 'DD/MM/YYYY HH:MM'
+
+
+def escribir_ventas_excel(ventas, destino, avance=None):
+    """
+    Escribe las ventas en un .xlsx con openpyxl en modo write_only: las filas
+    salen de la base con values_list().iterator() y se vuelcan a disco a medida
+    que se agregan, así la memoria no crece con la cantidad de ventas.
+    `destino` es una ruta o un archivo abierto en modo binario.
+    `avance(filas)` se llama cada TAMANO_LOTE filas escritas.
+    """
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet("Ventas")
+
+    for indice, (_, ancho) in enumerate(COLUMNAS_EXCEL, start=1):
+        ws.column_dimensions[get_column_letter(indice)].width = ancho
+    ws.freeze_panes = 'A2'
+
+    # Estilos (una sola instancia para todas las celdas del encabezado)
+    header_font = Font(bold=True, color="FFFFFF")
+    header_fill = PatternFill(start_color="4472C4", end_color="4472C4", fill_type="solid")
+    center_align = Alignment(horizontal="center", vertical="center")
+
+    encabezado = []
+    for titulo, _ in COLUMNAS_EXCEL:
+        celda = WriteOnlyCell(ws, value=titulo)
+        celda.font = header_font
+        celda.fill = header_fill
+        celda.alignment = center_align
+        encabezado.append(celda)
+    ws.append(encabezado)
+
+    zona = timezone.get_current_timezone()
+
+    filas = ventas.values_list(*CAMPOS_EXCEL).iterator(chunk_size=TAMANO_LOTE)
+    for numero, (codigo, fecha, nombre, apellido, vendedor, tipo_pago,
+                 subtotal, descuento, total, estado_venta, caja_id) in enumerate(filas, start=1):
+        # Excel no admite zonas horarias: se escribe la hora local
+        fecha_celda = WriteOnlyCell(ws, value=fecha.astimezone(zona).replace(tzinfo=None))
+        fecha_celda.number_format = FORMATO_FECHA
+
+        montos = []
+        for monto in (subtotal, descuento, total):
+            celda = WriteOnlyCell(ws, value=monto or Decimal('0'))
+            celda.number_format = FORMATO_MONTO
+            montos.append(celda)
+
+        ws.append([
+            codigo,
+            fecha_celda,
+            f"{nombre} {apellido}" if nombre else "Consumidor Final",
+            vendedor or '',
+            TIPOS_PAGO.get(tipo_pago, tipo_pago),
+            *montos,
+            ESTADOS_VENTA.get(estado_venta, estado_venta),
+            f"#{caja_id}" if caja_id else "Sin caja",
+        ])
+
+        if avance and numero % TAMANO_LOTE == 0:
+            avance(numero)
+
+    wb.save(destino)
+
+
+# ======================================================
+#  PDF (listado paginado)
+# ======================================================
+
+# Estilos creados una sola vez por proceso, no en cada exportación
+_ESTILOS = getSampleStyleSheet()
+
+ESTILO_TITULO_PDF = ParagraphStyle(
+    'TituloListado',
+    parent=_ESTILOS['Heading1'],
+    fontSize=20,
+    textColor=colors.HexColor('#4472C4'),
+    spaceAfter=6,
+    alignment=TA_CENTER
+)
+
+ESTILO_SUBTITULO_PDF = ParagraphStyle(
+    'SubtituloListado',
+    parent=_ESTILOS['Normal'],
+    fontSize=9,
+    textColor=colors.HexColor('#6B7280'),
+    alignment=TA_CENTER
+)
+
+ESTILO_TABLA_PDF = TableStyle([
+    ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#4472C4')),
+    ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+    ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+    ('FONTSIZE', (0, 0), (-1, -1), 8),
+    ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+    ('ALIGN', (2, 1), (2, -1), 'LEFT'),
+    ('ALIGN', (-1, 1), (-1, -1), 'RIGHT'),
+    ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, colors.HexColor('#F3F4F6')]),
+    ('GRID', (0, 0), (-1, -1), 0.5, colors.HexColor('#9CA3AF')),
+    ('TOPPADDING', (0, 0), (-1, -1), 2),
+    ('BOTTOMPADDING', (0, 0), (-1, -1), 2),
+])
+
+ENCABEZADO_PDF = ['Código', 'Fecha', 'Cliente', 'Tipo de Pago', 'Estado', 'Caja', 'Total']
+ANCHOS_PDF = [0.8*inch, 1.2*inch, 2.1*inch, 1.3*inch, 0.8*inch, 0.6*inch, 0.9*inch]
+
+CAMPOS_PDF = (
+    'codigo_venta', 'fecha', 'cliente__nombre', 'cliente__apellido',
+    'tipo_pago', 'estado_venta', 'caja_id', 'total',
+)
+
+# Filas por tabla: una tabla por página (la primera lleva el título)
+FILAS_POR_PAGINA = 48
+FILAS_PRIMERA_PAGINA = 42
+
+_MARGEN = 0.5*inch
+
+
+def filas_pdf_ventas(ventas):
+    """Filas ya formateadas para el listado, leídas de a lotes con values_list"""
+    zona = timezone.get_current_timezone()
+    for codigo, fecha, nombre, apellido, tipo_pago, estado_venta, caja_id, total in (
+        ventas.values_list(*CAMPOS_PDF).iterator(chunk_size=TAMANO_LOTE)
+    ):
+        yield [
+            str(codigo),
+            fecha.astimezone(zona).strftime('%d/%m/%Y %H:%M'),
+            f"{nombre} {apellido}"[:32] if nombre else "Consumidor Final",
+            TIPOS_PAGO.get(tipo_pago, tipo_pago),
+            ESTADOS_VENTA.get(estado_venta, estado_venta),
+            f"#{caja_id}" if caja_id else "-",
+            f"${total:,.2f}",
+        ]
+
+
+def escribir_pdf_listado(filas, destino, titulo, subtitulo='', avance=None):
+    """
+    Dibuja el listado página por página: cada página es una Table chica
+    (FILAS_POR_PAGINA filas) que se arma, se dibuja y se descarta. El costo de
+    maquetado crece en forma lineal y en memoria sólo queda el contenido
+    comprimido de las páginas ya dibujadas, no una Table con todas las filas.
+    `avance(filas)` se llama después de cada página.
+    """
+    lienzo = canvas.Canvas(destino, pagesize=letter, pageCompression=1)
+    ancho, alto = letter
+    ancho_util = ancho - 2 * _MARGEN
+    escritas = 0
+    pagina = 0
+
+    def dibujar_pagina(lote):
+        nonlocal pagina
+        pagina += 1
+        y = alto - _MARGEN
+
+        if pagina == 1:
+            for texto, estilo in ((titulo, ESTILO_TITULO_PDF), (subtitulo, ESTILO_SUBTITULO_PDF)):
+                if texto:
+                    parrafo = Paragraph(texto, estilo)
+                    _, h = parrafo.wrapOn(lienzo, ancho_util, alto)
+                    parrafo.drawOn(lienzo, _MARGEN, y - h)
+                    y -= h + estilo.spaceAfter + 4
+
+        tabla = Table([ENCABEZADO_PDF] + lote, colWidths=ANCHOS_PDF)
+        tabla.setStyle(ESTILO_TABLA_PDF)
+        _, h = tabla.wrapOn(lienzo, ancho_util, y)
+        tabla.drawOn(lienzo, _MARGEN, y - h)
+
+        lienzo.setFont('Helvetica', 8)
+        lienzo.drawRightString(ancho - _MARGEN, _MARGEN / 2, f"Página {pagina}")
+        lienzo.showPage()
+
+    lote = []
+    limite = FILAS_PRIMERA_PAGINA
+    for fila in filas:
+        lote.append(fila)
+        if len(lote) == limite:
+            dibujar_pagina(lote)
+            escritas += len(lote)
+            lote = []
+            limite = FILAS_POR_PAGINA
+            if avance:
+                avance(escritas)
+
+    if lote or pagina == 0:
+        dibujar_pagina(lote)
+
+    lienzo.save()
+
+
+def escribir_ventas_pdf(ventas, destino, subtitulo='', avance=None):
+    """Listado de ventas en PDF paginado (ver escribir_pdf_listado)"""
+    escribir_pdf_listado(filas_pdf_ventas(ventas), destino, "Listado de Ventas", subtitulo, avance)
+
+
+def describir_filtros(desde=None, hasta=None, tipo_pago=None, caja_id=None):
+    """Texto de los filtros aplicados, para el subtítulo del PDF"""
+    partes = []
+    if desde or hasta:
+        partes.append(
+            f"Del {desde.strftime('%d/%m/%Y') if desde else 'inicio'} "
+            f"al {hasta.strftime('%d/%m/%Y') if hasta else 'hoy'}"
+        )
+    if tipo_pago:
+        partes.append(TIPOS_PAGO.get(tipo_pago, tipo_pago))
+    if caja_id:
+        partes.append(f"Caja #{caja_id}")
+    return ' · '.join(partes) or 'Todas las ventas'
+
+
+# ======================================================
+#  CSV / NDJSON (datos crudos para contabilidad y BI)
+# ======================================================
+
+FORMATOS = ('csv', 'ndjson')
+
+# Bytes que se juntan antes de entregar un bloque a la respuesta
+TAMANO_BLOQUE = 64 * 1024
+
+# Por recurso: modelo, campo de fecha para los filtros y columnas
+# (nombre en el archivo, campo para values_list)
+RECURSOS = {
+    'ventas': {
+        'modelo': Venta,
+        'fecha': 'fecha',
+        'columnas': [
+            ('id', 'id'),
+            ('codigo_venta', 'codigo_venta'),
+            ('fecha', 'fecha'),
+            ('cliente_id', 'cliente_id'),
+            ('usuario', 'usuario__username'),
+            ('caja_id', 'caja_id'),
+            ('tipo_pago', 'tipo_pago'),
+            ('estado_venta', 'estado_venta'),
+            ('subtotal', 'subtotal'),
+            ('descuento_porcentaje', 'descuento_porcentaje'),
+            ('descuento_monto', 'descuento_monto'),
+            ('total', 'total'),
+            ('monto_efectivo', 'monto_efectivo'),
+            ('monto_tarjeta', 'monto_tarjeta'),
+        ],
+    },
+    'detalles': {
+        'modelo': DetalleVenta,
+        'fecha': 'venta__fecha',
+        'columnas': [
+            ('id', 'id'),
+            ('venta_id', 'venta_id'),
+            ('codigo_venta', 'venta__codigo_venta'),
+            ('fecha', 'venta__fecha'),
+            ('estado_venta', 'venta__estado_venta'),
+            ('producto_id', 'producto_id'),
+            ('producto_codigo', 'producto__codigo'),
+            ('producto', 'producto__descripcion'),
+            ('categoria_id', 'producto__categoria_id'),
+            ('categoria', 'producto__categoria__nombre'),
+            ('cantidad', 'cantidad'),
+            ('precio_unitario', 'precio_unitario'),
+            ('costo_unitario', 'costo_unitario'),
+            ('subtotal', 'subtotal'),
+        ],
+    },
+    'auditoria': {
+        'modelo': AuditoriaMovimiento,
+        'fecha': 'fecha',
+        'columnas': [
+            ('id', 'id'),
+            ('fecha', 'fecha'),
+            ('usuario', 'usuario__username'),
+            ('accion', 'accion'),
+            ('venta_id', 'venta_id'),
+            ('devolucion_id', 'devolucion_id'),
+            ('descripcion', 'descripcion'),
+            ('datos', 'datos_json'),
+            ('ip', 'ip_address'),
+        ],
+    },
+}
+
+
+def filtros_datos(recurso, params):
+    """
+    Consulta del recurso según los parámetros:
+      fecha_desde / fecha_hasta   rango de días locales (AAAA-MM-DD)
+      desde_id                    sólo filas con id mayor (extracción incremental)
+      desde_fecha                 sólo filas posteriores a ese momento (ISO 8601)
+    Lanza ValueError si el recurso o algún parámetro no son válidos.
+    """
+    if recurso not in RECURSOS:
+        raise ValueError(f"Recurso inválido: {recurso}")
+    config = RECURSOS[recurso]
+    campo_fecha = config['fecha']
+
+    filas = config['modelo'].objects.all()
+
+    desde = params.get('fecha_desde')
+    hasta = params.get('fecha_hasta')
+    if desde:
+        desde = datetime.strptime(desde, '%Y-%m-%d').date()
+        inicio = rango_fechas(desde, desde)[0]
+        filas = filas.filter(**{f'{campo_fecha}__gte': inicio})
+    if hasta:
+        hasta = datetime.strptime(hasta, '%Y-%m-%d').date()
+        fin = rango_fechas(hasta, hasta)[1]
+        filas = filas.filter(**{f'{campo_fecha}__lt': fin})
+
+    desde_id = params.get('desde_id')
+    if desde_id:
+        filas = filas.filter(id__gt=int(desde_id))
+
+    desde_fecha = params.get('desde_fecha')
+    if desde_fecha:
+        momento = parse_datetime(desde_fecha)
+        if momento is None:
+            raise ValueError(f"Fecha inválida: {desde_fecha}")
+        if timezone.is_naive(momento):
+            momento = timezone.make_aware(momento)
+        filas = filas.filter(**{f'{campo_fecha}__gt': momento})
+
+    return filas
+
+
+def _lotes(filas, campos, tamano=TAMANO_LOTE):
+    """
+    Recorre la consulta por id en lotes (keyset: WHERE id > último LIMIT n),
+    sin cursores abiertos durante toda la descarga ni modelos en memoria.
+    """
+    ultimo = 0
+    while True:
+        lote = list(filas.filter(id__gt=ultimo).order_by('id').values_list(*campos)[:tamano])
+        if not lote:
+            return
+        yield lote
+        if len(lote) < tamano:
+            return
+        ultimo = lote[-1][0]
+
+
+def _valor(valor, zona):
+    if isinstance(valor, datetime):
+        return valor.astimezone(zona).isoformat()
+    return valor
+
+
+class _Eco:
+    """Objeto tipo archivo para csv.writer: devuelve lo escrito en vez de guardarlo"""
+
+    def write(self, texto):
+        return texto
+
+
+def _lineas_csv(nombres, lotes):
+    zona = timezone.get_current_timezone()
+    escritor = csv.writer(_Eco())
+    yield escritor.writerow(nombres)
+    for lote in lotes:
+        for fila in lote:
+            yield escritor.writerow([
+                json.dumps(valor, cls=DjangoJSONEncoder) if isinstance(valor, (dict, list))
+                else _valor(valor, zona)
+                for valor in fila
+            ])
+
+
+def _lineas_ndjson(nombres, lotes):
+    zona = timezone.get_current_timezone()
+    for lote in lotes:
+        for fila in lote:
+            yield json.dumps(
+                {nombre: _valor(valor, zona) for nombre, valor in zip(nombres, fila)},
+                cls=DjangoJSONEncoder, ensure_ascii=False
+            ) + '\n'
+
+
+def _en_bloques(lineas, comprimir=False):
+    """Junta líneas en bloques de ~TAMANO_BLOQUE bytes, opcionalmente en gzip"""
+    compresor = zlib.compressobj(wbits=31) if comprimir else None  # 31 = formato gzip
+    partes, tamano = [], 0
+
+    for linea in lineas:
+        datos = linea.encode('utf-8')
+        partes.append(datos)
+        tamano += len(datos)
+        if tamano >= TAMANO_BLOQUE:
+            bloque = b''.join(partes)
+            partes, tamano = [], 0
+            bloque = compresor.compress(bloque) if compresor else bloque
+            if bloque:
+                yield bloque
+
+    bloque = b''.join(partes)
+    if compresor:
+        bloque = compresor.compress(bloque) + compresor.flush()
+    if bloque:
+        yield bloque
+
+
+def exportar_datos(filas, recurso, formato='csv', comprimir=False):
+    """
+    Generador de bytes con las filas del recurso en CSV o NDJSON (una fila
+    JSON por línea), para usar con StreamingHttpResponse. La memoria usada
+    no depende de la cantidad de filas.
+    """
+    if formato not in FORMATOS:
+        raise ValueError(f"Formato inválido: {formato}")
+
+    columnas = RECURSOS[recurso]['columnas']
+    nombres = [nombre for nombre, _ in columnas]
+    lotes = _lotes(filas, [campo for _, campo in columnas])
+
+    lineas = _lineas_csv(nombres, lotes) if formato == 'csv' else _lineas_ndjson(nombres, lotes)
+    return _en_bloques(lineas, comprimir)
@@ -0,0 +1,224 @@
+# apps/ventas/management/commands/benchmark_cajeros.py
+
+import json
+import multiprocessing
+import random
+import statistics
+import tempfile
+import time
+from contextlib import contextmanager
+from decimal import Decimal
+from pathlib import Path
+
+import django
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.urls import reverse
+
+from motoshop_django.base_datos import PERFILES, perfil_base_datos
+
+
+CANTIDAD_PRODUCTOS = 50
+TIPOS_PAGO = ['efectivo', 'debito', 'credito', 'transferencia']
+
+
+def _usar_base(configuracion):
+    """Cambia la configuración de la base 'default' del proceso"""
+    actual = connections.settings['default']
+    connections['default'].close()
+    del connections['default']
+    actual.clear()
+    actual.update(connections.configure_settings({'default': configuracion})['default'])
+
+
+@contextmanager
+def _base_de_prueba(perfil, directorio):
+    """
+    Reemplaza la base 'default' por una base nueva y migrada con la
+    configuración del perfil (como el runner de tests) y la borra al salir.
+    """
+    configuracion = perfil_base_datos(perfil, settings.BASE_DIR)
+    if configuracion['ENGINE'].endswith('sqlite3'):
+        # En archivo: una base en memoria no tiene los bloqueos reales
+        configuracion['TEST'] = {'NAME': str(Path(directorio) / f'benchmark_{perfil}.sqlite3')}
+
+    respaldo = dict(connections.settings['default'])
+    _usar_base(configuracion)
+    try:
+        connections['default'].creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            # Con el nombre de la base de prueba, para los procesos de los cajeros
+            yield dict(connections.settings['default'])
+        finally:
+            conexion = connections['default']
+            conexion.close()
+            # El pool mantiene conexiones abiertas, que impedirían borrar la base
+            if hasattr(conexion, 'close_pool'):
+                conexion.close_pool()
+            conexion.creation.destroy_test_db(configuracion['NAME'], verbosity=0)
+    finally:
+        _usar_base(respaldo)
+
+
+def _preparar(cajeros):
+    """Usuarios con su caja abierta y productos con stock de sobra"""
+    from django.contrib.auth.models import User
+    from apps.inventario.models import Producto
+    from apps.ventas.models import Caja
+
+    Producto.objects.bulk_create([
+        Producto(
+            codigo=900000 + numero,
+            descripcion=f'Producto benchmark {numero}',
+            precio_costo=Decimal('100.00'),
+            precio_venta=Decimal(150 + numero * 10),
+            stock=10 ** 6,
+        )
+        for numero in range(CANTIDAD_PRODUCTOS)
+    ])
+    productos = list(Producto.objects.values_list('id', 'precio_venta'))
+
+    usuarios = []
+    for numero in range(cajeros):
+        usuario = User.objects.create_user(f'cajero_{numero + 1}')
+        Caja.objects.create(usuario=usuario)
+        usuarios.append(usuario.id)
+
+    return productos, usuarios
+
+
+def _cajero(configuracion, usuario_id, productos, cantidad, barrera, resultados):
+    """
+    Registra `cantidad` ventas seguidas, como un cajero sin pausas.
+    Corre en un proceso propio, como cada worker del servidor.
+    """
+    try:
+        django.setup()
+        from django.contrib.auth.models import User
+        from django.contrib.messages import get_messages
+        from django.test import Client
+        from django.test.utils import setup_test_environment
+
+        setup_test_environment()
+        _usar_base(configuracion)
+
+        cliente = Client()
+        cliente.force_login(User.objects.get(pk=usuario_id))
+    except Exception:
+        barrera.abort()  # para no dejar esperando a los demás
+        raise
+    azar = random.Random(usuario_id)
+    url = reverse('crear_venta')
+    tiempos, bloqueos, errores = [], 0, 0
+
+    barrera.wait()
+    for _ in range(cantidad):
+        carrito = []
+        for producto_id, precio in azar.sample(productos, 3):
+            unidades = azar.randint(1, 2)
+            carrito.append({
+                'producto_id': producto_id,
+                'cantidad': unidades,
+                'precio': str(precio),
+                'subtotal': str(precio * unidades),
+            })
+
+        inicio = time.perf_counter()
+        try:
+            respuesta = cliente.post(url, {
+                'tipo_pago': azar.choice(TIPOS_PAGO),
+                'productos': json.dumps(carrito),
+            })
+            # La vista redirige si la venta se registró; si no, deja el error en messages
+            error = '' if respuesta.status_code == 302 else ' '.join(
+                str(mensaje) for mensaje in get_messages(respuesta.wsgi_request)
+            ) or f'HTTP {respuesta.status_code}'
+        except Exception as e:  # p. ej. un bloqueo fuera de la transacción de la vista
+            error = str(e) or e.__class__.__name__
+        tiempos.append(time.perf_counter() - inicio)
+
+        if 'locked' in error or 'busy' in error:
+            bloqueos += 1
+        elif error:
+            errores += 1
+
+    connections.close_all()
+    resultados.put((tiempos, bloqueos, errores))
+
+
+def _percentil(valores, percentil):
+    if len(valores) < 2:
+        return valores[0] if valores else 0
+    return statistics.quantiles(valores, n=100)[percentil - 1]
+
+
+class Command(BaseCommand):
+    help = (
+        'Simula N cajeros registrando ventas en paralelo (crear_venta) sobre una base '
+        'de prueba nueva por perfil y muestra ventas por segundo y errores de bloqueo'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'cajeros', nargs='*', type=int, default=[1, 2, 4, 8],
+            help='Cantidades de cajeros simultáneos a probar (por defecto: 1 2 4 8)'
+        )
+        parser.add_argument('--ventas', type=int, default=50, help='Ventas por cajero (por defecto: 50)')
+        parser.add_argument(
+            '--perfil', action='append', choices=PERFILES,
+            help='Perfil de base de datos a medir; se puede repetir (por defecto: sqlite_basico y sqlite)'
+        )
+
+    def handle(self, *args, **options):
+        if any(cantidad < 1 for cantidad in options['cajeros']) or options['ventas'] < 1:
+            raise CommandError('Las cantidades de cajeros y de ventas deben ser positivas')
+        perfiles = options['perfil'] or ['sqlite_basico', 'sqlite']
+
+        self.stdout.write(
+            f"{'Perfil':<15}{'Cajeros':>8}{'Ventas':>8}{'Ventas/s':>10}{'p95':>10}"
+            f"{'Bloqueos':>10}{'Otros':>8}"
+        )
+
+        with tempfile.TemporaryDirectory() as directorio:
+            for perfil in perfiles:
+                try:
+                    with _base_de_prueba(perfil, directorio) as configuracion:
+                        productos, usuarios = _preparar(max(options['cajeros']))
+                        connections['default'].close()
+                        for cajeros in options['cajeros']:
+                            self._medir(perfil, configuracion, usuarios[:cajeros], productos, options['ventas'])
+                except Exception as e:
+                    self.stdout.write(self.style.WARNING(f'{perfil:<15}no se pudo medir ({e})'))
+
+    def _medir(self, perfil, configuracion, usuarios, productos, ventas):
+        contexto = multiprocessing.get_context('spawn')
+        barrera = contexto.Barrier(len(usuarios) + 1)
+        cola = contexto.Queue()
+        procesos = [
+            contexto.Process(
+                target=_cajero, args=(configuracion, usuario_id, productos, ventas, barrera, cola)
+            )
+            for usuario_id in usuarios
+        ]
+        for proceso in procesos:
+            proceso.start()
+
+        # Arranca cuando todos los cajeros iniciaron Django e ingresaron
+        barrera.wait(timeout=120)
+        inicio = time.perf_counter()
+        resultados = [cola.get() for _ in procesos]
+        segundos = time.perf_counter() - inicio
+        for proceso in procesos:
+            proceso.join()
+
+        tiempos = [tiempo for parcial, _, _ in resultados for tiempo in parcial]
+        bloqueos = sum(bloqueo for _, bloqueo, _ in resultados)
+        errores = sum(error for _, _, error in resultados)
+        registradas = len(tiempos) - bloqueos - errores
+
+        self.stdout.write(
+            f"{perfil:<15}{len(usuarios):>8}{registradas:>8}{registradas / segundos:>10.1f}"
+            f"{_percentil(tiempos, 95) * 1000:>7.0f} ms"
+            f"{bloqueos * 100 / len(tiempos):>9.1f}%{errores:>8}"
+        )
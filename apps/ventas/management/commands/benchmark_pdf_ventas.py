@@ -0,0 +1,120 @@
+# apps/ventas/management/commands/benchmark_pdf_ventas.py
+
+import multiprocessing
+import os
+import tempfile
+import time
+import tracemalloc
+
+import django
+from django.core.management.base import BaseCommand, CommandError
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+# Con una sola Table el maquetado es superlineal: más filas tardan demasiado
+LIMITE_COMPARACION = 20_000
+
+
+def _filas_sinteticas(cantidad):
+    """Filas con el mismo formato que filas_pdf_ventas, sin tocar la base"""
+    tipos = ['Efectivo', 'Tarjeta de Débito', 'Tarjeta de Crédito', 'Transferencia', 'Pago Mixto']
+    for numero in range(cantidad):
+        yield [
+            str(5000 + numero),
+            f"{numero % 28 + 1:02d}/10/2026 {numero % 24:02d}:{numero % 60:02d}",
+            f"Cliente de prueba {numero % 500}",
+            tipos[numero % len(tipos)],
+            'Pagado',
+            f"#{numero % 12 + 1}",
+            f"${(numero % 997) * 13.5:,.2f}",
+        ]
+
+
+def _por_paginas(filas, destino):
+    from apps.ventas.exportacion import escribir_pdf_listado
+
+    escribir_pdf_listado(filas, destino, 'Listado de Ventas')
+
+
+def _una_tabla(filas, destino):
+    """Método anterior: una sola Table con todas las filas"""
+    from reportlab.lib.pagesizes import letter
+    from reportlab.platypus import SimpleDocTemplate, Table
+    from apps.ventas.exportacion import ANCHOS_PDF, ENCABEZADO_PDF, ESTILO_TABLA_PDF
+
+    tabla = Table([ENCABEZADO_PDF] + list(filas), colWidths=ANCHOS_PDF, repeatRows=1)
+    tabla.setStyle(ESTILO_TABLA_PDF)
+    SimpleDocTemplate(destino, pagesize=letter).build([tabla])
+
+
+def _medir(metodo, cantidad):
+    """
+    Corre en un proceso nuevo para que cada medición arranque limpia.
+    Memoria pico: aumento del RSS máximo (getrusage); donde no existe
+    `resource` se usa tracemalloc, que hace la medición bastante más lenta.
+    """
+    django.setup()
+    import apps.ventas.exportacion  # noqa: F401  (las importaciones no cuentan en la medición)
+
+    funcion = {'paginas': _por_paginas, 'tabla': _una_tabla}[metodo]
+
+    with tempfile.NamedTemporaryFile(suffix='.pdf', delete=False) as archivo:
+        ruta = archivo.name
+    try:
+        if resource:
+            rss_inicial = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        else:
+            tracemalloc.start()
+
+        inicio = time.perf_counter()
+        funcion(_filas_sinteticas(cantidad), ruta)
+        segundos = time.perf_counter() - inicio
+
+        if resource:
+            # ru_maxrss está en KB en Linux
+            pico = (resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - rss_inicial) * 1024
+        else:
+            pico = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+        return segundos, pico, os.path.getsize(ruta)
+    finally:
+        os.remove(ruta)
+
+
+class Command(BaseCommand):
+    help = 'Mide tiempo y memoria pico del listado PDF de ventas con filas sintéticas'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'filas', nargs='*', type=int, default=[10_000, 100_000, 1_000_000],
+            help='Cantidades de filas a probar (por defecto: 10000 100000 1000000)'
+        )
+        parser.add_argument(
+            '--comparar', action='store_true',
+            help='Medir también el método anterior (una sola Table), sólo hasta 20000 filas'
+        )
+
+    def _linea(self, metodo, cantidad, segundos, pico, tamano):
+        self.stdout.write(
+            f"{metodo:<14}{cantidad:>10,}{segundos:>10.1f} s{pico / 1024 / 1024:>9.1f} MB"
+            f"{tamano / 1024 / 1024:>10.1f} MB"
+            f"{cantidad / segundos:>12,.0f} filas/s"
+        )
+
+    def handle(self, *args, **options):
+        if any(cantidad < 1 for cantidad in options['filas']):
+            raise CommandError('Las cantidades de filas deben ser positivas')
+
+        self.stdout.write(f"{'Método':<14}{'Filas':>10}{'Tiempo':>12}{'Memoria':>12}{'PDF':>13}")
+
+        contexto = multiprocessing.get_context('spawn')
+        with contexto.Pool(1, maxtasksperchild=1) as pool:
+            for cantidad in options['filas']:
+                self._linea('por páginas', cantidad, *pool.apply(_medir, ('paginas', cantidad)))
+
+                if options['comparar'] and cantidad <= LIMITE_COMPARACION:
+                    self._linea('una tabla', cantidad, *pool.apply(_medir, ('tabla', cantidad)))
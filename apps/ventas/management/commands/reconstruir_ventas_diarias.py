@@ -0,0 +1,37 @@
+# apps/ventas/management/commands/reconstruir_ventas_diarias.py
+
+from django.core.management.base import BaseCommand, CommandError
+from datetime import datetime
+
+from apps.ventas.resumenes import reconstruir_ventas_diarias, reconstruir_productos_diarios
+
+
+class Command(BaseCommand):
+    help = 'Reconstruye los resúmenes diarios (VentaDiaria y ProductoDiario) desde las ventas'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--desde', help='Primer día a reconstruir (AAAA-MM-DD)')
+        parser.add_argument('--hasta', help='Último día a reconstruir (AAAA-MM-DD)')
+
+    def _fecha(self, valor):
+        if not valor:
+            return None
+        try:
+            return datetime.strptime(valor, '%Y-%m-%d').date()
+        except ValueError:
+            raise CommandError(f'Fecha inválida: {valor} (formato AAAA-MM-DD)')
+
+    def handle(self, *args, **options):
+        desde = self._fecha(options['desde'])
+        hasta = self._fecha(options['hasta'])
+
+        if desde and hasta and desde > hasta:
+            raise CommandError('La fecha desde no puede ser posterior a la fecha hasta')
+
+        rango = f"{desde or 'inicio'} a {hasta or 'hoy'}"
+
+        filas = reconstruir_ventas_diarias(desde, hasta)
+        self.stdout.write(self.style.SUCCESS(f'✓ Resumen de ventas diarias reconstruido ({rango}): {filas} filas'))
+
+        filas = reconstruir_productos_diarios(desde, hasta)
+        self.stdout.write(self.style.SUCCESS(f'✓ Resumen de productos por día reconstruido ({rango}): {filas} filas'))
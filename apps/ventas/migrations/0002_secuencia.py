@@ -0,0 +1,69 @@
+# Generated by Django 5.2.18 on 2026-10-17 18:53
+
+from django.db import migrations, models
+from django.db.models import Max
+
+
+def _maximo_sufijo(codigos):
+    """Mayor número de códigos con formato 'DEV-000123' / 'NC-000123'"""
+    maximo = 0
+    for codigo in codigos:
+        try:
+            maximo = max(maximo, int(codigo.rsplit('-', 1)[-1]))
+        except ValueError:
+            continue
+    return maximo
+
+
+def inicializar_secuencias(apps, schema_editor):
+    """Arranca cada serie después del mayor código ya emitido"""
+    Secuencia = apps.get_model('ventas', 'Secuencia')
+    Venta = apps.get_model('ventas', 'Venta')
+    Ticket = apps.get_model('ventas', 'Ticket')
+    Devolucion = apps.get_model('ventas', 'Devolucion')
+    NotaCredito = apps.get_model('ventas', 'NotaCredito')
+    Producto = apps.get_model('inventario', 'Producto')
+
+    ultimos = {
+        'venta': max(Venta.objects.aggregate(m=Max('codigo_venta'))['m'] or 0, 999),
+        'ticket': Ticket.objects.aggregate(m=Max('codigo_ticket'))['m'] or 0,
+        'producto': max(Producto.objects.aggregate(m=Max('codigo'))['m'] or 0, 999),
+        'devolucion': max(
+            _maximo_sufijo(Devolucion.objects.values_list('codigo_devolucion', flat=True)),
+            Devolucion.objects.aggregate(m=Max('id'))['m'] or 0,
+            999,
+        ),
+        'nota_credito': max(
+            _maximo_sufijo(NotaCredito.objects.values_list('codigo_nota', flat=True)),
+            NotaCredito.objects.aggregate(m=Max('id'))['m'] or 0,
+            999,
+        ),
+    }
+
+    for nombre, ultimo in ultimos.items():
+        Secuencia.objects.update_or_create(nombre=nombre, defaults={'ultimo_valor': ultimo})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ventas', '0001_initial'),
+        ('inventario', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Secuencia',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('nombre', models.CharField(max_length=30, unique=True)),
+                ('ultimo_valor', models.BigIntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'Secuencia',
+                'verbose_name_plural': 'Secuencias',
+                'db_table': 'secuencias',
+            },
+        ),
+        migrations.RunPython(inicializar_secuencias, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,76 @@
+# Generated by Django 5.2.18 on 2026-10-17 19:01
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, DecimalField, Q, Sum, Value
+from django.db.models.functions import Coalesce, TruncDate
+from decimal import Decimal
+
+
+def _suma(campo, filtro=None):
+    return Coalesce(Sum(campo, filter=filtro), Value(Decimal('0')), output_field=DecimalField(max_digits=14, decimal_places=2))
+
+
+def cargar_ventas_diarias(apps, schema_editor):
+    """Carga inicial del resumen con las ventas existentes (mismo cálculo que apps.ventas.resumenes)"""
+    Venta = apps.get_model('ventas', 'Venta')
+    VentaDiaria = apps.get_model('ventas', 'VentaDiaria')
+
+    es_mixto = Q(tipo_pago='mixto')
+    filas = Venta.objects.filter(estado_venta__in=[1, 2]).order_by().annotate(
+        dia=TruncDate('fecha')
+    ).values('dia', 'tipo_pago', 'usuario_id').annotate(
+        suma_cantidad=Count('id'),
+        suma_total=_suma('total'),
+        suma_descuento=_suma('descuento_monto'),
+        suma_mixto_efectivo=_suma('monto_efectivo', es_mixto),
+        suma_mixto_tarjeta=_suma('monto_tarjeta', es_mixto),
+    )
+
+    VentaDiaria.objects.bulk_create([
+        VentaDiaria(
+            fecha=fila['dia'],
+            tipo_pago=fila['tipo_pago'],
+            usuario_id=fila['usuario_id'],
+            cantidad=fila['suma_cantidad'],
+            total=fila['suma_total'],
+            descuento=fila['suma_descuento'],
+            mixto_efectivo=fila['suma_mixto_efectivo'],
+            mixto_tarjeta=fila['suma_mixto_tarjeta'],
+        )
+        for fila in filas.iterator()
+    ], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ventas', '0002_secuencia'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VentaDiaria',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha', models.DateField()),
+                ('tipo_pago', models.CharField(choices=[('efectivo', 'Efectivo'), ('debito', 'Tarjeta de Débito'), ('credito', 'Tarjeta de Crédito'), ('transferencia', 'Transferencia'), ('mixto', 'Pago Mixto')], max_length=50)),
+                ('cantidad', models.IntegerField(default=0)),
+                ('total', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('descuento', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('mixto_efectivo', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('mixto_tarjeta', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('usuario', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Venta Diaria',
+                'verbose_name_plural': 'Ventas Diarias',
+                'db_table': 'ventas_diarias',
+                'ordering': ['fecha'],
+                'constraints': [models.UniqueConstraint(fields=('fecha', 'tipo_pago', 'usuario'), name='ventas_diarias_unica')],
+            },
+        ),
+        migrations.RunPython(cargar_ventas_diarias, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,85 @@
+# Generated by Django 5.2.18 on 2026-10-17 19:03
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import F, OuterRef, Subquery, Sum
+from django.db.models.functions import TruncDate
+from decimal import Decimal
+
+
+def cargar_productos_diarios(apps, schema_editor):
+    """
+    Las ventas anteriores no guardaban el costo: se completa con el costo
+    actual de cada producto y con eso se arma el resumen por producto
+    (ventas no anuladas menos devoluciones procesadas).
+    """
+    Producto = apps.get_model('inventario', 'Producto')
+    DetalleVenta = apps.get_model('ventas', 'DetalleVenta')
+    DetalleDevolucion = apps.get_model('ventas', 'DetalleDevolucion')
+    ProductoDiario = apps.get_model('ventas', 'ProductoDiario')
+
+    DetalleVenta.objects.filter(producto__isnull=False).update(
+        costo_unitario=Subquery(Producto.objects.filter(pk=OuterRef('producto_id')).values('precio_costo')[:1])
+    )
+
+    filas = {}
+    for fila in DetalleVenta.objects.filter(
+        status=1, producto__isnull=False, venta__estado_venta__in=[1, 2]
+    ).order_by().annotate(dia=TruncDate('venta__fecha')).values('dia', 'producto_id').annotate(
+        suma_cantidad=Sum('cantidad'),
+        suma_total=Sum('subtotal'),
+        suma_costo=Sum(F('cantidad') * F('costo_unitario')),
+    ).iterator():
+        filas[(fila['dia'], fila['producto_id'])] = [fila['suma_cantidad'], fila['suma_total'], fila['suma_costo']]
+
+    costos = dict(Producto.objects.values_list('id', 'precio_costo'))
+    for fila in DetalleDevolucion.objects.filter(
+        producto__isnull=False, devolucion__estado='procesada'
+    ).order_by().annotate(dia=TruncDate('devolucion__fecha_procesamiento')).values('dia', 'producto_id').annotate(
+        suma_cantidad=Sum('cantidad'),
+        suma_total=Sum('subtotal'),
+    ).iterator():
+        actual = filas.setdefault((fila['dia'], fila['producto_id']), [0, Decimal('0'), Decimal('0')])
+        actual[0] -= fila['suma_cantidad']
+        actual[1] -= fila['suma_total']
+        actual[2] -= fila['suma_cantidad'] * costos.get(fila['producto_id'], Decimal('0'))
+
+    ProductoDiario.objects.bulk_create([
+        ProductoDiario(fecha=dia, producto_id=producto_id, cantidad=cantidad, total=total, costo=costo)
+        for (dia, producto_id), (cantidad, total, costo) in filas.items()
+    ], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventario', '0003_productos_fts'),
+        ('ventas', '0003_venta_diaria'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='detalleventa',
+            name='costo_unitario',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=10),
+        ),
+        migrations.CreateModel(
+            name='ProductoDiario',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha', models.DateField()),
+                ('cantidad', models.IntegerField(default=0)),
+                ('total', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('costo', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('producto', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='ventas_diarias', to='inventario.producto')),
+            ],
+            options={
+                'verbose_name': 'Producto Diario',
+                'verbose_name_plural': 'Productos Diarios',
+                'db_table': 'productos_diarios',
+                'ordering': ['fecha'],
+                'constraints': [models.UniqueConstraint(fields=('fecha', 'producto'), name='productos_diarios_unica')],
+            },
+        ),
+        migrations.RunPython(cargar_productos_diarios, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-17 19:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ventas', '0004_producto_diario'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='venta',
+            name='version',
+            field=models.PositiveIntegerField(default=1),
+        ),
+    ]
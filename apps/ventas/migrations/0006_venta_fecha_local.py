@@ -0,0 +1,105 @@
+# Generated by Django 5.2.18 on 2026-10-17 20:05
+
+import django.utils.timezone
+from django.db import migrations, models
+from django.utils import timezone
+
+
+TAMANO_LOTE = 1000
+
+
+def _turno(hora):
+    # Mismo criterio que apps.ventas.models.turno_de_hora
+    if 6 <= hora < 14:
+        return 'manana'
+    if 14 <= hora < 22:
+        return 'tarde'
+    return 'noche'
+
+
+def completar_columnas_locales(apps, schema_editor):
+    """Completa fecha_local, hora_local y turno de las ventas existentes, de a lotes por id"""
+    Venta = apps.get_model('ventas', 'Venta')
+
+    ultimo_id = 0
+    while True:
+        lote = list(
+            Venta.objects.filter(id__gt=ultimo_id).order_by('id').only('id', 'fecha')[:TAMANO_LOTE]
+        )
+        if not lote:
+            break
+
+        for venta in lote:
+            local = timezone.localtime(venta.fecha)
+            venta.fecha_local = local.date()
+            venta.hora_local = local.hour
+            venta.turno = _turno(local.hour)
+
+        Venta.objects.bulk_update(lote, ['fecha_local', 'hora_local', 'turno'])
+        ultimo_id = lote[-1].id
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ventas', '0005_venta_version'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='venta',
+            name='fecha',
+            field=models.DateTimeField(default=django.utils.timezone.now, editable=False),
+        ),
+        migrations.AddField(
+            model_name='venta',
+            name='fecha_local',
+            field=models.DateField(editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='venta',
+            name='hora_local',
+            field=models.PositiveSmallIntegerField(editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='venta',
+            name='turno',
+            field=models.CharField(choices=[('manana', 'Mañana'), ('tarde', 'Tarde'), ('noche', 'Noche')], editable=False, max_length=10, null=True),
+        ),
+        migrations.RunPython(completar_columnas_locales, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='venta',
+            name='fecha_local',
+            field=models.DateField(editable=False),
+        ),
+        migrations.AlterField(
+            model_name='venta',
+            name='hora_local',
+            field=models.PositiveSmallIntegerField(editable=False),
+        ),
+        migrations.AlterField(
+            model_name='venta',
+            name='turno',
+            field=models.CharField(choices=[('manana', 'Mañana'), ('tarde', 'Tarde'), ('noche', 'Noche')], editable=False, max_length=10),
+        ),
+        migrations.AddIndex(
+            model_name='venta',
+            index=models.Index(fields=['fecha'], name='ventas_fecha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='venta',
+            index=models.Index(fields=['fecha_local', 'estado_venta', 'tipo_pago'], name='ventas_dia_estado_pago_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='venta',
+            index=models.Index(fields=['fecha_local', 'turno', 'estado_venta'], name='ventas_dia_turno_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='venta',
+            index=models.Index(fields=['caja', 'estado_venta'], name='ventas_caja_estado_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='venta',
+            index=models.Index(fields=['cliente', 'fecha'], name='ventas_cliente_fecha_idx'),
+        ),
+    ]
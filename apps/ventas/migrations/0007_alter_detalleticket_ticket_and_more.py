@@ -0,0 +1,58 @@
+# Generated by Django 5.2.18 on 2026-10-17 19:49
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clientes', '0001_initial'),
+        ('inventario', '0004_producto_productos_estado_stock_idx'),
+        ('ventas', '0006_venta_fecha_local'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='detalleticket',
+            name='ticket',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='detalles', to='ventas.ticket'),
+        ),
+        migrations.AlterField(
+            model_name='detalleventa',
+            name='producto',
+            field=models.ForeignKey(db_index=False, null=True, on_delete=django.db.models.deletion.SET_NULL, to='inventario.producto'),
+        ),
+        migrations.AlterField(
+            model_name='detalleventa',
+            name='venta',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='detalles', to='ventas.venta'),
+        ),
+        migrations.AlterField(
+            model_name='ticket',
+            name='usuario',
+            field=models.ForeignKey(db_index=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='tickets', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddIndex(
+            model_name='detalleticket',
+            index=models.Index(fields=['ticket', 'activo'], name='detalle_tickets_ticket_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='detalleventa',
+            index=models.Index(fields=['venta', 'status'], name='detalle_ventas_venta_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='detalleventa',
+            index=models.Index(fields=['producto', 'venta'], name='detalle_ventas_producto_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='ticket',
+            index=models.Index(fields=['usuario', 'estado', 'fecha_creacion'], name='tickets_usuario_estado_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='venta',
+            index=models.Index(fields=['estado', 'fecha'], name='ventas_estado_fecha_idx'),
+        ),
+    ]
@@ -1,4 +1,5 @@
-from django.db import models
+from django.db import models, transaction, IntegrityError
+from django.db.models import F, Q
 from django.contrib.auth.models import User
 from django.utils import timezone
 from apps.clientes.models import Cliente
@@ -47,6 +48,12 @@ class Caja(models.Model):
     
     estado = models.CharField(max_length=10, choices=ESTADO_CHOICES, default='abierta', db_index=True)
     
+    # Totales que se actualizan con cada venta (ver aplicar_venta)
+    CAMPOS_TOTALES = (
+        'cantidad_ventas', 'total_ventas', 'total_efectivo', 'total_debito',
+        'total_credito', 'total_transferencia', 'total_mixto', 'monto_final_esperado',
+    )
+    
     class Meta:
         db_table = 'cajas'
         verbose_name = 'Caja'
@@ -66,50 +73,106 @@ class Caja(models.Model):
         """Obtiene la caja abierta del usuario"""
         return Caja.objects.filter(usuario=usuario, estado='abierta').first()
     
-    def calcular_totales(self):
-        """Calcula los totales de la caja basándose en las ventas asociadas"""
-        from django.db.models import Sum, Count
-        
-        ventas = self.ventas.filter(estado_venta__in=[1, 2])  # Pendiente y Pagado
-        
-        # Cantidad y total de ventas
-        self.cantidad_ventas = ventas.count()
-        self.total_ventas = ventas.aggregate(Sum('total'))['total__sum'] or Decimal('0')
+    @staticmethod
+    def aplicar_venta(venta, signo=1):
+        """
+        Actualiza los totales acumulados de la caja de la venta sumando (signo=1)
+        o restando (signo=-1) sólo esa venta, con un UPDATE atómico sobre F().
+        """
+        from .totales import deltas_venta
         
-        # Totales por método de pago
-        self.total_efectivo = ventas.filter(tipo_pago='efectivo').aggregate(Sum('total'))['total__sum'] or Decimal('0')
-        self.total_debito = ventas.filter(tipo_pago='debito').aggregate(Sum('total'))['total__sum'] or Decimal('0')
-        self.total_credito = ventas.filter(tipo_pago='credito').aggregate(Sum('total'))['total__sum'] or Decimal('0')
-        self.total_transferencia = ventas.filter(tipo_pago='transferencia').aggregate(Sum('total'))['total__sum'] or Decimal('0')
-        self.total_mixto = ventas.filter(tipo_pago='mixto').aggregate(Sum('total'))['total__sum'] or Decimal('0')
+        if not venta.caja_id:
+            return
         
-        # Para pagos mixtos, también sumar los montos específicos
-        pagos_mixtos = ventas.filter(tipo_pago='mixto')
-        for venta in pagos_mixtos:
-            self.total_efectivo += venta.monto_efectivo
-            self.total_debito += venta.monto_tarjeta
+        cambios = {
+            campo: F(campo) + signo * monto
+            for campo, monto in deltas_venta(venta).items()
+        }
+        Caja.objects.filter(pk=venta.caja_id).update(**cambios)
+    
+    def calcular_totales(self):
+        """
+        Calcula los totales de la caja basándose en las ventas asociadas.
+        La fila queda bloqueada hasta el final: un aplicar_venta concurrente
+        espera y suma su venta sobre los totales recalculados en vez de perderse.
+        """
+        from .totales import resumen_pagos
         
-        # Calcular monto esperado
-        self.monto_final_esperado = self.monto_inicial + self.total_efectivo - self.egresos
+        with transaction.atomic():
+            caja = Caja.objects.select_for_update().only('monto_inicial', 'egresos').get(pk=self.pk)
+            
+            ventas = self.ventas.filter(estado_venta__in=[1, 2])  # Pendiente y Pagado
+            resumen = resumen_pagos(ventas)
+            
+            # Cantidad y total de ventas
+            self.cantidad_ventas = resumen['cantidad']
+            self.total_ventas = resumen['total']
+            
+            # Totales por método de pago (efectivo y débito incluyen la parte de los pagos mixtos)
+            self.total_efectivo = resumen['total_efectivo']
+            self.total_debito = resumen['total_debito']
+            self.total_credito = resumen['credito']
+            self.total_transferencia = resumen['transferencia']
+            self.total_mixto = resumen['mixto']
+            
+            # Calcular monto esperado
+            self.monto_final_esperado = caja.monto_inicial + self.total_efectivo - caja.egresos
+            
+            # Sólo los totales: no pisar otros campos con valores viejos de esta instancia
+            self.save(update_fields=self.CAMPOS_TOTALES)
+    
+    def reconciliar(self):
+        """
+        Recalcula los totales desde las ventas y devuelve las diferencias
+        encontradas contra los totales acumulados: {campo: (guardado, calculado)}
+        """
+        campos = list(self.CAMPOS_TOTALES)
+        with transaction.atomic():
+            # Guardados y calculados bajo el mismo bloqueo (ver calcular_totales)
+            guardada = Caja.objects.select_for_update().only(*campos).get(pk=self.pk)
+            guardados = {campo: getattr(guardada, campo) for campo in campos}
+            
+            self.calcular_totales()
         
-        self.save()
+        return {
+            campo: (guardados[campo], getattr(self, campo))
+            for campo in campos
+            if guardados[campo] != getattr(self, campo)
+        }
     
     def cerrar(self, monto_final_real, observaciones_cierre='', egresos=0, detalle_egresos=''):
-        """Cierra la caja"""
-        self.fecha_cierre = timezone.localtime()
-        self.monto_final_real = monto_final_real
-        self.egresos = egresos
-        self.detalle_egresos = detalle_egresos
-        self.observaciones_cierre = observaciones_cierre
-        
-        # Calcular totales antes de cerrar
-        self.calcular_totales()
-        
-        # Calcular diferencia
-        self.diferencia = self.monto_final_real - self.monto_final_esperado
-        
-        self.estado = 'cerrada'
-        self.save()
+        """
+        Cierra la caja. Los totales se leen y el cierre se guarda con la fila
+        bloqueada (ver calcular_totales): una venta concurrente espera y no
+        queda fuera del monto esperado.
+        """
+        with transaction.atomic():
+            caja = Caja.objects.select_for_update().only(
+                'estado', 'monto_inicial', *self.CAMPOS_TOTALES
+            ).get(pk=self.pk)
+            if caja.estado == 'cerrada':
+                raise ValueError(f'La caja #{self.pk} ya está cerrada')
+            
+            # Los totales se mantienen al día con cada venta: sólo se leen
+            for campo in self.CAMPOS_TOTALES:
+                setattr(self, campo, getattr(caja, campo))
+            self.monto_inicial = caja.monto_inicial
+            
+            self.fecha_cierre = timezone.localtime()
+            self.monto_final_real = monto_final_real
+            self.egresos = egresos
+            self.detalle_egresos = detalle_egresos
+            self.observaciones_cierre = observaciones_cierre
+            self.monto_final_esperado = self.monto_inicial + self.total_efectivo - self.egresos
+            
+            # Calcular diferencia
+            self.diferencia = self.monto_final_real - self.monto_final_esperado
+            
+            self.estado = 'cerrada'
+            self.save(update_fields=[
+                'fecha_cierre', 'monto_final_real', 'egresos', 'detalle_egresos',
+                'observaciones_cierre', 'monto_final_esperado', 'diferencia', 'estado',
+            ])
         
         # Registrar en auditoría
         AuditoriaMovimiento.registrar(
@@ -121,6 +184,36 @@ class Caja(models.Model):
 # MODELO: VENTA (ACTUALIZADO)
 # =====================================================================
 
+# Turnos de caja: mañana 06-14, tarde 14-22, noche 22-06
+TURNOS = [
+    ('manana', 'Mañana'),
+    ('tarde', 'Tarde'),
+    ('noche', 'Noche'),
+]
+
+
+def turno_de_hora(hora):
+    """Turno al que pertenece una hora local (0-23)"""
+    if 6 <= hora < 14:
+        return 'manana'
+    if 14 <= hora < 22:
+        return 'tarde'
+    return 'noche'
+
+
+def filtro_turno(fecha, turno):
+    """
+    Q con las ventas de un turno de caja. El turno noche del día `fecha`
+    sigue hasta las 06:00 del día siguiente.
+    """
+    if turno == 'noche':
+        return (
+            Q(fecha_local=fecha, turno='noche', hora_local__gte=22)
+            | Q(fecha_local=fecha + timedelta(days=1), turno='noche', hora_local__lt=6)
+        )
+    return Q(fecha_local=fecha, turno=turno)
+
+
 class Venta(models.Model):
     TIPO_PAGO = [
         ('efectivo', 'Efectivo'),
@@ -141,7 +234,7 @@ class Venta(models.Model):
     
     cliente = models.ForeignKey(Cliente, on_delete=models.SET_NULL, null=True, blank=True)
     usuario = models.ForeignKey(User, on_delete=models.SET_NULL, null=True)
-    fecha = models.DateTimeField(auto_now_add=True)  
+    fecha = models.DateTimeField(default=timezone.now, editable=False)
     total = models.DecimalField(max_digits=10, decimal_places=2)
     tipo_pago = models.CharField(max_length=50, choices=TIPO_PAGO)
     observacion = models.TextField(blank=True, null=True)
@@ -159,20 +252,58 @@ class Venta(models.Model):
     descuento_monto = models.DecimalField(max_digits=10, decimal_places=2, default=0)
     subtotal = models.DecimalField(max_digits=10, decimal_places=2, default=0)
 
+    # Aumenta al anular o procesar una devolución (clave de la caché de comprobantes)
+    version = models.PositiveIntegerField(default=1)
+
+    # Copia de `fecha` en hora local (se completan en save()): filtrar por día,
+    # hora o turno con columnas indexadas en vez de convertir `fecha` en cada fila
+    fecha_local = models.DateField(editable=False)
+    hora_local = models.PositiveSmallIntegerField(editable=False)
+    turno = models.CharField(max_length=10, choices=TURNOS, editable=False)
+
     class Meta:
         db_table = 'ventas'
         ordering = ['-fecha']
+        indexes = [
+            models.Index(fields=['fecha'], name='ventas_fecha_idx'),
+            # Listado de ventas (estado = 1: no eliminadas) por fecha
+            models.Index(fields=['estado', 'fecha'], name='ventas_estado_fecha_idx'),
+            # Reportes por rango de días (con estado y método de pago)
+            models.Index(fields=['fecha_local', 'estado_venta', 'tipo_pago'], name='ventas_dia_estado_pago_idx'),
+            # Cierres de turno
+            models.Index(fields=['fecha_local', 'turno', 'estado_venta'], name='ventas_dia_turno_idx'),
+            # Totales de caja
+            models.Index(fields=['caja', 'estado_venta'], name='ventas_caja_estado_idx'),
+            # Historial de compras del cliente
+            models.Index(fields=['cliente', 'fecha'], name='ventas_cliente_fecha_idx'),
+        ]
 
     def __str__(self):
         fecha_local = timezone.localtime(self.fecha).strftime('%d/%m/%Y')
         return f"Venta #{self.codigo_venta} - {fecha_local}"
 
+    def save(self, *args, **kwargs):
+        momento = self.fecha if timezone.is_aware(self.fecha) else timezone.make_aware(self.fecha)
+        local = timezone.localtime(momento)
+        self.fecha_local = local.date()
+        self.hora_local = local.hour
+        self.turno = turno_de_hora(local.hour)
+
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'fecha' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'fecha_local', 'hora_local', 'turno'}
+        super().save(*args, **kwargs)
+
     def puede_devolverse(self):
         """Verifica si la venta puede ser devuelta"""
         if self.estado_venta == 0:
             return False
         
-        if self.devoluciones.filter(estado__in=['pendiente', 'aprobada']).exists():
+        # lista_ventas lo anota con Exists para no hacer una consulta por fila
+        en_curso = getattr(self, 'devolucion_en_curso', None)
+        if en_curso is None:
+            en_curso = self.devoluciones.filter(estado__in=['pendiente', 'aprobada']).exists()
+        if en_curso:
             return False
         
         dias_desde_venta = (timezone.localtime() - timezone.localtime(self.fecha)).days
@@ -185,15 +316,24 @@ class Venta(models.Model):
 # =====================================================================
 
 class DetalleVenta(models.Model):
-    venta = models.ForeignKey(Venta, on_delete=models.CASCADE, related_name='detalles')
-    producto = models.ForeignKey(Producto, on_delete=models.SET_NULL, null=True)
+    # Sin índice propio: los cubren los índices compuestos de Meta
+    venta = models.ForeignKey(Venta, on_delete=models.CASCADE, related_name='detalles', db_index=False)
+    producto = models.ForeignKey(Producto, on_delete=models.SET_NULL, null=True, db_index=False)
     cantidad = models.IntegerField()
     precio_unitario = models.DecimalField(max_digits=10, decimal_places=2)
     subtotal = models.DecimalField(max_digits=10, decimal_places=2)
+    # Precio de costo del producto al momento de la venta (para márgenes)
+    costo_unitario = models.DecimalField(max_digits=10, decimal_places=2, default=0)
     status = models.IntegerField(default=1)
 
     class Meta:
         db_table = 'detalle_ventas'
+        indexes = [
+            # Detalles activos de una venta (comprobantes, detalle, devoluciones)
+            models.Index(fields=['venta', 'status'], name='detalle_ventas_venta_idx'),
+            # Ventas de un producto (rotación, historial)
+            models.Index(fields=['producto', 'venta'], name='detalle_ventas_producto_idx'),
+        ]
 
     def __str__(self):
         return f"{self.producto} - {self.cantidad} unidades"
@@ -225,7 +365,7 @@ class Ticket(models.Model):
     codigo_ticket = models.IntegerField(unique=True)
 
     cliente = models.ForeignKey(Cliente, on_delete=models.SET_NULL, null=True, blank=True)
-    usuario = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, related_name='tickets')
+    usuario = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, related_name='tickets', db_index=False)
 
     subtotal = models.DecimalField(max_digits=10, decimal_places=2, default=0)
     descuento = models.DecimalField(max_digits=10, decimal_places=2, default=0)
@@ -249,6 +389,10 @@ class Ticket(models.Model):
 
     class Meta:
         db_table = 'tickets'
+        indexes = [
+            # Tickets en espera de cada usuario (también cubre la FK a usuario)
+            models.Index(fields=['usuario', 'estado', 'fecha_creacion'], name='tickets_usuario_estado_idx'),
+        ]
         ordering = ['-fecha_creacion']
 
     def __str__(self):
@@ -270,7 +414,9 @@ class Ticket(models.Model):
     def finalizar(self):
         """Finaliza ticket y crea venta"""
         from django.db import transaction
-        from .models import DetalleVenta, Venta
+        from .models import Venta
+        from .secuencias import siguiente_codigo
+        from .stock import descontar_stock_venta
 
         if self.estado != 'pendiente':
             raise ValueError("Solo se pueden finalizar tickets pendientes")
@@ -279,14 +425,12 @@ class Ticket(models.Model):
             raise ValueError("Debe especificar un método de pago")
 
         with transaction.atomic():
-            for detalle in self.detalles.filter(activo=True):
-                if detalle.producto and detalle.producto.stock < detalle.cantidad:
-                    raise ValueError(f'Stock insuficiente para {detalle.producto.descripcion}')
+            detalles = list(self.detalles.filter(activo=True))
 
-            ultimo_codigo = Venta.objects.order_by('-codigo_venta').first()
-            nuevo_codigo = (ultimo_codigo.codigo_venta + 1) if ultimo_codigo else 1000
+            nuevo_codigo = siguiente_codigo('venta')
 
             venta = Venta.objects.create(
+                caja=Caja.obtener_caja_abierta(self.usuario),
                 cliente=self.cliente,
                 usuario=self.usuario,
                 subtotal=self.subtotal,
@@ -302,17 +446,21 @@ class Ticket(models.Model):
                 estado_venta=2
             )
 
-            for detalle in self.detalles.filter(activo=True):
-                DetalleVenta.objects.create(
-                    venta=venta,
-                    producto=detalle.producto,
-                    cantidad=detalle.cantidad,
-                    precio_unitario=detalle.precio_unitario,
-                    subtotal=detalle.subtotal
-                )
-                if detalle.producto:
-                    detalle.producto.stock -= detalle.cantidad
-                    detalle.producto.save()
+            # Detalles y stock en bloque (bloqueo ordenado + UPDATE condicional)
+            errores = descontar_stock_venta(venta, [
+                {
+                    'producto_id': detalle.producto_id,
+                    'cantidad': detalle.cantidad,
+                    'precio_unitario': detalle.precio_unitario,
+                }
+                for detalle in detalles
+            ])
+
+            if errores:
+                raise ValueError(' | '.join(error['error'] for error in errores))
+
+            Caja.aplicar_venta(venta)
+            VentaDiaria.aplicar_venta(venta)
 
             self.estado = 'finalizado'
             self.fecha_finalizacion = timezone.localtime()
@@ -329,7 +477,7 @@ class Ticket(models.Model):
             return venta
 
 class DetalleTicket(models.Model):
-    ticket = models.ForeignKey(Ticket, on_delete=models.CASCADE, related_name='detalles')
+    ticket = models.ForeignKey(Ticket, on_delete=models.CASCADE, related_name='detalles', db_index=False)
     producto = models.ForeignKey(Producto, on_delete=models.SET_NULL, null=True)
     descripcion = models.CharField(max_length=500)
     cantidad = models.IntegerField()
@@ -339,17 +487,16 @@ class DetalleTicket(models.Model):
     
     class Meta:
         db_table = 'detalle_tickets'
+        indexes = [
+            models.Index(fields=['ticket', 'activo'], name='detalle_tickets_ticket_idx'),
+        ]
 
 # =====================================================================
 # MODELO: CIERRE DE CAJA (CORREGIDO)
 # =====================================================================
 
 class CierreCaja(models.Model):
-    TURNOS = [
-        ('manana', 'Mañana'),
-        ('tarde', 'Tarde'),
-        ('noche', 'Noche'),
-    ]
+    TURNOS = TURNOS
 
     fecha = models.DateField(db_index=True)
     turno = models.CharField(max_length=10, choices=TURNOS)
@@ -386,14 +533,8 @@ class CierreCaja(models.Model):
     @staticmethod
     def determinar_turno_actual():
         """Determina el turno usando la hora LOCAL."""
-        hora_actual = timezone.localtime().time()
-
-        if time(6, 0) <= hora_actual < time(14, 0):
-            return 'manana'
-        elif time(14, 0) <= hora_actual < time(22, 0):
-            return 'tarde'
-        else:
-            return 'noche'
+        return turno_de_hora(timezone.localtime().hour)
+
     @classmethod
     def crear_sin_actividad(cls, fecha, turno, usuario):
         """
@@ -429,39 +570,25 @@ class CierreCaja(models.Model):
         }
         return rangos[turno]
 
+    def ventas_turno(self):
+        """Ventas pagadas dentro del turno (por las columnas locales indexadas)"""
+        return Venta.objects.filter(filtro_turno(self.fecha, self.turno), estado_venta=2)
+
     # CORREGIDO COMPLETAMENTE
     def calcular_totales(self):
-        zona = timezone.get_current_timezone()
+        from .totales import resumen_pagos
 
-        hora_inicio, hora_fin = self.obtener_rango_horario_turno(self.turno)
+        ventas_turno = self.ventas_turno()
 
-        if self.turno == 'noche':
-            inicio = zona.localize(datetime.combine(self.fecha, hora_inicio))
-            fin = zona.localize(datetime.combine(self.fecha + timedelta(days=1), hora_fin))
-        else:
-            inicio = zona.localize(datetime.combine(self.fecha, hora_inicio))
-            fin = zona.localize(datetime.combine(self.fecha, hora_fin))
+        resumen = resumen_pagos(ventas_turno)
 
-        ventas_turno = Venta.objects.filter(
-            fecha__gte=inicio,
-            fecha__lt=fin,
-            estado_venta=2
-        )
-
-        from django.db.models import Sum
-
-        self.total_ventas = ventas_turno.aggregate(Sum('total'))['total__sum'] or 0
-        self.cantidad_ventas = ventas_turno.count()
+        self.total_ventas = resumen['total']
+        self.cantidad_ventas = resumen['cantidad']
 
-        self.efectivo_ventas = ventas_turno.filter(tipo_pago='efectivo').aggregate(Sum('total'))['total__sum'] or 0
-        self.debito_ventas = ventas_turno.filter(tipo_pago='debito').aggregate(Sum('total'))['total__sum'] or 0
-        self.credito_ventas = ventas_turno.filter(tipo_pago='credito').aggregate(Sum('total'))['total__sum'] or 0
-        self.transferencia_ventas = ventas_turno.filter(tipo_pago='transferencia').aggregate(Sum('total'))['total__sum'] or 0
-
-        mixtos = ventas_turno.filter(tipo_pago='mixto')
-        for v in mixtos:
-            self.efectivo_ventas += v.monto_efectivo
-            self.debito_ventas += v.monto_tarjeta
+        self.efectivo_ventas = resumen['total_efectivo']
+        self.debito_ventas = resumen['total_debito']
+        self.credito_ventas = resumen['credito']
+        self.transferencia_ventas = resumen['transferencia']
 
         self.monto_final_esperado = self.monto_inicial + self.efectivo_ventas - self.egresos
         self.diferencia = self.monto_final_real - self.monto_final_esperado
@@ -529,8 +656,8 @@ class Devolucion(models.Model):
                 detalle.producto.stock += detalle.cantidad
                 detalle.producto.save()
 
-        ultimo = NotaCredito.objects.order_by('-id').first()
-        nuevo_codigo = (ultimo.id + 1) if ultimo else 1000
+        from .secuencias import siguiente_codigo
+        nuevo_codigo = siguiente_codigo('nota_credito')
 
         nota = NotaCredito.objects.create(
             codigo_nota=f"NC-{nuevo_codigo:06d}",
@@ -545,6 +672,12 @@ class Devolucion(models.Model):
         self.fecha_procesamiento = timezone.localtime()
         self.save()
 
+        from .resumenes import aplicar_devolucion
+        aplicar_devolucion(self)
+
+        from .comprobantes import invalidar_comprobante
+        invalidar_comprobante(self.venta_original)
+
         return nota
 
 
@@ -647,6 +780,127 @@ class AplicacionNotaCredito(models.Model):
         return f"{self.nota_credito.codigo_nota} aplicada a Venta #{self.venta.codigo_venta} ({fecha_local})"
 
 
+# =====================================================================
+# MODELO: SECUENCIA (numeración de códigos)
+# =====================================================================
+
+class Secuencia(models.Model):
+    """
+    Contador por serie (venta, ticket, producto, devolucion, nota_credito).
+    Se asigna con un UPDATE atómico desde apps/ventas/secuencias.py.
+    """
+    nombre = models.CharField(max_length=30, unique=True)
+    ultimo_valor = models.BigIntegerField(default=0)
+
+    class Meta:
+        db_table = 'secuencias'
+        verbose_name = 'Secuencia'
+        verbose_name_plural = 'Secuencias'
+
+    def __str__(self):
+        return f"{self.nombre}: {self.ultimo_valor}"
+
+
+# =====================================================================
+# MODELO: VENTA DIARIA (resumen para reportes)
+# =====================================================================
+
+class VentaDiaria(models.Model):
+    """
+    Ventas acumuladas por día (hora local) × tipo de pago × usuario.
+    Se mantiene con cada venta/anulación (aplicar_venta) y se puede reconstruir
+    con `manage.py reconstruir_ventas_diarias`. Sólo cuenta ventas no anuladas.
+    """
+    fecha = models.DateField()
+    tipo_pago = models.CharField(max_length=50, choices=Venta.TIPO_PAGO)
+    usuario = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True)
+
+    cantidad = models.IntegerField(default=0)
+    total = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    descuento = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    # Desglose de los pagos mixtos
+    mixto_efectivo = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    mixto_tarjeta = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    CAMPOS_MONTOS = ('cantidad', 'total', 'descuento', 'mixto_efectivo', 'mixto_tarjeta')
+
+    class Meta:
+        db_table = 'ventas_diarias'
+        verbose_name = 'Venta Diaria'
+        verbose_name_plural = 'Ventas Diarias'
+        ordering = ['fecha']
+        constraints = [
+            models.UniqueConstraint(fields=['fecha', 'tipo_pago', 'usuario'], name='ventas_diarias_unica'),
+        ]
+
+    def __str__(self):
+        return f"{self.fecha} - {self.tipo_pago}: {self.cantidad} ventas (${self.total})"
+
+    @staticmethod
+    def montos_venta(venta):
+        """Lo que suma una venta a su fila del resumen"""
+        es_mixto = venta.tipo_pago == 'mixto'
+        return {
+            'cantidad': 1,
+            'total': venta.total,
+            'descuento': venta.descuento_monto or Decimal('0'),
+            'mixto_efectivo': venta.monto_efectivo if es_mixto else Decimal('0'),
+            'mixto_tarjeta': venta.monto_tarjeta if es_mixto else Decimal('0'),
+        }
+
+    @staticmethod
+    def aplicar_venta(venta, signo=1):
+        """
+        Suma (signo=1) o resta (signo=-1) una venta en la fila de su día con un
+        UPDATE atómico sobre F(); si la fila todavía no existe la crea.
+        """
+        claves = {
+            'fecha': venta.fecha_local,
+            'tipo_pago': venta.tipo_pago,
+            'usuario_id': venta.usuario_id,
+        }
+        montos = VentaDiaria.montos_venta(venta)
+        cambios = {campo: F(campo) + signo * monto for campo, monto in montos.items()}
+
+        if VentaDiaria.objects.filter(**claves).update(**cambios):
+            return
+
+        try:
+            with transaction.atomic():
+                VentaDiaria.objects.create(
+                    **claves, **{campo: signo * monto for campo, monto in montos.items()}
+                )
+        except IntegrityError:
+            # Otra venta del mismo día creó la fila al mismo tiempo
+            VentaDiaria.objects.filter(**claves).update(**cambios)
+
+
+class ProductoDiario(models.Model):
+    """
+    Unidades, facturación y costo vendidos por día (hora local) × producto,
+    netos de anulaciones y devoluciones. Se mantiene desde apps/ventas/resumenes.py
+    y se reconstruye con `manage.py reconstruir_ventas_diarias`.
+    """
+    fecha = models.DateField()
+    producto = models.ForeignKey(Producto, on_delete=models.CASCADE, related_name='ventas_diarias')
+
+    cantidad = models.IntegerField(default=0)
+    total = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    costo = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        db_table = 'productos_diarios'
+        verbose_name = 'Producto Diario'
+        verbose_name_plural = 'Productos Diarios'
+        ordering = ['fecha']
+        constraints = [
+            models.UniqueConstraint(fields=['fecha', 'producto'], name='productos_diarios_unica'),
+        ]
+
+    def __str__(self):
+        return f"{self.fecha} - {self.producto_id}: {self.cantidad} unidades"
+
+
 # =====================================================================
 # MODELO: AUDITORÍA
 # =====================================================================
@@ -0,0 +1,288 @@
+# apps/ventas/resumenes.py
+
+from django.db import transaction, IntegrityError
+from django.db.models import (
+    Case, Count, DecimalField, F, IntegerField, OuterRef, Q, Subquery, Sum, Value, When
+)
+from django.db.models.functions import Coalesce, TruncDate
+from django.utils import timezone
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+
+from apps.inventario.models import Producto
+
+from .models import Venta, VentaDiaria, DetalleVenta, DetalleDevolucion, ProductoDiario
+
+
+TOP_PRODUCTOS = 10
+
+
+def rango_fechas(desde, hasta):
+    """
+    Convierte un rango de días locales [desde, hasta] en datetimes
+    [inicio, fin) para filtrar `fecha` con un rango que pueda usar índices
+    (a diferencia de fecha__date, que aplica una función a la columna).
+    """
+    inicio = timezone.make_aware(datetime.combine(desde, time.min))
+    fin = timezone.make_aware(datetime.combine(hasta + timedelta(days=1), time.min))
+    return inicio, fin
+
+
+def _dia_local(momento):
+    return timezone.localtime(momento).date()
+
+
+def _suma(campo, filtro=None):
+    return Coalesce(
+        Sum(campo, filter=filtro),
+        Value(Decimal('0')),
+        output_field=DecimalField(max_digits=14, decimal_places=2)
+    )
+
+
+def reconstruir_ventas_diarias(desde=None, hasta=None):
+    """
+    Recalcula VentaDiaria desde las ventas para el rango de días dado
+    (todo el historial si no se indica). Reemplaza las filas del rango en
+    una transacción y devuelve la cantidad de filas generadas.
+    """
+    ventas = Venta.objects.filter(estado_venta__in=[1, 2])  # Pendiente y Pagado
+    resumen = VentaDiaria.objects.all()
+
+    if desde:
+        ventas = ventas.filter(fecha_local__gte=desde)
+        resumen = resumen.filter(fecha__gte=desde)
+    if hasta:
+        ventas = ventas.filter(fecha_local__lte=hasta)
+        resumen = resumen.filter(fecha__lte=hasta)
+
+    es_mixto = Q(tipo_pago='mixto')
+    filas = ventas.order_by().annotate(
+        dia=F('fecha_local')
+    ).values('dia', 'tipo_pago', 'usuario_id').annotate(
+        suma_cantidad=Count('id'),
+        suma_total=_suma('total'),
+        suma_descuento=_suma('descuento_monto'),
+        suma_mixto_efectivo=_suma('monto_efectivo', es_mixto),
+        suma_mixto_tarjeta=_suma('monto_tarjeta', es_mixto),
+    )
+
+    with transaction.atomic():
+        resumen.delete()
+        nuevas = VentaDiaria.objects.bulk_create([
+            VentaDiaria(
+                fecha=fila['dia'],
+                tipo_pago=fila['tipo_pago'],
+                usuario_id=fila['usuario_id'],
+                cantidad=fila['suma_cantidad'],
+                total=fila['suma_total'],
+                descuento=fila['suma_descuento'],
+                mixto_efectivo=fila['suma_mixto_efectivo'],
+                mixto_tarjeta=fila['suma_mixto_tarjeta'],
+            )
+            for fila in filas.iterator()
+        ], batch_size=500)
+
+    return len(nuevas)
+
+
+# ======================================================
+#  RESUMEN POR PRODUCTO (ProductoDiario)
+# ======================================================
+
+def aplicar_productos_diarios(fecha, lineas, signo=1):
+    """
+    Suma (signo=1) o resta (signo=-1) líneas vendidas en las filas
+    ProductoDiario del día. `lineas` son tuplas (producto_id, cantidad,
+    total, costo); las de un mismo producto se agrupan.
+
+    Usa una cantidad fija de consultas sin importar las líneas: lee qué filas
+    existen, las actualiza con UN UPDATE condicional y crea el resto con
+    bulk_create.
+    """
+    deltas = {}
+    for producto_id, cantidad, total, costo in lineas:
+        if producto_id is None:
+            continue
+        fila = deltas.setdefault(producto_id, [0, Decimal('0'), Decimal('0')])
+        fila[0] += signo * cantidad
+        fila[1] += signo * total
+        fila[2] += signo * costo
+
+    if not deltas:
+        return
+
+    for intento in range(2):
+        try:
+            with transaction.atomic():
+                existentes = set(ProductoDiario.objects.filter(
+                    fecha=fecha, producto_id__in=deltas
+                ).values_list('producto_id', flat=True))
+
+                if existentes:
+                    cambios = {}
+                    for posicion, campo in enumerate(('cantidad', 'total', 'costo')):
+                        tipo = IntegerField() if campo == 'cantidad' else DecimalField(max_digits=14, decimal_places=2)
+                        cambios[campo] = F(campo) + Case(
+                            *[When(producto_id=producto_id, then=Value(deltas[producto_id][posicion]))
+                              for producto_id in existentes],
+                            default=Value(0), output_field=tipo
+                        )
+                    ProductoDiario.objects.filter(fecha=fecha, producto_id__in=existentes).update(**cambios)
+
+                ProductoDiario.objects.bulk_create([
+                    ProductoDiario(fecha=fecha, producto_id=producto_id, cantidad=cantidad, total=total, costo=costo)
+                    for producto_id, (cantidad, total, costo) in deltas.items()
+                    if producto_id not in existentes
+                ])
+            return
+        except IntegrityError:
+            # Otra venta creó alguna de las filas al mismo tiempo: reintentar una vez
+            if intento:
+                raise
+
+
+def aplicar_detalles_venta(venta, detalles, signo=1):
+    """Aplica los DetalleVenta de una venta en el día de la venta"""
+    aplicar_productos_diarios(venta.fecha_local, [
+        (detalle.producto_id, detalle.cantidad, detalle.subtotal, detalle.cantidad * detalle.costo_unitario)
+        for detalle in detalles
+    ], signo)
+
+
+def aplicar_devolucion(devolucion):
+    """
+    Descuenta una devolución procesada en el día en que se procesó,
+    al costo registrado en la venta original.
+    """
+    costos = dict(DetalleVenta.objects.filter(
+        venta_id=devolucion.venta_original_id
+    ).values_list('producto_id', 'costo_unitario'))
+
+    aplicar_productos_diarios(_dia_local(devolucion.fecha_procesamiento), [
+        (detalle.producto_id, detalle.cantidad, detalle.subtotal,
+         detalle.cantidad * costos.get(detalle.producto_id, Decimal('0')))
+        for detalle in devolucion.detalles.all()
+    ], signo=-1)
+
+
+def reconstruir_productos_diarios(desde=None, hasta=None):
+    """
+    Recalcula ProductoDiario para el rango de días dado (todo el historial si
+    no se indica): ventas no anuladas menos devoluciones procesadas.
+    Devuelve la cantidad de filas generadas.
+    """
+    detalles = DetalleVenta.objects.filter(
+        status=1, producto__isnull=False, venta__estado_venta__in=[1, 2]
+    )
+    devueltos = DetalleDevolucion.objects.filter(
+        producto__isnull=False, devolucion__estado='procesada'
+    )
+    resumen = ProductoDiario.objects.all()
+
+    if desde:
+        inicio = rango_fechas(desde, desde)[0]
+        detalles = detalles.filter(venta__fecha_local__gte=desde)
+        devueltos = devueltos.filter(devolucion__fecha_procesamiento__gte=inicio)
+        resumen = resumen.filter(fecha__gte=desde)
+    if hasta:
+        fin = rango_fechas(hasta, hasta)[1]
+        detalles = detalles.filter(venta__fecha_local__lte=hasta)
+        devueltos = devueltos.filter(devolucion__fecha_procesamiento__lt=fin)
+        resumen = resumen.filter(fecha__lte=hasta)
+
+    costo_original = Subquery(DetalleVenta.objects.filter(
+        venta_id=OuterRef('devolucion__venta_original_id'), producto_id=OuterRef('producto_id')
+    ).values('costo_unitario')[:1])
+
+    filas = {}
+
+    def acumular(consulta, signo):
+        for fila in consulta.iterator():
+            clave = (fila['dia'], fila['producto_id'])
+            actual = filas.setdefault(clave, [0, Decimal('0'), Decimal('0')])
+            actual[0] += signo * fila['suma_cantidad']
+            actual[1] += signo * fila['suma_total']
+            actual[2] += signo * fila['suma_costo']
+
+    with transaction.atomic():
+        acumular(detalles.order_by().annotate(
+            dia=F('venta__fecha_local')
+        ).values('dia', 'producto_id').annotate(
+            suma_cantidad=Sum('cantidad'),
+            suma_total=_suma('subtotal'),
+            suma_costo=_suma(F('cantidad') * F('costo_unitario')),
+        ), 1)
+
+        acumular(devueltos.order_by().annotate(
+            dia=TruncDate('devolucion__fecha_procesamiento'),
+            costo_unitario=Coalesce(costo_original, Value(Decimal('0')), output_field=DecimalField(max_digits=10, decimal_places=2)),
+        ).values('dia', 'producto_id').annotate(
+            suma_cantidad=Sum('cantidad'),
+            suma_total=_suma('subtotal'),
+            suma_costo=_suma(F('cantidad') * F('costo_unitario')),
+        ), -1)
+
+        resumen.delete()
+        nuevas = ProductoDiario.objects.bulk_create([
+            ProductoDiario(fecha=dia, producto_id=producto_id, cantidad=cantidad, total=total, costo=costo)
+            for (dia, producto_id), (cantidad, total, costo) in filas.items()
+        ], batch_size=500)
+
+    return len(nuevas)
+
+
+# ======================================================
+#  CONSULTAS PARA REPORTES
+# ======================================================
+
+def top_productos(desde, hasta, limite=TOP_PRODUCTOS):
+    """Top N por unidades vendidas en el período, con facturación y ganancia"""
+    return list(ProductoDiario.objects.filter(
+        fecha__gte=desde, fecha__lte=hasta
+    ).values(
+        'producto_id', 'producto__descripcion', 'producto__codigo'
+    ).annotate(
+        cantidad_vendida=Sum('cantidad'),
+        total_vendido=Sum('total'),
+        ganancia=Sum('total') - Sum('costo'),
+    ).filter(cantidad_vendida__gt=0).order_by('-cantidad_vendida', 'producto_id')[:limite])
+
+
+def productos_baja_rotacion(desde, hasta, limite=TOP_PRODUCTOS):
+    """Productos activos con stock que menos unidades vendieron en el período (incluye los que no vendieron)"""
+    vendidos = Coalesce(
+        Sum('ventas_diarias__cantidad', filter=Q(
+            ventas_diarias__fecha__gte=desde, ventas_diarias__fecha__lte=hasta
+        )),
+        Value(0)
+    )
+    return list(Producto.objects.filter(estado=1, stock__gt=0).annotate(
+        cantidad_vendida=vendidos
+    ).order_by('cantidad_vendida', '-stock', 'id').select_related('categoria')[:limite])
+
+
+def rotacion_por_categoria(desde, hasta):
+    """
+    Sell-through por categoría: unidades vendidas en el período sobre
+    (vendidas + stock actual). Dos consultas agrupadas, sin recorrer productos.
+    """
+    vendidos = {
+        fila['producto__categoria_id']: fila['vendidos']
+        for fila in ProductoDiario.objects.filter(
+            fecha__gte=desde, fecha__lte=hasta
+        ).order_by().values('producto__categoria_id').annotate(vendidos=Sum('cantidad'))
+    }
+
+    resultado = []
+    for fila in Producto.objects.filter(estado=1).order_by().values(
+        'categoria_id', nombre=F('categoria__nombre')
+    ).annotate(stock_actual=Sum('stock')):
+        cantidad = vendidos.get(fila['categoria_id']) or 0
+        disponible = cantidad + (fila['stock_actual'] or 0)
+        fila['vendidos'] = cantidad
+        fila['rotacion'] = round(cantidad * 100 / disponible, 1) if disponible else 0
+        resultado.append(fila)
+
+    resultado.sort(key=lambda fila: fila['rotacion'], reverse=True)
+    return resultado
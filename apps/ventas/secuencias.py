@@ -0,0 +1,156 @@
+# apps/ventas/secuencias.py
+
+import threading
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.db.models import F
+from django.db.models.functions import Greatest
+
+
+# Primer valor de cada serie (se respeta la numeración que ya usaba el sistema)
+SERIES = {
+    'venta': 1000,
+    'ticket': 1,
+    'producto': 1000,
+    'devolucion': 1000,
+    'nota_credito': 1000,
+}
+
+# Valores que reserva cada proceso por consulta (ver _tamano_bloque).
+# Los productos quedan en 1: admiten códigos manuales (asegurar_minimo) y un
+# bloque ya reservado podría repetir uno de ellos.
+BLOQUES = {
+    'venta': 20,
+    'ticket': 20,
+    'producto': 1,
+    'devolucion': 10,
+    'nota_credito': 10,
+}
+
+# Valores reservados por este proceso: {serie: [siguiente, ultimo]}
+_reservas = {}
+_lock = threading.Lock()
+
+
+def _tamano_bloque(serie):
+    """
+    Cantidad de valores que reserva cada proceso por consulta.
+    Configurable con settings.SECUENCIAS_BLOQUE = {'ticket': 50, ...}.
+    Con bloque > 1 los códigos no quedan ordenados entre procesos y quedan
+    huecos (valores de una transacción revertida o de un proceso reiniciado).
+    """
+    bloque = getattr(settings, 'SECUENCIAS_BLOQUE', {}).get(serie, BLOQUES[serie])
+    return max(1, bloque)
+
+
+def _alias():
+    """
+    Conexión donde se reservan los valores: settings.SECUENCIAS_ALIAS si está
+    configurada (ver base_datos.secuencias_base_datos), si no 'default'.
+    """
+    alias = getattr(settings, 'SECUENCIAS_ALIAS', None)
+    return alias if alias in connections.settings else DEFAULT_DB_ALIAS
+
+
+def _reservar(serie, cantidad):
+    """
+    Reserva `cantidad` valores consecutivos y devuelve (primero, confirmado).
+    `confirmado` indica si la reserva ya quedó guardada: en una conexión
+    propia o en 'default' fuera de una transacción. Si no, se confirma o se
+    revierte con la transacción de quien la pidió.
+    """
+    from .models import Secuencia
+
+    alias = _alias()
+    secuencias = Secuencia.objects.using(alias)
+
+    with transaction.atomic(using=alias):
+        actualizados = secuencias.filter(nombre=serie).update(
+            ultimo_valor=F('ultimo_valor') + cantidad
+        )
+        if not actualizados:
+            secuencias.get_or_create(
+                nombre=serie,
+                defaults={'ultimo_valor': SERIES[serie] - 1}
+            )
+            secuencias.filter(nombre=serie).update(
+                ultimo_valor=F('ultimo_valor') + cantidad
+            )
+
+        ultimo = secuencias.values_list('ultimo_valor', flat=True).get(nombre=serie)
+
+    return ultimo - cantidad + 1, not connections[alias].in_atomic_block
+
+
+def siguiente_codigo(serie):
+    """
+    Devuelve el siguiente código de la serie sin buscar el máximo de la tabla.
+    Cada proceso reserva un bloque de valores y los entrega sin consultar la
+    base, así las ventas de distintos cajeros no esperan por la misma fila.
+    Dos llamadas nunca obtienen el mismo valor; puede haber huecos.
+    """
+    if serie not in SERIES:
+        raise ValueError(f'Serie de numeración desconocida: {serie}')
+
+    with _lock:
+        reserva = _reservas.get(serie)
+        if reserva and reserva[0] <= reserva[1]:
+            valor = reserva[0]
+            reserva[0] += 1
+            return valor
+
+    bloque = _tamano_bloque(serie)
+    primero, confirmado = _reservar(serie, bloque)
+    if bloque == 1:
+        return primero
+
+    def _guardar_reserva():
+        with _lock:
+            _reservas[serie] = [primero + 1, primero + bloque - 1]
+
+    if confirmado:
+        # La reserva sobrevive aunque la transacción del llamador se revierta
+        _guardar_reserva()
+    else:
+        # La reserva es parte de la transacción del llamador: si se revierte,
+        # la secuencia vuelve atrás y el resto del bloque no se puede usar
+        transaction.on_commit(_guardar_reserva, using=_alias())
+
+    return primero
+
+
+def reservar_codigos(serie, cantidad):
+    """
+    Reserva `cantidad` códigos consecutivos en una sola consulta y devuelve
+    el primero (cargas masivas: importaciones, datos de prueba).
+    """
+    if serie not in SERIES:
+        raise ValueError(f'Serie de numeración desconocida: {serie}')
+    return _reservar(serie, cantidad)[0]
+
+
+def consultar_siguiente(serie):
+    """Devuelve el próximo valor que se asignaría en este proceso, sin reservarlo"""
+    from .models import Secuencia
+
+    with _lock:
+        reserva = _reservas.get(serie)
+        if reserva and reserva[0] <= reserva[1]:
+            return reserva[0]
+
+    ultimo = Secuencia.objects.filter(nombre=serie).values_list('ultimo_valor', flat=True).first()
+    return (ultimo + 1) if ultimo is not None else SERIES[serie]
+
+
+def asegurar_minimo(serie, valor):
+    """
+    Adelanta la secuencia si se cargó un código a mano mayor al último asignado
+    (p. ej. un producto con código manual), para no generar duplicados luego.
+    """
+    from .models import Secuencia
+
+    Secuencia.objects.get_or_create(nombre=serie, defaults={'ultimo_valor': SERIES[serie] - 1})
+    Secuencia.objects.filter(nombre=serie).update(
+        ultimo_valor=Greatest(F('ultimo_valor'), int(valor))
+    )
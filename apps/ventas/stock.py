@@ -0,0 +1,135 @@
+# apps/ventas/stock.py
+
+from django.db import transaction
+from django.db.models import Case, F, IntegerField, Q, Value, When
+from decimal import Decimal
+
+from apps.inventario.models import Producto
+
+
+def descontar_stock_venta(venta, lineas):
+    """
+    Registra los detalles de una venta y descuenta el stock de todo el carrito
+    con una cantidad fija de consultas, sin importar cuántas líneas tenga:
+
+      1. Bloquea todos los productos en UNA consulta, ordenados por id
+         (siempre el mismo orden → sin deadlocks entre cajas).
+      2. Valida el stock en memoria.
+      3. Descuenta con UN UPDATE condicional (stock = stock - n WHERE stock >= n).
+      4. Inserta los detalles con bulk_create (con el costo del momento) y
+         los suma al resumen por producto del día.
+
+    `lineas` es una lista de diccionarios con producto_id, cantidad y
+    precio_unitario (producto_id puede ser None si el producto fue eliminado).
+
+    Devuelve la lista de errores por línea; si no está vacía no se escribió nada.
+    """
+    pedidos = {}
+    for linea in lineas:
+        if linea['producto_id'] is not None:
+            producto_id = int(linea['producto_id'])
+            pedidos[producto_id] = pedidos.get(producto_id, 0) + int(linea['cantidad'])
+
+    with transaction.atomic():
+        productos = {
+            producto.id: producto
+            for producto in Producto.objects.select_for_update().filter(id__in=pedidos).order_by('id')
+        }
+
+        errores = []
+        for linea in lineas:
+            cantidad = int(linea['cantidad'])
+            if cantidad <= 0:
+                errores.append({
+                    'producto_id': linea['producto_id'],
+                    'error': 'La cantidad debe ser mayor a 0',
+                })
+                continue
+
+            if linea['producto_id'] is None:
+                continue
+
+            producto_id = int(linea['producto_id'])
+            producto = productos.get(producto_id)
+            if producto is None:
+                errores.append({
+                    'producto_id': producto_id,
+                    'error': f'El producto {producto_id} no existe',
+                })
+            elif producto.stock < pedidos[producto_id]:
+                errores.append({
+                    'producto_id': producto_id,
+                    'solicitado': pedidos[producto_id],
+                    'disponible': producto.stock,
+                    'error': f'Stock insuficiente para {producto.descripcion}. Stock actual: {producto.stock}',
+                })
+
+        if errores:
+            return errores
+
+        if pedidos:
+            condicion = Q()
+            descuento = []
+            for producto_id, cantidad in pedidos.items():
+                condicion |= Q(id=producto_id, stock__gte=cantidad)
+                descuento.append(When(id=producto_id, then=Value(cantidad)))
+
+            actualizados = Producto.objects.filter(condicion).update(
+                stock=F('stock') - Case(*descuento, default=Value(0), output_field=IntegerField())
+            )
+
+            if actualizados != len(pedidos):
+                # No debería ocurrir con las filas bloqueadas; se revierte todo
+                raise ValueError('El stock cambió durante la venta, intente nuevamente')
+
+        from .models import DetalleVenta
+        from .resumenes import aplicar_detalles_venta
+
+        detalles = []
+        for linea in lineas:
+            precio_unitario = Decimal(str(linea['precio_unitario']))
+            cantidad = int(linea['cantidad'])
+            producto_id = int(linea['producto_id']) if linea['producto_id'] is not None else None
+            producto = productos.get(producto_id)
+            detalles.append(DetalleVenta(
+                venta=venta,
+                producto_id=producto_id,
+                cantidad=cantidad,
+                precio_unitario=precio_unitario,
+                # bulk_create no llama a save(): mismo cálculo que DetalleVenta.save
+                subtotal=cantidad * precio_unitario,
+                costo_unitario=producto.precio_costo if producto else Decimal('0'),
+            ))
+        DetalleVenta.objects.bulk_create(detalles)
+        aplicar_detalles_venta(venta, detalles)
+
+    return []
+
+
+def restaurar_stock_venta(detalles):
+    """
+    Devuelve al stock las unidades de los detalles de una venta anulada.
+    Bloquea los productos en UNA consulta ordenada por id, igual que
+    descontar_stock_venta (mismo orden → una anulación no se cruza en
+    deadlock con una venta), y suma con UN UPDATE.
+    """
+    devoluciones = {}
+    for detalle in detalles:
+        if detalle.producto_id is not None:
+            devoluciones[detalle.producto_id] = devoluciones.get(detalle.producto_id, 0) + detalle.cantidad
+
+    if not devoluciones:
+        return
+
+    with transaction.atomic():
+        # Un producto que se borró entre tanto ya no está: se omite
+        bloqueados = list(
+            Producto.objects.select_for_update().filter(id__in=devoluciones).order_by('id').values_list('id', flat=True)
+        )
+        if not bloqueados:
+            return
+
+        suma = [When(id=producto_id, then=Value(devoluciones[producto_id])) for producto_id in bloqueados]
+        Producto.objects.filter(id__in=bloqueados).update(
+            stock=F('stock') + Case(*suma, default=Value(0), output_field=IntegerField())
+        )
@@ -0,0 +1,454 @@
+# apps/ventas/tests.py
+
+import tempfile
+import json
+from decimal import Decimal
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.db import connection, transaction
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from apps.inventario.models import Producto
+from apps.reportes.models import Trabajo
+from . import secuencias
+from .models import (
+    Caja, DetalleDevolucion, DetalleTicket, DetalleVenta, Devolucion, ProductoDiario, Secuencia, Venta,
+    VentaDiaria,
+)
+from .resumenes import reconstruir_productos_diarios, reconstruir_ventas_diarias
+from .stock import descontar_stock_venta
+
+
+class ComprobantesSinDescripcionTest(TestCase):
+    """Los comprobantes no fallan si un producto no tiene descripción (el campo admite NULL)"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = User.objects.create_user('cajero')
+        cls.caja = Caja.objects.create(usuario=cls.usuario)
+        producto = Producto.objects.create(
+            codigo=1, descripcion=None, precio_costo=Decimal('100.00'), precio_venta=Decimal('150.00')
+        )
+        cls.venta = Venta.objects.create(
+            caja=cls.caja, usuario=cls.usuario, total=Decimal('300.00'), subtotal=Decimal('300.00'),
+            tipo_pago='efectivo', codigo_venta=1, estado_venta=2,
+        )
+        DetalleVenta.objects.create(
+            venta=cls.venta, producto=producto, cantidad=2, precio_unitario=Decimal('150.00')
+        )
+
+    def setUp(self):
+        directorio = tempfile.TemporaryDirectory()
+        self.addCleanup(directorio.cleanup)
+        ajustes = override_settings(COMPROBANTES_CACHE_DIR=directorio.name)
+        ajustes.enable()
+        self.addCleanup(ajustes.disable)
+        self.client.force_login(self.usuario)
+
+    def test_comprobante_individual(self):
+        respuesta = self.client.get(reverse('exportar_venta_pdf', args=[self.venta.id]))
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual(respuesta['Content-Type'], 'application/pdf')
+
+    def test_lote_de_la_caja(self):
+        respuesta = self.client.get(reverse('exportar_comprobantes'), {'caja': self.caja.id})
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual(respuesta['Content-Type'], 'application/pdf')
+
+
+class ExportarVentasTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = User.objects.create_user('cajero')
+        Venta.objects.create(
+            caja=Caja.objects.create(usuario=cls.usuario), usuario=cls.usuario,
+            total=Decimal('300.00'), tipo_pago='efectivo', codigo_venta=1,
+        )
+
+    def setUp(self):
+        self.client.force_login(self.usuario)
+
+    def test_listado_chico_se_descarga(self):
+        for nombre in ('exportar_ventas_excel', 'exportar_ventas_pdf'):
+            with self.subTest(nombre=nombre):
+                respuesta = self.client.get(reverse(nombre))
+                self.assertEqual(respuesta.status_code, 200)
+                self.assertIn('attachment', respuesta['Content-Disposition'])
+
+    @mock.patch('apps.ventas.views_exportacion.LIMITE_EXPORTACION_SINCRONA', 0)
+    def test_listado_grande_va_a_la_cola(self):
+        for nombre, tipo in (('exportar_ventas_excel', 'ventas_excel'), ('exportar_ventas_pdf', 'ventas_pdf')):
+            with self.subTest(nombre=nombre):
+                respuesta = self.client.get(reverse(nombre), {'tipo_pago': 'efectivo'})
+                self.assertEqual(respuesta.status_code, 202)
+                trabajo = Trabajo.objects.get(pk=respuesta.json()['id'])
+                self.assertEqual((trabajo.tipo, trabajo.usuario), (tipo, self.usuario))
+                self.assertEqual(trabajo.parametros['tipo_pago'], 'efectivo')
+
+
+class ReconciliarCajaTest(TestCase):
+
+    def test_corrige_el_desvio_sin_pisar_otros_campos(self):
+        usuario = User.objects.create_user('cajero')
+        caja = Caja.objects.create(usuario=usuario, monto_inicial=Decimal('1000.00'))
+        Venta.objects.create(
+            caja=caja, usuario=usuario, total=Decimal('300.00'), tipo_pago='efectivo', codigo_venta=1
+        )
+        # Desvío en la base y un cambio hecho por otro pedido después de leer `caja`
+        Caja.objects.filter(pk=caja.pk).update(total_ventas=Decimal('999.00'), observaciones_apertura='otro pedido')
+
+        diferencias = caja.reconciliar()
+
+        self.assertEqual(diferencias['total_ventas'], (Decimal('999.00'), Decimal('300.00')))
+        caja.refresh_from_db()
+        self.assertEqual(caja.total_ventas, Decimal('300.00'))
+        self.assertEqual(caja.monto_final_esperado, Decimal('1300.00'))
+        self.assertEqual(caja.observaciones_apertura, 'otro pedido')
+
+
+class TotalesIncrementalesCajaTest(TestCase):
+    """Los totales que se suman venta a venta coinciden con recalcularlos desde cero"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = User.objects.create_user('cajero')
+        cls.producto = Producto.objects.create(
+            codigo=1, descripcion='Casco', stock=20, precio_costo=Decimal('100.00'), precio_venta=Decimal('150.00')
+        )
+
+    def setUp(self):
+        self.client.force_login(self.usuario)
+        # Como abrir_caja: el monto esperado arranca en el monto inicial
+        self.caja = Caja.objects.create(
+            usuario=self.usuario, monto_inicial=Decimal('1000.00'), monto_final_esperado=Decimal('1000.00')
+        )
+
+    def vender(self, tipo_pago, cantidad, **extra):
+        productos = [{'producto_id': self.producto.id, 'cantidad': cantidad, 'precio': '150.00',
+                      'subtotal': str(cantidad * 150)}]
+        self.client.post(reverse('crear_venta'), {
+            'tipo_pago': tipo_pago, 'productos': json.dumps(productos), **extra
+        })
+        return Venta.objects.latest('id')
+
+    def finalizar_ticket(self, tipo_pago, cantidad):
+        productos = [{'producto_id': self.producto.id, 'cantidad': cantidad, 'precio': '150.00'}]
+        ticket = self.client.post(
+            reverse('guardar_ticket'), json.dumps({'productos': productos}), content_type='application/json'
+        ).json()['ticket']
+        datos = self.client.post(
+            reverse('finalizar_ticket', args=[ticket['id']]), json.dumps({'tipo_pago': tipo_pago}),
+            content_type='application/json'
+        ).json()
+        self.assertTrue(datos['success'])
+
+    def assertIgualAlRecalculo(self):
+        self.assertEqual(self.caja.reconciliar(), {})
+
+    def test_crear_finalizar_ticket_y_anular(self):
+        en_efectivo = self.vender('efectivo', 2)
+        self.assertIgualAlRecalculo()
+
+        self.vender('mixto', 1, monto_efectivo='100.00', monto_tarjeta='50.00')
+        self.assertIgualAlRecalculo()
+
+        self.finalizar_ticket('debito', 3)
+        self.assertIgualAlRecalculo()
+
+        self.client.post(reverse('anular_venta', args=[en_efectivo.id]))
+        self.assertIgualAlRecalculo()
+
+        self.caja.refresh_from_db()
+        self.assertEqual(self.caja.cantidad_ventas, 2)
+        self.assertEqual(self.caja.total_ventas, Decimal('600.00'))
+        self.assertEqual(self.caja.total_efectivo, Decimal('100.00'))
+        self.assertEqual(self.caja.total_debito, Decimal('500.00'))
+        self.assertEqual(self.caja.monto_final_esperado, Decimal('1100.00'))
+
+    def test_reconciliar_informa_el_desvio(self):
+        self.vender('efectivo', 1)
+        Caja.objects.filter(pk=self.caja.pk).update(total_efectivo=Decimal('999.00'))
+
+        self.assertEqual(self.caja.reconciliar(), {'total_efectivo': (Decimal('999.00'), Decimal('150.00'))})
+        self.assertIgualAlRecalculo()
+
+
+class CerrarCajaTest(TestCase):
+
+    def test_cierra_con_los_totales_guardados(self):
+        usuario = User.objects.create_user('cajero')
+        caja = Caja.objects.create(usuario=usuario, monto_inicial=Decimal('1000.00'))
+        # La venta llega después de leer `caja`: el cierre no usa los totales de la instancia
+        Caja.aplicar_venta(Venta.objects.create(
+            caja=caja, usuario=usuario, total=Decimal('300.00'), tipo_pago='efectivo', codigo_venta=1
+        ))
+
+        caja.cerrar(Decimal('1250.00'), egresos=Decimal('100.00'))
+
+        caja.refresh_from_db()
+        self.assertEqual(caja.estado, 'cerrada')
+        self.assertEqual(caja.total_ventas, Decimal('300.00'))
+        self.assertEqual(caja.monto_final_esperado, Decimal('1200.00'))
+        self.assertEqual(caja.diferencia, Decimal('50.00'))
+
+        with self.assertRaisesMessage(ValueError, 'ya está cerrada'):
+            caja.cerrar(Decimal('0.00'))
+
+
+class DescontarStockVentaTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = User.objects.create_user('cajero')
+        cls.caja = Caja.objects.create(usuario=cls.usuario)
+        cls.casco = Producto.objects.create(
+            codigo=1, descripcion='Casco', stock=5, precio_costo=Decimal('100.00'), precio_venta=Decimal('150.00')
+        )
+        cls.guantes = Producto.objects.create(
+            codigo=2, descripcion='Guantes', stock=1, precio_costo=Decimal('20.00'), precio_venta=Decimal('30.00')
+        )
+
+    def descontar(self, *lineas):
+        venta = Venta.objects.create(
+            caja=self.caja, usuario=self.usuario, total=Decimal('1.00'), tipo_pago='efectivo',
+            codigo_venta=Venta.objects.count() + 1,
+        )
+        return descontar_stock_venta(venta, [
+            {'producto_id': producto_id, 'cantidad': cantidad, 'precio_unitario': '150.00'}
+            for producto_id, cantidad in lineas
+        ])
+
+    def stock(self):
+        return list(Producto.objects.order_by('id').values_list('stock', flat=True))
+
+    def test_stock_insuficiente_no_descuenta_nada(self):
+        errores = self.descontar((self.casco.id, 2), (self.guantes.id, 3))
+
+        self.assertEqual(errores, [{
+            'producto_id': self.guantes.id, 'solicitado': 3, 'disponible': 1,
+            'error': 'Stock insuficiente para Guantes. Stock actual: 1',
+        }])
+        self.assertEqual(self.stock(), [5, 1])
+        self.assertFalse(DetalleVenta.objects.exists())
+        self.assertFalse(ProductoDiario.objects.exists())
+
+    def test_lineas_repetidas_se_suman(self):
+        self.assertEqual(self.descontar((self.casco.id, 2), (self.guantes.id, 1), (self.casco.id, 3)), [])
+
+        self.assertEqual(self.stock(), [0, 0])
+        self.assertEqual(DetalleVenta.objects.count(), 3)
+        self.assertEqual(ProductoDiario.objects.get(producto=self.casco).cantidad, 5)
+
+    def test_lineas_repetidas_sin_stock_para_el_total(self):
+        errores = self.descontar((self.casco.id, 3), (self.casco.id, 3))
+
+        # Cada línea informa el total pedido del producto
+        self.assertEqual([(error['solicitado'], error['disponible']) for error in errores], [(6, 5), (6, 5)])
+        self.assertEqual(self.stock(), [5, 1])
+
+    def test_mensajes_por_linea(self):
+        errores = self.descontar((self.casco.id, 0), (9999, 1), (self.guantes.id, 2), (self.casco.id, 1))
+
+        self.assertEqual([error['error'] for error in errores], [
+            'La cantidad debe ser mayor a 0',
+            'El producto 9999 no existe',
+            'Stock insuficiente para Guantes. Stock actual: 1',
+        ])
+        self.assertEqual([error['producto_id'] for error in errores], [self.casco.id, 9999, self.guantes.id])
+        self.assertEqual(self.stock(), [5, 1])
+
+
+class ResumenesDiariosTest(TestCase):
+    """Los resúmenes mantenidos venta a venta coinciden con reconstruirlos desde cero"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = User.objects.create_user('cajero')
+        cls.casco = Producto.objects.create(
+            codigo=1, descripcion='Casco', stock=20, precio_costo=Decimal('100.00'), precio_venta=Decimal('150.00')
+        )
+        cls.guantes = Producto.objects.create(
+            codigo=2, descripcion='Guantes', stock=20, precio_costo=Decimal('20.00'), precio_venta=Decimal('30.00')
+        )
+        Caja.objects.create(usuario=cls.usuario)
+
+    def setUp(self):
+        self.client.force_login(self.usuario)
+
+        conservada = self.vender('efectivo', (self.casco, 2), (self.guantes, 3))
+        self.vender('debito', (self.guantes, 1), descuento=json.dumps({'tipo': 'monto', 'valor': 5}))
+        anulada = self.vender('mixto', (self.casco, 1), monto_efectivo='100.00', monto_tarjeta='50.00')
+        self.client.post(reverse('anular_venta', args=[anulada.id]))
+
+        devolucion = Devolucion.objects.create(
+            venta_original=conservada, codigo_devolucion='DEV-1', motivo='defecto',
+            descripcion_motivo='Falla', estado='aprobada', monto_total=Decimal('150.00'),
+        )
+        DetalleDevolucion.objects.create(
+            devolucion=devolucion, producto=self.casco, descripcion_producto='Casco',
+            cantidad=1, precio_unitario=Decimal('150.00'),
+        )
+        devolucion.procesar(self.usuario)
+
+    def vender(self, tipo_pago, *lineas, **extra):
+        productos = [
+            {'producto_id': producto.id, 'cantidad': cantidad, 'precio': str(producto.precio_venta),
+             'subtotal': str(cantidad * producto.precio_venta)}
+            for producto, cantidad in lineas
+        ]
+        self.client.post(reverse('crear_venta'), {
+            'tipo_pago': tipo_pago, 'productos': json.dumps(productos), **extra
+        })
+        return Venta.objects.latest('id')
+
+    def filas(self, modelo, claves, montos):
+        """Filas del resumen sin las que quedaron en cero (una anulación no borra la fila)"""
+        return [
+            fila for fila in modelo.objects.order_by(*claves).values(*claves, *montos)
+            if any(fila[campo] for campo in montos)
+        ]
+
+    def test_ventas_diarias(self):
+        claves = ('fecha', 'tipo_pago', 'usuario_id')
+        incrementales = self.filas(VentaDiaria, claves, VentaDiaria.CAMPOS_MONTOS)
+
+        reconstruir_ventas_diarias()
+
+        self.assertEqual(incrementales, self.filas(VentaDiaria, claves, VentaDiaria.CAMPOS_MONTOS))
+        self.assertEqual([fila['tipo_pago'] for fila in incrementales], ['debito', 'efectivo'])
+
+    def test_productos_diarios(self):
+        claves, montos = ('fecha', 'producto_id'), ('cantidad', 'total', 'costo')
+        incrementales = self.filas(ProductoDiario, claves, montos)
+
+        reconstruir_productos_diarios()
+
+        self.assertEqual(incrementales, self.filas(ProductoDiario, claves, montos))
+        # Casco: 2 vendidos, 1 devuelto (la venta mixta se anuló)
+        self.assertEqual(
+            [(fila['producto_id'], fila['cantidad']) for fila in incrementales],
+            [(self.casco.id, 1), (self.guantes.id, 4)]
+        )
+
+
+class AnularVentaTest(TestCase):
+
+    def test_restaura_el_stock_con_un_solo_bloqueo_ordenado(self):
+        usuario = User.objects.create_user('cajero')
+        self.client.force_login(usuario)
+        productos = [
+            Producto.objects.create(
+                codigo=codigo, descripcion=f'Producto {codigo}', stock=10,
+                precio_costo=Decimal('100.00'), precio_venta=Decimal('150.00'),
+            )
+            for codigo in (1, 2)
+        ]
+        venta = Venta.objects.create(
+            caja=Caja.objects.create(usuario=usuario), usuario=usuario,
+            total=Decimal('600.00'), tipo_pago='efectivo', codigo_venta=1,
+        )
+        # Detalles en orden inverso al de los ids, y un producto repetido
+        for producto, cantidad in ((productos[1], 1), (productos[0], 2), (productos[1], 1)):
+            DetalleVenta.objects.create(
+                venta=venta, producto=producto, cantidad=cantidad, precio_unitario=Decimal('150.00')
+            )
+
+        with CaptureQueriesContext(connection) as consultas:
+            self.client.post(reverse('anular_venta', args=[venta.id]))
+
+        venta.refresh_from_db()
+        self.assertEqual(venta.estado_venta, 0)
+        self.assertEqual(
+            list(Producto.objects.order_by('id').values_list('stock', flat=True)), [12, 12]
+        )
+        lecturas_de_productos = [
+            consulta['sql'] for consulta in consultas.captured_queries
+            if consulta['sql'].startswith('SELECT') and 'FROM "productos"' in consulta['sql']
+        ]
+        self.assertEqual(len(lecturas_de_productos), 1)
+
+
+class GuardarTicketTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = User.objects.create_user('cajero')
+        cls.producto = Producto.objects.create(
+            codigo=1, descripcion='Casco', stock=10, precio_costo=Decimal('100.00'), precio_venta=Decimal('150.00')
+        )
+
+    def setUp(self):
+        self.client.force_login(self.usuario)
+
+    def guardar(self, *lineas):
+        productos = [
+            {'producto_id': self.producto.id, 'cantidad': cantidad, 'precio': precio, 'subtotal': subtotal}
+            for cantidad, precio, subtotal in lineas
+        ]
+        respuesta = self.client.post(
+            reverse('guardar_ticket'), json.dumps({'productos': productos}), content_type='application/json'
+        )
+        return respuesta.json()
+
+    def test_subtotal_calculado_en_el_servidor(self):
+        datos = self.guardar((1, '150.00', '150.00'), (2, '150.00', '1.00'))
+
+        self.assertTrue(datos['success'])
+        detalle = DetalleTicket.objects.get()
+        self.assertEqual((detalle.cantidad, detalle.subtotal), (3, Decimal('450.00')))
+        self.assertEqual(datos['ticket']['total'], 450.0)
+
+    def test_mismo_producto_con_dos_precios(self):
+        datos = self.guardar((1, '150.00', '150.00'), (1, '120.00', '120.00'))
+
+        self.assertFalse(datos['success'])
+        self.assertFalse(DetalleTicket.objects.exists())
+
+
+@override_settings(SECUENCIAS_BLOQUE={'venta': 5})
+class SecuenciasTest(TransactionTestCase):
+    """Fuera de TestCase: la reserva sólo se confirma sola en modo autocommit"""
+
+    def setUp(self):
+        reservas = mock.patch.dict(secuencias._reservas, clear=True)
+        reservas.start()
+        self.addCleanup(reservas.stop)
+
+    def test_valores_unicos_entre_procesos(self):
+        codigos = [secuencias.siguiente_codigo('venta') for _ in range(3)]
+        # Otro proceso: empieza sin reserva y toma el bloque siguiente
+        with mock.patch.dict(secuencias._reservas, clear=True):
+            codigos += [secuencias.siguiente_codigo('venta') for _ in range(7)]
+        codigos += [secuencias.siguiente_codigo('venta') for _ in range(3)]
+        codigos.append(secuencias.reservar_codigos('venta', 1))
+
+        self.assertEqual(len(set(codigos)), len(codigos))
+        self.assertEqual(codigos[:3], [1000, 1001, 1002])
+        self.assertEqual(codigos[3:10], [1005, 1006, 1007, 1008, 1009, 1010, 1011])
+        self.assertEqual(codigos[10:13], [1003, 1004, 1015])
+        self.assertEqual(Secuencia.objects.get(nombre='venta').ultimo_valor, 1020)
+
+    def test_reserva_sobrevive_a_la_transaccion_revertida(self):
+        self.assertEqual(secuencias.siguiente_codigo('venta'), 1000)
+
+        with self.assertRaises(ValueError), transaction.atomic():
+            self.assertEqual(secuencias.siguiente_codigo('venta'), 1001)
+            raise ValueError('venta rechazada')
+
+        # 1001 queda como hueco: nunca se vuelve a entregar
+        self.assertEqual(secuencias.siguiente_codigo('venta'), 1002)
+        self.assertEqual(Secuencia.objects.get(nombre='venta').ultimo_valor, 1004)
+
+    def test_bloque_reservado_en_transaccion_revertida(self):
+        with self.assertRaises(ValueError), transaction.atomic():
+            self.assertEqual(secuencias.siguiente_codigo('venta'), 1000)
+            raise ValueError('venta rechazada')
+
+        # La reserva se revirtió con la transacción: el bloque no se usa
+        self.assertEqual(secuencias.siguiente_codigo('venta'), 1000)
+        self.assertEqual(secuencias.siguiente_codigo('venta'), 1001)
+        self.assertEqual(Secuencia.objects.get(nombre='venta').ultimo_valor, 1004)
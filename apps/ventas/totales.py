@@ -0,0 +1,80 @@
+# apps/ventas/totales.py
+
+from django.db.models import Count, DecimalField, Q, Sum, Value
+from django.db.models.functions import Coalesce
+from decimal import Decimal
+
+
+METODOS_PAGO = ['efectivo', 'debito', 'credito', 'transferencia', 'mixto']
+
+
+def _suma(campo, filtro=None):
+    """Sum con COALESCE a 0 para que los métodos sin ventas devuelvan Decimal('0')"""
+    return Coalesce(
+        Sum(campo, filter=filtro),
+        Value(Decimal('0')),
+        output_field=DecimalField(max_digits=12, decimal_places=2)
+    )
+
+
+def resumen_pagos(ventas):
+    """
+    Calcula en UNA sola consulta (agregación condicional) la cantidad de ventas,
+    el total, el total por método de pago y el desglose de los pagos mixtos.
+
+    Devuelve un diccionario con:
+      - cantidad, total
+      - efectivo, debito, credito, transferencia, mixto (total por tipo_pago)
+      - mixto_efectivo, mixto_tarjeta (parte de los pagos mixtos)
+      - total_efectivo, total_debito (incluyen la parte de los pagos mixtos,
+        igual que se muestran en caja y cierres)
+    """
+    # Los alias no pueden coincidir con nombres de campos del modelo ('total')
+    agregados = {
+        'cantidad': Count('id'),
+        'suma_total': _suma('total'),
+        'mixto_efectivo': _suma('monto_efectivo', Q(tipo_pago='mixto')),
+        'mixto_tarjeta': _suma('monto_tarjeta', Q(tipo_pago='mixto')),
+    }
+    for metodo in METODOS_PAGO:
+        agregados[f'suma_{metodo}'] = _suma('total', Q(tipo_pago=metodo))
+
+    datos = ventas.order_by().aggregate(**agregados)
+
+    resumen = {
+        'cantidad': datos['cantidad'],
+        'total': datos['suma_total'],
+        'mixto_efectivo': datos['mixto_efectivo'],
+        'mixto_tarjeta': datos['mixto_tarjeta'],
+    }
+    for metodo in METODOS_PAGO:
+        resumen[metodo] = datos[f'suma_{metodo}']
+
+    resumen['total_efectivo'] = resumen['efectivo'] + resumen['mixto_efectivo']
+    resumen['total_debito'] = resumen['debito'] + resumen['mixto_tarjeta']
+
+    return resumen
+
+
+def deltas_venta(venta):
+    """
+    Devuelve cuánto suma una venta a cada total acumulado de la Caja.
+    Sigue el mismo criterio que resumen_pagos: los pagos mixtos suman su
+    total a total_mixto y su parte en efectivo/tarjeta a efectivo/débito.
+    """
+    deltas = {
+        'cantidad_ventas': 1,
+        'total_ventas': venta.total,
+    }
+
+    if venta.tipo_pago == 'mixto':
+        deltas['total_mixto'] = venta.total
+        deltas['total_efectivo'] = venta.monto_efectivo
+        deltas['total_debito'] = venta.monto_tarjeta
+    elif venta.tipo_pago in METODOS_PAGO:
+        deltas[f'total_{venta.tipo_pago}'] = venta.total
+
+    # El monto esperado en caja sólo se mueve con el efectivo
+    deltas['monto_final_esperado'] = deltas.get('total_efectivo', Decimal('0'))
+
+    return deltas
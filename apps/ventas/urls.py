@@ -1,6 +1,6 @@
 # apps/ventas/urls.py - VERSIÓN SIMPLIFICADA
 from django.urls import path
-from . import views, views_cierre
+from . import views, views_cierre, views_exportacion, views_tickets
 
 urlpatterns = [
     # Ventas normales
@@ -9,6 +9,20 @@ urlpatterns = [
     path('detalle/<int:pk>/', views.detalle_venta, name='detalle_venta'),
     path('anular/<int:pk>/', views.anular_venta, name='anular_venta'),
     
+    # Tickets (ventas en espera del POS)
+    path('tickets/guardar/', views_tickets.guardar_ticket, name='guardar_ticket'),
+    path('tickets/lista/', views_tickets.lista_tickets, name='lista_tickets'),
+    path('tickets/<int:ticket_id>/recuperar/', views_tickets.recuperar_ticket, name='recuperar_ticket'),
+    path('tickets/<int:ticket_id>/finalizar/', views_tickets.finalizar_ticket, name='finalizar_ticket'),
+    path('tickets/<int:ticket_id>/cancelar/', views_tickets.cancelar_ticket, name='cancelar_ticket'),
+    
+    # Exportación
+    path('exportar/excel/', views_exportacion.exportar_ventas_excel, name='exportar_ventas_excel'),
+    path('exportar/venta/<int:venta_id>/', views_exportacion.exportar_venta_pdf, name='exportar_venta_pdf'),
+    path('exportar/pdf/', views_exportacion.exportar_ventas_pdf, name='exportar_ventas_pdf'),
+    path('exportar/datos/<slug:recurso>/', views_exportacion.exportar_datos_crudos, name='exportar_datos_crudos'),
+    path('exportar/comprobantes/', views_exportacion.exportar_comprobantes, name='exportar_comprobantes'),
+    
     # Cierre de caja
     path('cierres/', views_cierre.lista_cierres, name='lista_cierres'),
     path('cierres/crear/', views_cierre.crear_cierre, name='crear_cierre'),
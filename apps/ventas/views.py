@@ -1,12 +1,17 @@
 # apps/ventas/views.py - VERSIÓN CORREGIDA SIN MODELO CAJA
 
-from .models import Venta, DetalleVenta, AuditoriaMovimiento
+from .models import Caja, Venta, VentaDiaria, AuditoriaMovimiento, Devolucion
+from .secuencias import siguiente_codigo
+from .stock import descontar_stock_venta, restaurar_stock_venta
+from .resumenes import aplicar_detalles_venta
+from .comprobantes import invalidar_comprobante
 from apps.clientes.models import Cliente
 from apps.inventario.models import Producto
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from django.db import transaction
+from django.db.models import Exists, OuterRef
 from django.http import HttpResponse
 from decimal import Decimal
 import json
@@ -15,7 +20,12 @@ import json
 @login_required
 def lista_ventas(request):
     """Lista todas las ventas"""
-    ventas = Venta.objects.filter(estado=1).select_related('cliente', 'usuario').order_by('-fecha')
+    devolucion_en_curso = Devolucion.objects.filter(
+        venta_original=OuterRef('pk'), estado__in=['pendiente', 'aprobada']
+    )
+    ventas = Venta.objects.filter(estado=1).select_related('cliente', 'usuario').annotate(
+        devolucion_en_curso=Exists(devolucion_en_curso)
+    ).order_by('-fecha')
     return render(request, 'ventas/lista_ventas.html', {'ventas': ventas})
 
 
@@ -85,11 +95,11 @@ def crear_venta(request):
                         raise ValueError(f'Los montos del pago mixto deben sumar ${total}')
                 
                 # Generar código de venta
-                ultimo_codigo = Venta.objects.order_by('-codigo_venta').first()
-                nuevo_codigo = (ultimo_codigo.codigo_venta + 1) if ultimo_codigo else 1000
+                nuevo_codigo = siguiente_codigo('venta')
                 
                 # Crear venta
                 venta = Venta.objects.create(
+                    caja=Caja.obtener_caja_abierta(request.user),
                     cliente_id=cliente_id if cliente_id else None,
                     usuario=request.user,
                     subtotal=subtotal,
@@ -105,24 +115,22 @@ def crear_venta(request):
                     estado_venta=2  # Pagado
                 )
                 
-                # Crear detalles y actualizar stock
-                for prod in productos:
-                    producto = Producto.objects.select_for_update().get(id=prod['producto_id'])
-                    cantidad = int(prod['cantidad'])
-                    
-                    if producto.stock < cantidad:
-                        raise ValueError(f'Stock insuficiente para {producto.descripcion}. Stock actual: {producto.stock}')
-                    
-                    DetalleVenta.objects.create(
-                        venta=venta,
-                        producto=producto,
-                        cantidad=cantidad,
-                        precio_unitario=Decimal(str(prod['precio'])),
-                        subtotal=Decimal(str(prod['subtotal']))
-                    )
-                    
-                    producto.stock -= cantidad
-                    producto.save()
+                # Crear detalles y descontar stock de todo el carrito en bloque
+                errores = descontar_stock_venta(venta, [
+                    {
+                        'producto_id': prod['producto_id'],
+                        'cantidad': prod['cantidad'],
+                        'precio_unitario': prod['precio'],
+                    }
+                    for prod in productos
+                ])
+                
+                if errores:
+                    raise ValueError(' | '.join(error['error'] for error in errores))
+                
+                # Sumar la venta a los totales de la caja abierta y al resumen diario
+                Caja.aplicar_venta(venta)
+                VentaDiaria.aplicar_venta(venta)
                 
                 # Registrar auditoría
                 AuditoriaMovimiento.registrar(
@@ -153,12 +161,11 @@ def crear_venta(request):
             messages.error(request, f'Error al registrar la venta: {str(e)}')
     
     # GET request
+    # Los productos no se cargan acá: el formulario los busca en inventario/productos/buscar/
     clientes = Cliente.objects.filter(estado=1).order_by('nombre')
-    productos = Producto.objects.filter(estado=1, stock__gt=0).select_related('categoria', 'proveedor').order_by('descripcion')
     
     return render(request, 'ventas/crear_venta.html', {
         'clientes': clientes,
-        'productos': productos
     })
 
 
@@ -180,23 +187,27 @@ def anular_venta(request, pk):
     if request.method == 'POST':
         try:
             with transaction.atomic():
-                venta = get_object_or_404(Venta, pk=pk)
+                venta = get_object_or_404(Venta.objects.select_for_update(), pk=pk)
                 
                 if venta.estado_venta == 0:
                     messages.warning(request, 'Esta venta ya está anulada')
                     return redirect('detalle_venta', pk=pk)
                 
-                # Restaurar stock
-                for detalle in venta.detalles.filter(status=1):
-                    if detalle.producto:
-                        producto = Producto.objects.select_for_update().get(id=detalle.producto.id)
-                        producto.stock += detalle.cantidad
-                        producto.save()
+                # Restaurar stock (productos bloqueados en orden de id, como al vender)
+                restaurar_stock_venta(venta.detalles.filter(status=1))
                 
                 # Anular venta
                 venta.estado_venta = 0
                 venta.save()
                 
+                # Descontar la venta de los totales de su caja y de los resúmenes diarios
+                Caja.aplicar_venta(venta, signo=-1)
+                VentaDiaria.aplicar_venta(venta, signo=-1)
+                aplicar_detalles_venta(venta, venta.detalles.filter(status=1), signo=-1)
+                
+                # El comprobante cacheado ya no corresponde
+                invalidar_comprobante(venta)
+                
                 messages.success(request, f'Venta #{venta.codigo_venta} anulada correctamente')
                 return redirect('lista_ventas')
                 
@@ -34,6 +34,7 @@ def abrir_caja(request):
             caja = Caja.objects.create(
                 usuario=request.user,
                 monto_inicial=monto_inicial,
+                monto_final_esperado=monto_inicial,
                 observaciones_apertura=observaciones,
                 estado='abierta'
             )
@@ -79,8 +80,7 @@ def caja_actual(request):
             'mensaje': 'No tienes una caja abierta actualmente.'
         })
     
-    # Calcular totales actualizados
-    caja.calcular_totales()
+    # Los totales se actualizan con cada venta/anulación (Caja.aplicar_venta)
     
     # Obtener ventas recientes de esta caja
     ventas_recientes = caja.ventas.filter(
@@ -116,9 +116,6 @@ def cerrar_caja(request):
         messages.error(request, 'No tienes una caja abierta para cerrar.')
         return redirect('caja_actual')
     
-    # Recalcular totales antes de mostrar
-    caja.calcular_totales()
-    
     if request.method == 'POST':
         try:
             with transaction.atomic():
@@ -237,8 +234,17 @@ def recalcular_caja(request, caja_id):
                 messages.error(request, 'No tienes permiso para recalcular esta caja.')
                 return redirect('historial_cajas')
             
-            caja.calcular_totales()
-            messages.success(request, 'Totales recalculados correctamente.')
+            # Reconciliación: recalcula desde las ventas e informa el desvío
+            diferencias = caja.reconciliar()
+            
+            if diferencias:
+                detalle = ', '.join(
+                    f'{campo}: {guardado} → {calculado}'
+                    for campo, (guardado, calculado) in diferencias.items()
+                )
+                messages.warning(request, f'Se corrigieron diferencias en los totales: {detalle}')
+            else:
+                messages.success(request, 'Totales verificados: no se encontraron diferencias.')
             
         except Exception as e:
             messages.error(request, f'Error al recalcular: {str(e)}')
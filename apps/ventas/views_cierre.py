@@ -4,11 +4,10 @@ from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from django.db import transaction
-from django.db.models import Sum
 from django.utils import timezone
-from datetime import datetime, timedelta
 from decimal import Decimal
-from .models import CierreCaja, Venta
+from .models import CierreCaja, Venta, filtro_turno
+from .totales import resumen_pagos
 
 
 # ======================================================
@@ -71,19 +70,14 @@ def crear_cierre(request):
             messages.error(request, f'Error al crear el cierre: {str(e)}')
 
     # GET — obtener datos previos
-    hora_inicio, hora_fin = CierreCaja.obtener_rango_horario_turno(turno_actual)
-    datetime_inicio, datetime_fin = _obtener_rango_datetime_turno(hoy, turno_actual, hora_inicio, hora_fin)
+    ventas_turno = Venta.objects.filter(filtro_turno(hoy, turno_actual), estado_venta=2)
 
-    ventas_turno = Venta.objects.filter(
-        fecha__gte=datetime_inicio,
-        fecha__lt=datetime_fin,
-        estado_venta=2
-    )
+    resumen = resumen_pagos(ventas_turno)
 
     # ================================================
     # VALIDACIÓN NUEVA — SOLO SE AGREGA ESTO
     # ================================================
-    if ventas_turno.count() == 0:
+    if resumen['cantidad'] == 0:
         context = {
             'fecha': hoy,
             'turno_actual': turno_actual,
@@ -100,9 +94,9 @@ def crear_cierre(request):
         'fecha': hoy,
         'turno_actual': turno_actual,
         'turno_nombre': dict(CierreCaja.TURNOS)[turno_actual],
-        'total_ventas_previo': ventas_turno.aggregate(Sum('total'))['total__sum'] or 0,
-        'cantidad_ventas_previo': ventas_turno.count(),
-        'efectivo_ventas_previo': ventas_turno.filter(tipo_pago='efectivo').aggregate(Sum('total'))['total__sum'] or 0,
+        'total_ventas_previo': resumen['total'],
+        'cantidad_ventas_previo': resumen['cantidad'],
+        'efectivo_ventas_previo': resumen['efectivo'],
     }
 
     return render(request, 'ventas/crear_cierre.html', context)
@@ -115,14 +109,7 @@ def crear_cierre(request):
 def detalle_cierre(request, cierre_id):
     cierre = get_object_or_404(CierreCaja, id=cierre_id)
 
-    hora_inicio, hora_fin = CierreCaja.obtener_rango_horario_turno(cierre.turno)
-    datetime_inicio, datetime_fin = _obtener_rango_datetime_turno(cierre.fecha, cierre.turno, hora_inicio, hora_fin)
-
-    ventas = Venta.objects.filter(
-        fecha__gte=datetime_inicio,
-        fecha__lt=datetime_fin,
-        estado_venta=2
-    ).select_related('cliente', 'usuario').order_by('-fecha')
+    ventas = cierre.ventas_turno().select_related('cliente', 'usuario').order_by('-fecha')
 
     return render(request, 'ventas/detalle_cierre.html', {'cierre': cierre, 'ventas': ventas})
 
@@ -137,28 +124,10 @@ def caja_actual(request):
 
     cierre = CierreCaja.objects.filter(fecha=hoy, turno=turno_actual).first()
 
-    hora_inicio, hora_fin = CierreCaja.obtener_rango_horario_turno(turno_actual)
-    datetime_inicio, datetime_fin = _obtener_rango_datetime_turno(hoy, turno_actual, hora_inicio, hora_fin)
-
-    ventas_turno = Venta.objects.filter(
-        fecha__gte=datetime_inicio,
-        fecha__lt=datetime_fin,
-        estado_venta=2
-    )
-
-    total_ventas = ventas_turno.aggregate(Sum('total'))['total__sum'] or Decimal('0')
-    cantidad_ventas = ventas_turno.count()
+    ventas_turno = Venta.objects.filter(filtro_turno(hoy, turno_actual), estado_venta=2)
 
-    efectivo = ventas_turno.filter(tipo_pago='efectivo').aggregate(Sum('total'))['total__sum'] or Decimal('0')
-    debito = ventas_turno.filter(tipo_pago='debito').aggregate(Sum('total'))['total__sum'] or Decimal('0')
-    credito = ventas_turno.filter(tipo_pago='credito').aggregate(Sum('total'))['total__sum'] or Decimal('0')
-    transferencia = ventas_turno.filter(tipo_pago='transferencia').aggregate(Sum('total'))['total__sum'] or Decimal('0')
-
-    # pagos mixtos
-    pagos_mixtos = ventas_turno.filter(tipo_pago='mixto')
-    for pago in pagos_mixtos:
-        efectivo += pago.monto_efectivo
-        debito += pago.monto_tarjeta
+    # Totales del turno en una sola consulta (incluye el desglose de pagos mixtos)
+    resumen = resumen_pagos(ventas_turno)
 
     ventas_recientes = ventas_turno.select_related('cliente', 'usuario').order_by('-fecha')[:10]
 
@@ -173,12 +142,12 @@ def caja_actual(request):
         'turno_actual': turno_actual,
         'turno_nombre': turnos_info[turno_actual],
         'cierre': cierre,
-        'total_ventas': total_ventas,
-        'cantidad_ventas': cantidad_ventas,
-        'efectivo': efectivo,
-        'debito': debito,
-        'credito': credito,
-        'transferencia': transferencia,
+        'total_ventas': resumen['total'],
+        'cantidad_ventas': resumen['cantidad'],
+        'efectivo': resumen['total_efectivo'],
+        'debito': resumen['total_debito'],
+        'credito': resumen['credito'],
+        'transferencia': resumen['transferencia'],
         'ventas_recientes': ventas_recientes,
         'tiene_cierre': cierre is not None
     }
@@ -208,31 +177,6 @@ def recalcular_cierre(request, cierre_id):
     return redirect('detalle_cierre', cierre_id=cierre_id)
 
 
-# ======================================================
-#  FUNCIÓN AUXILIAR — DEFINITIVA
-# ======================================================
-def _obtener_rango_datetime_turno(fecha, turno, hora_inicio, hora_fin):
-    """
-    Devuelve datetime aware usando zoneinfo (compatible con Python 3.9+)
-    """
-    from django.utils import timezone
-    zona = timezone.get_current_timezone()
-
-    # Crear datetime naive
-    if turno == 'noche':
-        datetime_inicio = datetime.combine(fecha, hora_inicio)
-        datetime_fin = datetime.combine(fecha + timedelta(days=1), hora_fin)
-    else:
-        datetime_inicio = datetime.combine(fecha, hora_inicio)
-        datetime_fin = datetime.combine(fecha, hora_fin)
-
-    # Convertir a aware usando zoneinfo
-    datetime_inicio = datetime_inicio.replace(tzinfo=zona)
-    datetime_fin = datetime_fin.replace(tzinfo=zona)
-
-    return datetime_inicio, datetime_fin
-
-
 @login_required
 def registrar_cierre_sin_actividad(request):
     """
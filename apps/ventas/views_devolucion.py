@@ -8,10 +8,12 @@ from django.http import JsonResponse
 from django.utils import timezone
 from decimal import Decimal
 
+from motoshop_django.replicas import usar_replica
 from .models import (
     Venta, DetalleVenta, Devolucion, DetalleDevolucion, 
     NotaCredito, AuditoriaMovimiento
 )
+from .secuencias import siguiente_codigo
 
 
 @login_required
@@ -63,8 +65,7 @@ def crear_devolucion(request, venta_id):
                 descripcion_motivo = request.POST.get('descripcion_motivo')
                 
                 # Generar código de devolución
-                ultimo_codigo = Devolucion.objects.order_by('-id').first()
-                nuevo_codigo = (ultimo_codigo.id + 1) if ultimo_codigo else 1000
+                nuevo_codigo = siguiente_codigo('devolucion')
                 
                 # Crear devolución
                 devolucion = Devolucion.objects.create(
@@ -383,6 +384,7 @@ def aplicar_nota_credito(request, nota_id):
 # ================================================
 
 @login_required
+@usar_replica
 def auditoria_movimientos(request):
     """Muestra el registro de auditoría"""
     from datetime import datetime, timedelta
@@ -1,5 +1,6 @@
 # apps/ventas/views_exportacion.py
-from django.http import HttpResponse
+from django.http import HttpResponse, HttpResponseBadRequest, FileResponse, StreamingHttpResponse, JsonResponse
+from django.urls import reverse
 from django.shortcuts import get_object_or_404
 from django.contrib.auth.decorators import login_required
 from reportlab.lib.pagesizes import letter, A4
@@ -8,226 +9,169 @@ from reportlab.lib.units import inch
 from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.lib.enums import TA_CENTER, TA_RIGHT
-import openpyxl
-from openpyxl.styles import Font, Alignment, PatternFill
 from datetime import datetime
+import tempfile
+from motoshop_django.replicas import usar_replica
+from apps.reportes.trabajos import encolar, estado_trabajo
 from .models import Venta, Caja
+from .comprobantes import (
+    LIMITE_LOTE_SINCRONO, comprobante_pdf, lote_comprobantes, lote_en_cache, comprobantes_lote_pdf
+)
+from .exportacion import (
+    filtros_ventas, filtro_caja, ventas_filtradas, escribir_ventas_excel, escribir_ventas_pdf,
+    describir_filtros, filtros_datos, exportar_datos, LIMITE_EXPORTACION_SINCRONA
+)
+
+
+def _respuesta_en_cola(tipo, parametros, usuario):
+    """Encola el trabajo y responde 202 con los datos para sondearlo (ver static/js/trabajos.js)"""
+    trabajo = encolar(tipo, parametros, usuario)
+    return JsonResponse({
+        'success': True,
+        **estado_trabajo(trabajo),
+        'url_estado': reverse('estado_trabajo', args=[trabajo.id]),
+        'url_descarga': reverse('descargar_trabajo', args=[trabajo.id]),
+    }, status=202)
 
 
 @login_required
+@usar_replica
 def exportar_ventas_excel(request):
-    """Exportar ventas a Excel"""
-    # Crear workbook
-    wb = openpyxl.Workbook()
-    ws = wb.active
-    ws.title = "Ventas"
-    
-    # Estilos
-    header_font = Font(bold=True, color="FFFFFF")
-    header_fill = PatternFill(start_color="4472C4", end_color="4472C4", fill_type="solid")
-    center_align = Alignment(horizontal="center", vertical="center")
-    
-    # Headers
-    headers = ['N° Venta', 'Fecha', 'Cliente', 'Total', 'Método Pago', 'Estado', 'Caja']
-    ws.append(headers)
-    
-    # Aplicar estilo a headers
-    for cell in ws[1]:
-        cell.font = header_font
-        cell.fill = header_fill
-        cell.alignment = center_align
-    
-    # Datos
-    ventas = Venta.objects.select_related('cliente', 'caja').all()
-    
-    for venta in ventas:
-        ws.append([
-            venta.numero_venta,
-            venta.fecha.strftime('%d/%m/%Y %H:%M'),
-            venta.cliente.nombre,
-            float(venta.total),
-            venta.get_metodo_pago_display(),
-            venta.get_estado_display(),
-            f"Caja #{venta.caja.numero}" if venta.caja else "Sin caja"
-        ])
-    
-    # Ajustar ancho de columnas
-    for column in ws.columns:
-        max_length = 0
-        column = [cell for cell in column]
-        for cell in column:
-            try:
-                if len(str(cell.value)) > max_length:
-                    max_length = len(cell.value)
-            except:
-                pass
-        adjusted_width = (max_length + 2)
-        ws.column_dimensions[column[0].column_letter].width = adjusted_width
-    
-    # Preparar respuesta
-    response = HttpResponse(
+    """
+    Exportar ventas a Excel. Acepta los filtros de reporte_ventas
+    (fecha_desde, fecha_hasta, tipo_pago); sin filtros exporta todo.
+    El libro se arma en un archivo temporal y se envía en bloques; con más
+    de LIMITE_EXPORTACION_SINCRONA ventas se manda a la cola y se responde 202.
+    """
+    try:
+        desde, hasta, tipo_pago = filtros_ventas(request.GET)
+    except ValueError as e:
+        return HttpResponseBadRequest(str(e))
+    
+    ventas = ventas_filtradas(desde, hasta, tipo_pago)
+    if ventas.count() > LIMITE_EXPORTACION_SINCRONA:
+        return _respuesta_en_cola('ventas_excel', request.GET.dict(), request.user)
+    
+    archivo = tempfile.TemporaryFile()
+    try:
+        escribir_ventas_excel(ventas, archivo)
+    except Exception:
+        archivo.close()
+        raise
+    archivo.seek(0)
+    
+    # FileResponse lee el archivo en bloques y lo cierra al terminar
+    return FileResponse(
+        archivo,
+        as_attachment=True,
+        filename=f'ventas_{datetime.now().strftime("%Y%m%d_%H%M%S")}.xlsx',
         content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
     )
-    response['Content-Disposition'] = f'attachment; filename=ventas_{datetime.now().strftime("%Y%m%d_%H%M%S")}.xlsx'
-    
-    wb.save(response)
+
+
+@login_required
+@usar_replica
+def exportar_datos_crudos(request, recurso):
+    """
+    Datos crudos en CSV o NDJSON para contabilidad y procesos de BI:
+    recurso = ventas | detalles | auditoria.
+    Parámetros: formato (csv|ndjson), fecha_desde, fecha_hasta,
+    desde_id / desde_fecha (extracción incremental) y gzip=1.
+    """
+    formato = request.GET.get('formato', 'csv')
+    comprimir = request.GET.get('gzip') == '1'
+    
+    try:
+        filas = filtros_datos(recurso, request.GET)
+        contenido = exportar_datos(filas, recurso, formato, comprimir)
+    except ValueError as e:
+        return HttpResponseBadRequest(str(e))
+    
+    nombre = f'{recurso}_{datetime.now().strftime("%Y%m%d_%H%M%S")}.{formato}'
+    if comprimir:
+        nombre += '.gz'
+        tipo = 'application/gzip'
+    elif formato == 'csv':
+        tipo = 'text/csv; charset=utf-8'
+    else:
+        tipo = 'application/x-ndjson; charset=utf-8'
+    
+    response = StreamingHttpResponse(contenido, content_type=tipo)
+    response['Content-Disposition'] = f'attachment; filename={nombre}'
     return response
 
 
 @login_required
+@usar_replica
 def exportar_ventas_pdf(request):
-    """Exportar listado de ventas a PDF"""
-    response = HttpResponse(content_type='application/pdf')
-    response['Content-Disposition'] = f'attachment; filename=ventas_{datetime.now().strftime("%Y%m%d_%H%M%S")}.pdf'
-    
-    doc = SimpleDocTemplate(response, pagesize=letter)
-    elements = []
-    styles = getSampleStyleSheet()
-    
-    # Título
-    title_style = ParagraphStyle(
-        'CustomTitle',
-        parent=styles['Heading1'],
-        fontSize=24,
-        textColor=colors.HexColor('#4472C4'),
-        spaceAfter=30,
-        alignment=TA_CENTER
+    """
+    Exportar listado de ventas a PDF. Filtros: fecha_desde, fecha_hasta,
+    tipo_pago y caja. Se dibuja de a una página por vez en un archivo temporal;
+    con más de LIMITE_EXPORTACION_SINCRONA ventas se manda a la cola (202).
+    """
+    try:
+        desde, hasta, tipo_pago = filtros_ventas(request.GET)
+        caja_id = filtro_caja(request.GET)
+    except ValueError as e:
+        return HttpResponseBadRequest(str(e))
+    
+    ventas = ventas_filtradas(desde, hasta, tipo_pago, caja_id)
+    if ventas.count() > LIMITE_EXPORTACION_SINCRONA:
+        return _respuesta_en_cola('ventas_pdf', request.GET.dict(), request.user)
+    
+    archivo = tempfile.TemporaryFile()
+    try:
+        escribir_ventas_pdf(
+            ventas,
+            archivo,
+            subtitulo=describir_filtros(desde, hasta, tipo_pago, caja_id)
+        )
+    except Exception:
+        archivo.close()
+        raise
+    archivo.seek(0)
+    
+    return FileResponse(
+        archivo,
+        as_attachment=True,
+        filename=f'ventas_{datetime.now().strftime("%Y%m%d_%H%M%S")}.pdf',
+        content_type='application/pdf'
     )
-    
-    elements.append(Paragraph("Listado de Ventas", title_style))
-    elements.append(Spacer(1, 0.5*inch))
-    
-    # Datos
-    ventas = Venta.objects.select_related('cliente', 'caja').all()
-    
-    data = [['N° Venta', 'Fecha', 'Cliente', 'Total', 'Estado', 'Caja']]
-    
-    for venta in ventas:
-        data.append([
-            venta.numero_venta,
-            venta.fecha.strftime('%d/%m/%Y'),
-            venta.cliente.nombre,
-            f'${venta.total:.2f}',
-            venta.get_estado_display(),
-            f"#{venta.caja.numero}" if venta.caja else "N/A"
-        ])
-    
-    # Crear tabla
-    table = Table(data, colWidths=[1*inch, 1.2*inch, 2*inch, 1*inch, 1*inch, 1*inch])
-    
-    table.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#4472C4')),
-        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-        ('FONTSIZE', (0, 0), (-1, 0), 12),
-        ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-        ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
-        ('GRID', (0, 0), (-1, -1), 1, colors.black),
-    ]))
-    
-    elements.append(table)
-    doc.build(elements)
-    
-    return response
 
 
 @login_required
 def exportar_venta_pdf(request, venta_id):
-    """Exportar una venta individual a PDF"""
-    venta = get_object_or_404(Venta, id=venta_id)
-    
-    response = HttpResponse(content_type='application/pdf')
-    response['Content-Disposition'] = f'attachment; filename=venta_{venta.numero_venta}.pdf'
-    
-    doc = SimpleDocTemplate(response, pagesize=letter)
-    elements = []
-    styles = getSampleStyleSheet()
-    
-    # Título
-    title_style = ParagraphStyle(
-        'CustomTitle',
-        parent=styles['Heading1'],
-        fontSize=24,
-        textColor=colors.HexColor('#4472C4'),
-        spaceAfter=30,
-        alignment=TA_CENTER
-    )
-    
-    elements.append(Paragraph(f"Venta #{venta.numero_venta}", title_style))
-    elements.append(Spacer(1, 0.3*inch))
-    
-    # Información general
-    info_data = [
-        ['Fecha:', venta.fecha.strftime('%d/%m/%Y %H:%M')],
-        ['Cliente:', venta.cliente.nombre],
-        ['Método de Pago:', venta.get_metodo_pago_display()],
-        ['Estado:', venta.get_estado_display()],
-    ]
+    """Exportar una venta individual a PDF (desde la caché de comprobantes si se puede)"""
+    venta = get_object_or_404(Venta.objects.select_related('cliente', 'usuario'), id=venta_id)
     
-    if venta.caja:
-        info_data.append(['Caja:', f"#{venta.caja.numero}"])
-    
-    info_table = Table(info_data, colWidths=[2*inch, 4*inch])
-    info_table.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (0, -1), colors.HexColor('#E7E9EB')),
-        ('TEXTCOLOR', (0, 0), (0, -1), colors.black),
-        ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-        ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
-        ('GRID', (0, 0), (-1, -1), 1, colors.black),
-    ]))
-    
-    elements.append(info_table)
-    elements.append(Spacer(1, 0.5*inch))
-    
-    # Productos
-    elements.append(Paragraph("Productos", styles['Heading2']))
-    elements.append(Spacer(1, 0.2*inch))
-    
-    productos_data = [['Producto', 'Cantidad', 'Precio Unit.', 'Subtotal']]
-    
-    for detalle in venta.detalles.all():
-        productos_data.append([
-            detalle.producto.nombre,
-            str(detalle.cantidad),
-            f'${detalle.precio_unitario:.2f}',
-            f'${detalle.subtotal:.2f}'
-        ])
-    
-    productos_table = Table(productos_data, colWidths=[3*inch, 1*inch, 1.5*inch, 1.5*inch])
-    productos_table.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#4472C4')),
-        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-        ('GRID', (0, 0), (-1, -1), 1, colors.black),
-    ]))
-    
-    elements.append(productos_table)
-    elements.append(Spacer(1, 0.3*inch))
-    
-    # Totales
-    totales_data = [
-        ['Subtotal:', f'${venta.subtotal:.2f}'],
-        ['IVA (21%):', f'${venta.iva:.2f}'],
-        ['TOTAL:', f'${venta.total:.2f}']
-    ]
-    
-    totales_table = Table(totales_data, colWidths=[4.5*inch, 2*inch])
-    totales_table.setStyle(TableStyle([
-        ('ALIGN', (0, 0), (-1, -1), 'RIGHT'),
-        ('FONTNAME', (0, -1), (-1, -1), 'Helvetica-Bold'),
-        ('FONTSIZE', (0, -1), (-1, -1), 14),
-        ('TEXTCOLOR', (0, -1), (-1, -1), colors.HexColor('#4472C4')),
-    ]))
-    
-    elements.append(totales_table)
-    
-    doc.build(elements)
+    response = HttpResponse(comprobante_pdf(venta), content_type='application/pdf')
+    response['Content-Disposition'] = f'attachment; filename=venta_{venta.codigo_venta}.pdf'
+    return response
+
+
+@login_required
+@usar_replica
+def exportar_comprobantes(request):
+    """
+    Todos los comprobantes de una caja (?caja=<id>) o de un turno
+    (?cierre=<id>) en un solo PDF. Los lotes grandes que no están en caché
+    se mandan a la cola de trabajos y se responde 202 con el trabajo.
+    """
+    try:
+        ventas, nombre = lote_comprobantes(request.GET)
+    except ValueError as e:
+        return HttpResponseBadRequest(str(e))
+    
+    if ventas.count() > LIMITE_LOTE_SINCRONO and not lote_en_cache(ventas):
+        return _respuesta_en_cola('comprobantes', request.GET.dict(), request.user)
+    
+    response = HttpResponse(comprobantes_lote_pdf(ventas), content_type='application/pdf')
+    response['Content-Disposition'] = f'attachment; filename={nombre}'
     return response
 
 
 @login_required
+@usar_replica
 def exportar_caja_pdf(request, caja_id):
     """Exportar resumen de caja a PDF"""
     caja = get_object_or_404(Caja, id=caja_id)
@@ -1,78 +1,155 @@
 # apps/ventas/views_tickets.py
-# AGREGAR ESTAS VISTAS AL PROYECTO
 
 from django.shortcuts import render, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.http import JsonResponse
 from django.db import transaction
 from django.utils import timezone
-from django.views.decorators.http import require_http_methods
+from django.views.decorators.http import require_http_methods, condition
+from django.views.decorators.cache import cache_control
+from django.db.models import Count, Max, Q
 import json
 from decimal import Decimal
 
 from .models import Ticket, DetalleTicket, Venta, DetalleVenta
+from .secuencias import siguiente_codigo
 from apps.inventario.models import Producto
 from apps.clientes.models import Cliente
 
 
+def _lineas_ticket(productos):
+    """
+    Valida el carrito contra el stock con una sola consulta (in_bulk) y
+    devuelve {producto_id: (producto, cantidad, precio_unitario, subtotal)}.
+    Las líneas repetidas de un mismo producto se suman (deben tener el mismo
+    precio) y el subtotal se calcula acá, no se toma el del navegador.
+    """
+    cantidades, precios = {}, {}
+    for prod_data in productos:
+        producto_id = int(prod_data['producto_id'])
+        cantidad = int(prod_data['cantidad'])
+        if cantidad <= 0:
+            raise ValueError('Las cantidades deben ser mayores a 0')
+        
+        precio = Decimal(str(prod_data['precio']))
+        if precios.setdefault(producto_id, precio) != precio:
+            raise ValueError('Un mismo producto no puede tener dos precios en el ticket')
+        cantidades[producto_id] = cantidades.get(producto_id, 0) + cantidad
+    
+    en_base = Producto.objects.in_bulk(list(cantidades))
+    if len(en_base) != len(cantidades):
+        raise ValueError('Uno o más productos no existen')
+    
+    lineas = {}
+    for producto_id, cantidad in cantidades.items():
+        producto = en_base[producto_id]
+        if producto.stock < cantidad:
+            raise ValueError(f'Stock insuficiente para {producto.descripcion}')
+        lineas[producto_id] = (producto, cantidad, precios[producto_id], cantidad * precios[producto_id])
+    
+    return lineas
+
+
+def _totales_ticket(ticket, subtotal, descuento):
+    """Asigna descuento y totales al ticket (sin guardarlo)"""
+    valor = Decimal(str(descuento.get('valor') or 0))
+    ticket.descuento_porcentaje = valor if descuento.get('tipo') == 'porcentaje' else 0
+    ticket.descuento_monto = valor if descuento.get('tipo') == 'monto' else 0
+    
+    ticket.subtotal = subtotal
+    if ticket.descuento_porcentaje > 0:
+        ticket.descuento = subtotal * (ticket.descuento_porcentaje / 100)
+    else:
+        ticket.descuento = ticket.descuento_monto
+    ticket.total = subtotal - ticket.descuento
+
+
+def _nuevo_detalle(ticket, producto, cantidad, precio, subtotal):
+    return DetalleTicket(
+        ticket=ticket, producto=producto, descripcion=producto.descripcion or '',
+        cantidad=cantidad, precio_unitario=precio, subtotal=subtotal,
+    )
+
+
+def _actualizar_detalles(ticket, lineas):
+    """
+    Re-guardado de un ticket recuperado: compara con sus detalles activos y
+    sólo actualiza, agrega o da de baja (activo=False) lo que cambió.
+    """
+    existentes = {}
+    sobrantes = []
+    for detalle in ticket.detalles.filter(activo=True):
+        if detalle.producto_id in lineas and detalle.producto_id not in existentes:
+            existentes[detalle.producto_id] = detalle
+        else:
+            sobrantes.append(detalle.id)
+    
+    cambiados, nuevos = [], []
+    for producto_id, (producto, cantidad, precio, subtotal) in lineas.items():
+        detalle = existentes.get(producto_id)
+        if detalle is None:
+            nuevos.append(_nuevo_detalle(ticket, producto, cantidad, precio, subtotal))
+        elif (detalle.cantidad, detalle.precio_unitario, detalle.subtotal) != (cantidad, precio, subtotal):
+            detalle.cantidad, detalle.precio_unitario, detalle.subtotal = cantidad, precio, subtotal
+            cambiados.append(detalle)
+    
+    if sobrantes:
+        DetalleTicket.objects.filter(id__in=sobrantes).update(activo=False)
+    if cambiados:
+        DetalleTicket.objects.bulk_update(cambiados, ['cantidad', 'precio_unitario', 'subtotal'])
+    if nuevos:
+        DetalleTicket.objects.bulk_create(nuevos)
+
+
 @login_required
 @require_http_methods(["POST"])
 def guardar_ticket(request):
-    """Guarda un ticket (venta en espera)"""
+    """
+    Guarda un ticket (venta en espera). Con `ticket_id` (un ticket pendiente
+    recuperado) lo actualiza en lugar de crear otro.
+    """
     try:
         data = json.loads(request.body)
         productos = data.get('productos', [])
-        descuento = data.get('descuento', {'tipo': 'porcentaje', 'valor': 0})
+        descuento = data.get('descuento') or {'tipo': 'porcentaje', 'valor': 0}
         cliente_id = data.get('cliente_id')
         observacion = data.get('observacion', '')
+        ticket_id = data.get('ticket_id')
         
         if not productos:
             return JsonResponse({'success': False, 'error': 'No hay productos en el carrito'})
         
+        lineas = _lineas_ticket(productos)
+        subtotal = sum((linea[3] for linea in lineas.values()), Decimal('0'))
+        
         with transaction.atomic():
-            # Generar código de ticket
-            ultimo_ticket = Ticket.objects.order_by('-codigo_ticket').first()
-            nuevo_codigo = (ultimo_ticket.codigo_ticket + 1) if ultimo_ticket else 1
-            
-            # Crear ticket
-            ticket = Ticket.objects.create(
-                ticket_id=f"TKT-{nuevo_codigo:06d}",
-                codigo_ticket=nuevo_codigo,
-                usuario=request.user,
-                cliente_id=cliente_id if cliente_id else None,
-                observacion=observacion,
-                descuento_porcentaje=descuento['valor'] if descuento['tipo'] == 'porcentaje' else 0,
-                descuento_monto=descuento['valor'] if descuento['tipo'] == 'monto' else 0,
-                estado='pendiente'
-            )
-            
-            # Crear detalles
-            subtotal = Decimal('0')
-            for prod_data in productos:
-                producto = Producto.objects.get(id=prod_data['producto_id'])
-                
-                # Validar stock
-                if producto.stock < int(prod_data['cantidad']):
-                    raise ValueError(f'Stock insuficiente para {producto.descripcion}')
-                
-                detalle = DetalleTicket.objects.create(
-                    ticket=ticket,
-                    producto=producto,
-                    descripcion=producto.descripcion,
-                    cantidad=int(prod_data['cantidad']),
-                    precio_unitario=Decimal(str(prod_data['precio'])),
-                    subtotal=Decimal(str(prod_data['subtotal']))
-                )
-                subtotal += detalle.subtotal
-            
-            # Calcular totales
-            ticket.subtotal = subtotal
-            if ticket.descuento_porcentaje > 0:
-                ticket.descuento = subtotal * (ticket.descuento_porcentaje / 100)
+            if ticket_id:
+                ticket = Ticket.objects.select_for_update().filter(
+                    id=ticket_id, usuario=request.user, estado='pendiente'
+                ).first()
+                if ticket is None:
+                    raise ValueError('El ticket no existe o ya no está pendiente')
+                ticket.cliente_id = cliente_id if cliente_id else None
+                ticket.observacion = observacion
+                _totales_ticket(ticket, subtotal, descuento)
+                ticket.save()
+                _actualizar_detalles(ticket, lineas)
             else:
-                ticket.descuento = ticket.descuento_monto
-            ticket.total = subtotal - ticket.descuento
-            ticket.save()
+                nuevo_codigo = siguiente_codigo('ticket')
+                ticket = Ticket(
+                    ticket_id=f"TKT-{nuevo_codigo:06d}",
+                    codigo_ticket=nuevo_codigo,
+                    usuario=request.user,
+                    cliente_id=cliente_id if cliente_id else None,
+                    observacion=observacion,
+                    estado='pendiente'
+                )
+                _totales_ticket(ticket, subtotal, descuento)
+                ticket.save()
+                
+                DetalleTicket.objects.bulk_create([
+                    _nuevo_detalle(ticket, *linea) for linea in lineas.values()
+                ])
         
         return JsonResponse({
             'success': True,
@@ -88,25 +165,48 @@ def guardar_ticket(request):
         return JsonResponse({'success': False, 'error': str(e)})
 
 
+def _tickets_pendientes(usuario):
+    return Ticket.objects.filter(usuario=usuario, estado='pendiente')
+
+
+def _etag_tickets(request):
+    """
+    Cambia cuando cambia algún ticket pendiente del usuario o sale uno de la
+    lista (guardar, finalizar y cancelar hacen save(), que actualiza
+    fecha_actualizacion). Sólo lee la tabla de tickets.
+    """
+    if not request.user.is_authenticated:
+        return None
+    estado = _tickets_pendientes(request.user).aggregate(
+        cantidad=Count('id'), ultimo=Max('fecha_actualizacion')
+    )
+    ultimo = estado['ultimo'].isoformat() if estado['ultimo'] else ''
+    return f"tickets-{request.user.id}-{estado['cantidad']}-{ultimo}"
+
+
 @login_required
+@cache_control(private=True, no_cache=True)
+@condition(etag_func=_etag_tickets)
 def lista_tickets(request):
-    """Devuelve la lista de tickets pendientes"""
+    """
+    Devuelve la lista de tickets pendientes (una sola consulta). El POS la
+    consulta seguido: con If-None-Match y sin cambios responde 304.
+    """
     try:
-        tickets = Ticket.objects.filter(
-            usuario=request.user,
-            estado='pendiente'
-        ).order_by('-fecha_creacion')
-        
-        tickets_data = []
-        for ticket in tickets:
-            tickets_data.append({
-                'id': ticket.id,
-                'codigo_ticket': ticket.codigo_ticket,
-                'ticket_id': ticket.ticket_id,
-                'total': float(ticket.total),
-                'fecha_creacion': ticket.fecha_creacion.strftime('%d/%m/%Y %H:%M'),
-                'items_count': ticket.detalles.filter(activo=True).count()
-            })
+        tickets = _tickets_pendientes(request.user).annotate(
+            items_count=Count('detalles', filter=Q(detalles__activo=True))
+        ).order_by('-fecha_creacion').values(
+            'id', 'codigo_ticket', 'ticket_id', 'total', 'fecha_creacion', 'items_count'
+        )
+        
+        tickets_data = [
+            {
+                **ticket,
+                'total': float(ticket['total']),
+                'fecha_creacion': timezone.localtime(ticket['fecha_creacion']).strftime('%d/%m/%Y %H:%M'),
+            }
+            for ticket in tickets
+        ]
         
         return JsonResponse({'tickets': tickets_data})
         
@@ -122,7 +222,7 @@ def recuperar_ticket(request, ticket_id):
         
         # Obtener productos del ticket
         productos = []
-        for detalle in ticket.detalles.filter(activo=True):
+        for detalle in ticket.detalles.filter(activo=True).select_related('producto'):
             # Verificar stock actual
             if detalle.producto and detalle.producto.stock < detalle.cantidad:
                 return JsonResponse({
@@ -1,13 +1,19 @@
 """
 Script para cargar datos de prueba en MotoShop Django
 Ejecutar: python manage.py shell < cargar_datos_prueba.py
+
+Volumen para auditar índices y medir rendimiento (opcional):
+    PRUEBA_PRODUCTOS=50000 PRUEBA_VENTAS=1000000 python manage.py shell < cargar_datos_prueba.py
+(PRUEBA_CLIENTES y PRUEBA_TICKETS también se pueden indicar)
 """
 
 from django.contrib.auth.models import User
 from apps.usuarios.models import RolUsuario, UsuarioExtendido
 from apps.inventario.models import Categoria, Proveedor, Producto
 from apps.clientes.models import Cliente
-from apps.ventas.models import Venta, DetalleVenta
+from apps.ventas.models import Venta, DetalleVenta, Ticket, DetalleTicket, turno_de_hora
+from apps.ventas.secuencias import siguiente_codigo, reservar_codigos
+from apps.ventas.resumenes import reconstruir_ventas_diarias, reconstruir_productos_diarios
 from decimal import Decimal
 
 print("=== INICIANDO CARGA DE DATOS DE PRUEBA ===\n")
@@ -309,9 +315,6 @@ ventas_data = [
     },
 ]
 
-ultimo_codigo = Venta.objects.order_by('-codigo_venta').first()
-codigo_venta = (ultimo_codigo.codigo_venta + 1) if ultimo_codigo else 1000
-
 for i, venta_data in enumerate(ventas_data):
     total = Decimal('0')
     productos_venta = []
@@ -337,7 +340,7 @@ for i, venta_data in enumerate(ventas_data):
         usuario=vendedor,
         total=total,
         tipo_pago=venta_data['tipo_pago'],
-        codigo_venta=codigo_venta + i,
+        codigo_venta=siguiente_codigo('venta'),
         estado=1,
         estado_venta=2  # Pagado
     )
@@ -352,11 +355,138 @@ for i, venta_data in enumerate(ventas_data):
             cantidad=prod['cantidad'],
             precio_unitario=prod['precio_unitario'],
             subtotal=prod['subtotal'],
+            costo_unitario=prod['producto'].precio_costo,
             status=1
         )
     
     print(f"  ✓ Venta #{venta.codigo_venta} creada - Total: ${total}")
 
+# 8. VOLUMEN (opcional)
+import os
+from django.db import transaction
+from django.utils import timezone
+
+LOTE = 5000
+volumen_productos = int(os.environ.get('PRUEBA_PRODUCTOS', 0))
+volumen_ventas = int(os.environ.get('PRUEBA_VENTAS', 0))
+volumen_clientes = int(os.environ.get('PRUEBA_CLIENTES', volumen_ventas // 200))
+volumen_tickets = int(os.environ.get('PRUEBA_TICKETS', volumen_ventas // 100))
+
+if volumen_productos:
+    print(f"\n8a. Generando {volumen_productos} productos...")
+    categorias = list(Categoria.objects.values_list('id', flat=True))
+    proveedores = list(Proveedor.objects.values_list('id', flat=True))
+    primero = reservar_codigos('producto', volumen_productos)
+    for inicio in range(0, volumen_productos, LOTE):
+        nuevos = []
+        for codigo in range(primero + inicio, primero + min(inicio + LOTE, volumen_productos)):
+            costo = Decimal(random.randint(500, 90000))
+            nuevos.append(Producto(
+                codigo=codigo,
+                descripcion=f"Repuesto {codigo} {random.choice(['Honda', 'Yamaha', 'Suzuki', 'Motomel', 'Zanella', 'Gilera'])}",
+                precio_costo=costo,
+                precio_venta=(costo * Decimal('1.4')).quantize(Decimal('0.01')),
+                stock=random.randint(0, 120),
+                stock_minimo=random.choice([2, 5, 10]),
+                categoria_id=random.choice(categorias),
+                proveedor_id=random.choice(proveedores),
+                estado=1 if random.random() > 0.05 else 0,
+            ))
+        Producto.objects.bulk_create(nuevos)
+    print(f"  ✓ Productos: {Producto.objects.count()}")
+
+if volumen_ventas:
+    print(f"\n8b. Generando {volumen_clientes} clientes, {volumen_ventas} ventas y {volumen_tickets} tickets...")
+    codigo_cliente = (Cliente.objects.order_by('-codigo_cliente').values_list('codigo_cliente', flat=True).first() or 0) + 1
+    for inicio in range(0, volumen_clientes, LOTE):
+        Cliente.objects.bulk_create([
+            Cliente(
+                nombre=f"Cliente {numero}",
+                apellido=random.choice(['Pérez', 'González', 'Díaz', 'Romero', 'Sosa', 'Álvarez']),
+                codigo_cliente=numero,
+                condicion_iva='Consumidor Final',
+            )
+            for numero in range(codigo_cliente + inicio, codigo_cliente + min(inicio + LOTE, volumen_clientes))
+        ])
+
+    productos_venta = list(Producto.objects.filter(estado=1).values_list('id', 'precio_venta', 'precio_costo'))
+    clientes_venta = list(Cliente.objects.values_list('id', flat=True))
+    vendedores = list(User.objects.filter(is_active=True).values_list('id', flat=True))
+    tipos_pago = [tipo for tipo, _ in Venta.TIPO_PAGO]
+    ahora = timezone.now()
+
+    # Las ventas se crean con bulk_create (sin save): las columnas locales se completan acá
+    primero = reservar_codigos('venta', volumen_ventas)
+    for inicio in range(0, volumen_ventas, LOTE):
+        ventas, lineas = [], []
+        for codigo in range(primero + inicio, primero + min(inicio + LOTE, volumen_ventas)):
+            fecha = ahora - timedelta(seconds=random.randint(0, 365 * 24 * 3600))
+            local = timezone.localtime(fecha)
+            items = [random.choice(productos_venta) for _ in range(random.randint(1, 4))]
+            cantidades = [random.randint(1, 3) for _ in items]
+            total = sum(precio * cantidad for (_, precio, _), cantidad in zip(items, cantidades))
+            ventas.append(Venta(
+                cliente_id=random.choice(clientes_venta) if random.random() < 0.6 else None,
+                usuario_id=random.choice(vendedores),
+                fecha=fecha,
+                fecha_local=local.date(),
+                hora_local=local.hour,
+                turno=turno_de_hora(local.hour),
+                total=total,
+                subtotal=total,
+                tipo_pago=random.choice(tipos_pago),
+                codigo_venta=codigo,
+                estado_venta=random.choices([2, 1, 0], weights=[90, 5, 5])[0],
+            ))
+            lineas.append(list(zip(items, cantidades)))
+
+        with transaction.atomic():
+            Venta.objects.bulk_create(ventas)
+            DetalleVenta.objects.bulk_create([
+                DetalleVenta(
+                    venta_id=venta.id,
+                    producto_id=producto_id,
+                    cantidad=cantidad,
+                    precio_unitario=precio,
+                    subtotal=precio * cantidad,
+                    costo_unitario=costo,
+                )
+                for venta, items in zip(ventas, lineas)
+                for (producto_id, precio, costo), cantidad in items
+            ])
+        print(f"  ✓ {inicio + len(ventas)} ventas")
+
+    primero = reservar_codigos('ticket', volumen_tickets)
+    for inicio in range(0, volumen_tickets, LOTE):
+        tickets = [
+            Ticket(
+                ticket_id=f"TKT-{codigo:06d}",
+                codigo_ticket=codigo,
+                usuario_id=random.choice(vendedores),
+                estado=random.choices(['finalizado', 'cancelado', 'pendiente'], weights=[80, 15, 5])[0],
+            )
+            for codigo in range(primero + inicio, primero + min(inicio + LOTE, volumen_tickets))
+        ]
+        with transaction.atomic():
+            Ticket.objects.bulk_create(tickets)
+            DetalleTicket.objects.bulk_create([
+                DetalleTicket(
+                    ticket_id=ticket.id,
+                    producto_id=producto_id,
+                    descripcion='',
+                    cantidad=1,
+                    precio_unitario=precio,
+                    subtotal=precio,
+                )
+                for ticket in tickets
+                for producto_id, precio, _ in random.sample(productos_venta, min(2, len(productos_venta)))
+            ])
+
+# Las fechas de las ventas se cambiaron después de crearlas: recalcular los resúmenes diarios
+reconstruir_ventas_diarias()
+reconstruir_productos_diarios()
+print("  ✓ Resúmenes de ventas diarias actualizados")
+
 print("\n=== CARGA DE DATOS COMPLETADA ===")
 print("\nRESUMEN:")
 print(f"  • Roles: {RolUsuario.objects.count()}")
@@ -29,7 +29,8 @@ django.setup()
 # ---------------------------------------------
 # IMPORTAR MODELOS
 # ---------------------------------------------
-from apps.usuarios.models import Permiso, RolUsuario, RolPermiso
+from apps.usuarios.models import Permiso, RolUsuario
+from apps.usuarios.permisos import aplicar_cambios_permisos
 
 print("\n=== CARGANDO PERMISOS DEL SISTEMA ===\n")
 
@@ -81,55 +82,57 @@ permisos_data = [
 
 print("1. Creando permisos...\n")
 
+existentes = set(Permiso.objects.values_list('codigo', flat=True))
+
+# Un solo INSERT; los que ya existen se ignoran
+Permiso.objects.bulk_create(
+    [Permiso(**perm_data) for perm_data in permisos_data],
+    ignore_conflicts=True
+)
+
 for perm_data in permisos_data:
-    permiso, created = Permiso.objects.get_or_create(
-        codigo=perm_data["codigo"],
-        defaults=perm_data
-    )
-    print(f"{'✓' if created else '-'} {perm_data['nombre']}")
+    print(f"{'-' if perm_data['codigo'] in existentes else '✓'} {perm_data['nombre']}")
 
 print("\n2. Asignando permisos a roles...\n")
 
-# ADMIN
-try:
-    rol_admin = RolUsuario.objects.get(tipo='admin')
-    for permiso in Permiso.objects.all():
-        RolPermiso.objects.get_or_create(rol=rol_admin, permiso=permiso)
-    print("  ✓ Admin: permisos asignados")
-except RolUsuario.DoesNotExist:
-    print("  ⚠ Rol 'admin' no existe")
-
-# VENTAS
-try:
-    rol_ventas = RolUsuario.objects.get(tipo='ventas')
-    codigos_ventas = [
+permisos_por_rol = {
+    # ADMIN: todos los permisos
+    'admin': list(Permiso.objects.values_list('codigo', flat=True)),
+
+    # VENTAS
+    'ventas': [
         'ver_dashboard',
         'ver_productos',
         'ver_categorias',
         'ver_ventas', 'crear_ventas', 'ver_detalle_ventas',
         'ver_clientes', 'crear_clientes', 'editar_clientes',
-    ]
-    for codigo in codigos_ventas:
-        permiso = Permiso.objects.get(codigo=codigo)
-        RolPermiso.objects.get_or_create(rol=rol_ventas, permiso=permiso)
-    print("  ✓ Ventas: permisos asignados")
-except RolUsuario.DoesNotExist:
-    print("  ⚠ Rol 'ventas' no existe")
-
-# CAJA
-try:
-    rol_caja = RolUsuario.objects.get(tipo='caja')
-    codigos_caja = [
+    ],
+
+    # CAJA
+    'caja': [
         'ver_dashboard',
         'ver_productos',
         'ver_ventas', 'crear_ventas', 'ver_detalle_ventas',
         'ver_clientes', 'crear_clientes'
-    ]
-    for codigo in codigos_caja:
-        permiso = Permiso.objects.get(codigo=codigo)
-        RolPermiso.objects.get_or_create(rol=rol_caja, permiso=permiso)
-    print("  ✓ Caja: permisos asignados")
-except RolUsuario.DoesNotExist:
-    print("  ⚠ Rol 'caja' no existe")
+    ],
+}
+
+roles_existentes = set(RolUsuario.objects.filter(
+    tipo__in=permisos_por_rol
+).values_list('tipo', flat=True))
+
+for tipo in permisos_por_rol:
+    if tipo not in roles_existentes:
+        print(f"  ⚠ Rol '{tipo}' no existe")
+
+# Todas las asignaciones en una operación (cantidad fija de consultas)
+resultado = aplicar_cambios_permisos(agregar={
+    tipo: codigos for tipo, codigos in permisos_por_rol.items() if tipo in roles_existentes
+})
+
+for tipo in permisos_por_rol:
+    if tipo in roles_existentes:
+        print(f"  ✓ {tipo.capitalize()}: permisos asignados")
+print(f"  ({resultado['agregados']} asignaciones nuevas)")
 
 print("\n=== COMPLETADO ===\n")
@@ -0,0 +1,136 @@
+# motoshop_django/base_datos.py
+"""
+Perfiles de base de datos. settings.py elige uno con la variable de entorno
+MOTOSHOP_DB (por defecto 'sqlite'):
+
+- sqlite: WAL, synchronous=NORMAL, busy_timeout, mmap y caché en cada conexión,
+  para que la escritura de una venta no bloquee a los demás cajeros.
+- sqlite_basico: SQLite con la configuración de fábrica (sólo para comparar).
+- postgres: conexiones persistentes (CONN_MAX_AGE) con verificación de salud.
+- postgres_pool: pool de conexiones de psycopg 3 (Django 5.1 o superior,
+  requiere `psycopg[pool]`).
+
+Los datos de PostgreSQL se leen de MOTOSHOP_DB_NOMBRE, MOTOSHOP_DB_USUARIO,
+MOTOSHOP_DB_CLAVE, MOTOSHOP_DB_HOST y MOTOSHOP_DB_PUERTO.
+
+MOTOSHOP_DB_REPLICA agrega una réplica de sólo lectura con el mismo perfil
+(ver replicas.py): el host de la réplica en PostgreSQL, o la ruta de una copia
+del archivo en SQLite (sólo para pruebas).
+
+En PostgreSQL los códigos (apps/ventas/secuencias.py) se reservan en una
+conexión propia, fuera de la transacción de la venta (secuencias_base_datos).
+"""
+
+import os
+
+import django
+from django.db.backends.signals import connection_created
+
+
+PERFILES = ('sqlite', 'sqlite_basico', 'postgres', 'postgres_pool')
+
+# Se aplican en cada conexión nueva (ver aplicar_pragmas)
+PRAGMAS_SQLITE = {
+    'journal_mode': 'WAL',         # los lectores no esperan al que escribe
+    'synchronous': 'NORMAL',       # con WAL sigue siendo seguro ante cortes de la aplicación
+    'busy_timeout': 5000,          # ms que se espera un bloqueo antes de fallar
+    'mmap_size': 256 * 1024 * 1024,
+    'cache_size': -64 * 1024,      # negativo = KiB (64 MB)
+}
+
+
+def _entero(variable, defecto):
+    return int(os.environ.get(variable) or defecto)
+
+
+def perfil_base_datos(perfil, base_dir):
+    """Devuelve la configuración de DATABASES['default'] para el perfil"""
+    if perfil not in PERFILES:
+        raise ValueError(f'Perfil de base de datos desconocido: {perfil} (opciones: {", ".join(PERFILES)})')
+
+    if perfil.startswith('sqlite'):
+        configuracion = {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.environ.get('MOTOSHOP_DB_NOMBRE') or base_dir / 'db.sqlite3',
+        }
+        if perfil == 'sqlite':
+            configuracion['PRAGMAS'] = dict(PRAGMAS_SQLITE)
+            if django.VERSION >= (5, 1):
+                # BEGIN IMMEDIATE: la transacción toma el lock de escritura al empezar,
+                # así espera busy_timeout en vez de fallar al pasar de lectura a escritura
+                configuracion['OPTIONS'] = {'transaction_mode': 'IMMEDIATE'}
+        return configuracion
+
+    configuracion = {
+        'ENGINE': 'django.db.backends.postgresql',
+        'NAME': os.environ.get('MOTOSHOP_DB_NOMBRE', 'motoshop'),
+        'USER': os.environ.get('MOTOSHOP_DB_USUARIO', 'motoshop'),
+        'PASSWORD': os.environ.get('MOTOSHOP_DB_CLAVE', ''),
+        'HOST': os.environ.get('MOTOSHOP_DB_HOST', 'localhost'),
+        'PORT': os.environ.get('MOTOSHOP_DB_PUERTO', '5432'),
+    }
+    if perfil == 'postgres':
+        # Una conexión por proceso/hilo que se reutiliza entre pedidos
+        configuracion['CONN_MAX_AGE'] = _entero('MOTOSHOP_DB_CONEXION_SEGUNDOS', 60)
+        configuracion['CONN_HEALTH_CHECKS'] = True
+    else:
+        if django.VERSION < (5, 1):
+            raise ValueError('El perfil postgres_pool requiere Django 5.1 o superior')
+        # El pool ya reutiliza conexiones: Django exige CONN_MAX_AGE = 0
+        configuracion['OPTIONS'] = {
+            'pool': {
+                'min_size': _entero('MOTOSHOP_DB_POOL_MIN', 2),
+                'max_size': _entero('MOTOSHOP_DB_POOL_MAX', 10),
+                'timeout': _entero('MOTOSHOP_DB_POOL_ESPERA', 10),
+            },
+        }
+    return configuracion
+
+
+def replica_base_datos(perfil, base_dir):
+    """Configuración de la réplica de sólo lectura, o None si no hay MOTOSHOP_DB_REPLICA"""
+    replica = os.environ.get('MOTOSHOP_DB_REPLICA')
+    if not replica:
+        return None
+
+    configuracion = perfil_base_datos(perfil, base_dir)
+    if perfil.startswith('sqlite'):
+        configuracion['NAME'] = replica
+        configuracion['PRAGMAS'] = {**configuracion.get('PRAGMAS', {}), 'query_only': 'ON'}
+    else:
+        configuracion['HOST'] = replica
+        opciones = configuracion.setdefault('OPTIONS', {})
+        opciones['options'] = '-c default_transaction_read_only=on'
+    return configuracion
+
+
+def secuencias_base_datos(perfil, base_dir):
+    """
+    Conexión aparte para reservar códigos, o None para usar 'default'.
+    La reserva se confirma en el acto y la fila de la secuencia no queda
+    bloqueada durante la transacción de la venta. En SQLite no aplica: una
+    segunda conexión no puede escribir mientras la venta tiene el archivo
+    bloqueado, así que ahí la reserva va dentro de la transacción.
+    """
+    if perfil.startswith('sqlite'):
+        return None
+
+    configuracion = perfil_base_datos(perfil, base_dir)
+    # En los tests usa la misma base de prueba que 'default'
+    configuracion['TEST'] = {'MIRROR': 'default'}
+    return configuracion
+
+
+def aplicar_pragmas(sender, connection, **kwargs):
+    """Ejecuta los PRAGMA del perfil (clave PRAGMAS de la base) en cada conexión SQLite"""
+    if connection.vendor != 'sqlite':
+        return
+    pragmas = connection.settings_dict.get('PRAGMAS')
+    if not pragmas:
+        return
+    with connection.cursor() as cursor:
+        for nombre, valor in pragmas.items():
+            cursor.execute(f'PRAGMA {nombre} = {valor}')
+
+
+connection_created.connect(aplicar_pragmas, dispatch_uid='motoshop_pragmas_sqlite')
@@ -0,0 +1,128 @@
+# motoshop_django/replicas.py
+"""
+Lecturas de reportes y exportaciones en una réplica de sólo lectura, para que
+las consultas largas no compitan con las ventas en la base principal.
+
+- @usar_replica en una vista (o `with en_replica():` en código fuera de una
+  vista) manda sus lecturas a la base REPLICA_ALIAS. Sin réplica configurada
+  todo sigue yendo a 'default'.
+- Lo que se escribe dentro del bloque se vuelve a leer de 'default' (cada
+  modelo escrito queda "pegado" a la principal hasta el final del bloque).
+- ReplicaMiddleware marca con una cookie al usuario que acaba de escribir
+  (POST, PUT, ...); durante REPLICA_PEGAJOSA_SEGUNDOS sus vistas leen de la
+  principal, para que vea sus propios cambios aunque la réplica esté atrasada.
+"""
+
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+
+COOKIE_ESCRITURA = 'motoshop_escritura'
+METODOS_LECTURA = ('GET', 'HEAD', 'OPTIONS')
+
+# None fuera de un bloque en_replica; adentro, los modelos escritos en el bloque
+_modelos_escritos = ContextVar('modelos_escritos', default=None)
+
+
+def alias_replica():
+    return getattr(settings, 'REPLICA_ALIAS', 'replica')
+
+
+def replica_configurada():
+    return alias_replica() in settings.DATABASES
+
+
+@contextmanager
+def en_replica():
+    """Las lecturas del bloque van a la réplica (si hay una)"""
+    token = _modelos_escritos.set(set())
+    try:
+        yield
+    finally:
+        _modelos_escritos.reset(token)
+
+
+def _iterar_en_replica(contenido):
+    """
+    Las respuestas en streaming consultan la base después de que la vista
+    terminó. El contexto se abre en cada bloque porque el servidor puede
+    pedir cada uno desde un contexto distinto (ASGI).
+    """
+    iterador = iter(contenido)
+    while True:
+        with en_replica():
+            try:
+                bloque = next(iterador)
+            except StopIteration:
+                return
+        yield bloque
+
+
+def usar_replica(vista):
+    """
+    Decorador para vistas de sólo lectura (reportes, exportaciones, listados
+    de auditoría). Los pedidos que no son de lectura y los de usuarios que
+    escribieron hace poco se quedan en la base principal.
+    """
+    @wraps(vista)
+    def envoltura(request, *args, **kwargs):
+        if request.method not in METODOS_LECTURA or COOKIE_ESCRITURA in request.COOKIES:
+            return vista(request, *args, **kwargs)
+
+        with en_replica():
+            respuesta = vista(request, *args, **kwargs)
+
+        if getattr(respuesta, 'streaming', False):
+            respuesta.streaming_content = _iterar_en_replica(respuesta.streaming_content)
+        return respuesta
+    return envoltura
+
+
+class RouterReplica:
+    """Router de DATABASE_ROUTERS: lee de la réplica sólo dentro de en_replica()"""
+
+    def db_for_read(self, model, **hints):
+        escritos = _modelos_escritos.get()
+        if escritos is None or not replica_configurada():
+            return None
+        # Dentro de una transacción se lee lo que ella misma escribió
+        if model._meta.label in escritos or connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        return alias_replica()
+
+    def db_for_write(self, model, **hints):
+        escritos = _modelos_escritos.get()
+        if escritos is not None:
+            escritos.add(model._meta.label)
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Son los mismos datos, la réplica sólo está atrasada
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # La réplica recibe el esquema por replicación (o es una copia de la principal)
+        if db == alias_replica():
+            return False
+        return None
+
+
+class ReplicaMiddleware:
+    """Marca por unos segundos a quien acaba de escribir (ver usar_replica)"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        if request.method not in METODOS_LECTURA and replica_configurada():
+            response.set_cookie(
+                COOKIE_ESCRITURA, '1',
+                max_age=getattr(settings, 'REPLICA_PEGAJOSA_SEGUNDOS', 10),
+                httponly=True, samesite='Lax',
+            )
+        return response
@@ -5,6 +5,8 @@ Django settings for motoshop_django project.
 from pathlib import Path
 import os
 
+from .base_datos import perfil_base_datos, replica_base_datos, secuencias_base_datos
+
 BASE_DIR = Path(__file__).resolve().parent.parent
 
 SECRET_KEY = 'django-insecure-change-this-in-production-12345'
@@ -29,13 +31,16 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'apps.reportes.diagnostico.PerfilConsultasMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'apps.usuarios.permisos.PermisosMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'motoshop_django.replicas.ReplicaMiddleware',
 ]
 
 ROOT_URLCONF = 'motoshop_django.urls'
@@ -58,13 +63,31 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'motoshop_django.wsgi.application'
 
+# Perfil de base de datos según MOTOSHOP_DB: sqlite (WAL), sqlite_basico,
+# postgres o postgres_pool (ver motoshop_django/base_datos.py)
+PERFIL_DB = os.environ.get('MOTOSHOP_DB', 'sqlite')
+
 DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
-    }
+    'default': perfil_base_datos(PERFIL_DB, BASE_DIR),
 }
 
+# Réplica de sólo lectura para reportes y exportaciones (MOTOSHOP_DB_REPLICA,
+# ver motoshop_django/replicas.py). Sin réplica todo se lee de 'default'.
+REPLICA_ALIAS = 'replica'
+replica = replica_base_datos(PERFIL_DB, BASE_DIR)
+if replica:
+    DATABASES[REPLICA_ALIAS] = replica
+DATABASE_ROUTERS = ['motoshop_django.replicas.RouterReplica']
+# Segundos que quien escribió lee de la principal, aunque la vista use la réplica
+REPLICA_PEGAJOSA_SEGUNDOS = 10
+
+# Conexión propia para reservar códigos de venta/ticket fuera de la transacción
+# de la venta (sólo PostgreSQL, ver apps/ventas/secuencias.py)
+SECUENCIAS_ALIAS = 'secuencias'
+secuencias = secuencias_base_datos(PERFIL_DB, BASE_DIR)
+if secuencias:
+    DATABASES[SECUENCIAS_ALIAS] = secuencias
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
@@ -93,6 +116,46 @@ STATICFILES_DIRS = [BASE_DIR / 'static']
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
+# Caché (en memoria por proceso; con varios procesos conviene Redis/Memcached
+# para que la invalidación llegue a todos)
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'motoshop',
+    }
+}
+
+# Segundos que se cachean las métricas del dashboard
+DASHBOARD_CACHE_SEGUNDOS = 15
+
+# Segundos que cada proceso guarda en memoria los permisos por rol
+# (además de la caché de Django, que se invalida al editar un rol)
+PERMISOS_CACHE_LOCAL_SEGUNDOS = 30
+
+# Trabajos en segundo plano (manage.py run_workers)
+# Carpeta de los archivos generados
+TRABAJOS_DIR = BASE_DIR / 'trabajos'
+# Segundos que se reutiliza el resultado de un pedido con los mismos parámetros
+TRABAJOS_CACHE_SEGUNDOS = 600
+# Horas que se conservan los trabajos terminados y sus archivos
+TRABAJOS_RETENCION_HORAS = 24
+# Un trabajo "procesando" por más de estos segundos se vuelve a encolar
+TRABAJOS_TIMEOUT_SEGUNDOS = 1800
+# Intentos de un trabajo colgado antes de marcarlo con error
+TRABAJOS_MAX_INTENTOS = 3
+
+# Caché en disco de comprobantes PDF (ventas pagadas o anuladas)
+COMPROBANTES_CACHE_DIR = BASE_DIR / 'cache' / 'comprobantes'
+# Tamaño máximo; al pasarse se borran los menos usados
+COMPROBANTES_CACHE_MB = 200
+
+# Perfil de consultas por pedido (apps/reportes/diagnostico.py): fracción de
+# pedidos que se miden, p. ej. 0.01 = 1 %. En 0 el middleware no se carga.
+# Resultados en /diagnostico/queries/ (sólo staff)
+DIAGNOSTICO_MUESTREO = float(os.environ.get('MOTOSHOP_DIAGNOSTICO_MUESTREO') or 0)
+# Horas que se conservan las estadísticas en la caché
+DIAGNOSTICO_RETENCION_HORAS = 24
+
 LOGIN_URL = '/usuarios/login/'
 LOGIN_REDIRECT_URL = '/dashboard/'
 LOGOUT_REDIRECT_URL = '/usuarios/login/'
\ No newline at end of file
@@ -0,0 +1,133 @@
+# motoshop_django/tests.py
+
+import os
+import sqlite3
+import tempfile
+from decimal import Decimal
+from pathlib import Path
+from unittest import mock, skipUnless
+
+from django.conf import settings
+from django.db import OperationalError, connections, transaction
+from django.http import HttpResponse
+from django.test import RequestFactory, TransactionTestCase
+
+from apps.inventario.models import Categoria, Producto
+from .base_datos import replica_base_datos
+from .replicas import COOKIE_ESCRITURA, ReplicaMiddleware, alias_replica, en_replica, usar_replica
+
+
+def _crear_producto(codigo):
+    return Producto.objects.create(
+        codigo=codigo, descripcion=f'Producto {codigo}',
+        precio_costo=Decimal('100.00'), precio_venta=Decimal('150.00'),
+    )
+
+
+@usar_replica
+def _vista_productos(request):
+    return HttpResponse(str(Producto.objects.count()))
+
+
+@skipUnless(connections['default'].vendor == 'sqlite', 'La réplica de prueba es una copia del archivo SQLite')
+class ReplicaTest(TransactionTestCase):
+    """
+    La réplica es un segundo archivo SQLite con la configuración real
+    (replica_base_datos, con query_only). Se agrega en setUpClass y no en
+    la declaración de `databases`: el runner intentaría migrarla y la réplica
+    no acepta escrituras, recibe el esquema copiando la principal (ver
+    replicar). Es TransactionTestCase porque dentro de la transacción de
+    TestCase el router siempre lee de 'default'.
+    """
+
+    alias = alias_replica()
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        directorio = tempfile.TemporaryDirectory()
+        cls.addClassCleanup(directorio.cleanup)
+        cls.ruta = str(Path(directorio.name) / 'replica.sqlite3')
+        sqlite3.connect(cls.ruta).close()
+
+        with mock.patch.dict(os.environ, {'MOTOSHOP_DB_REPLICA': cls.ruta}):
+            configuracion = replica_base_datos('sqlite', settings.BASE_DIR)
+        # connections.settings es settings.DATABASES: replica_configurada() la ve.
+        # configure_settings completa las claves por defecto (exige una 'default')
+        connections.settings[cls.alias] = connections.configure_settings({'default': configuracion})['default']
+        cls.addClassCleanup(cls._quitar_replica)
+        cls.databases = frozenset({*cls.databases, cls.alias})
+
+    @classmethod
+    def _databases_names(cls, include_mirrors=True):
+        # La réplica no se vacía entre tests (flush escribe): replicar() la reemplaza entera
+        return [alias for alias in super()._databases_names(include_mirrors) if alias != cls.alias]
+
+    @classmethod
+    def _quitar_replica(cls):
+        connections[cls.alias].close()
+        del connections[cls.alias]
+        del connections.settings[cls.alias]
+
+    def replicar(self):
+        """Copia la principal a la réplica: lo que se escriba después queda "atrasado"."""
+        connections[self.alias].close()
+        connections['default'].ensure_connection()
+        destino = sqlite3.connect(self.ruta)
+        try:
+            connections['default'].connection.backup(destino)
+        finally:
+            destino.close()
+
+    def test_lecturas_en_replica(self):
+        _crear_producto(1)
+        self.replicar()
+        _crear_producto(2)
+
+        with en_replica():
+            self.assertEqual(Producto.objects.count(), 1)
+        self.assertEqual(Producto.objects.count(), 2)
+
+    def test_modelo_escrito_se_lee_de_la_principal(self):
+        Categoria.objects.create(nombre='Cascos')
+        self.replicar()
+        Categoria.objects.create(nombre='Cubiertas')
+
+        with en_replica():
+            _crear_producto(1)
+            self.assertEqual(Producto.objects.count(), 1)
+            # Los modelos que no se escribieron siguen en la réplica
+            self.assertEqual(Categoria.objects.count(), 1)
+
+    def test_lecturas_en_transaccion_van_a_la_principal(self):
+        self.replicar()
+        _crear_producto(1)
+
+        with en_replica(), transaction.atomic():
+            self.assertEqual(Producto.objects.count(), 1)
+
+    def test_cookie_de_escritura_lee_de_la_principal(self):
+        self.replicar()
+        _crear_producto(1)
+        fabrica = RequestFactory()
+
+        self.assertEqual(_vista_productos(fabrica.get('/')).content, b'0')
+
+        pedido = fabrica.get('/')
+        pedido.COOKIES[COOKIE_ESCRITURA] = '1'
+        self.assertEqual(_vista_productos(pedido).content, b'1')
+
+    def test_middleware_marca_solo_las_escrituras(self):
+        middleware = ReplicaMiddleware(lambda request: HttpResponse())
+        fabrica = RequestFactory()
+
+        self.assertIn(COOKIE_ESCRITURA, middleware(fabrica.post('/')).cookies)
+        self.assertNotIn(COOKIE_ESCRITURA, middleware(fabrica.get('/')).cookies)
+
+    def test_replica_rechaza_escrituras(self):
+        self.replicar()
+
+        with self.assertRaisesMessage(OperationalError, 'readonly'):
+            Producto.objects.using(self.alias).create(
+                codigo=1, precio_costo=Decimal('100.00'), precio_venta=Decimal('150.00')
+            )
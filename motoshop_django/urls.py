@@ -4,13 +4,13 @@ URL Configuration for motoshop_django project.
 from django.contrib import admin
 from django.urls import path, include
 from django.shortcuts import redirect
-from django.contrib.auth.decorators import login_required
-from django.views.generic import TemplateView
+from apps.reportes.views import dashboard, diagnostico_consultas
 
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('', lambda request: redirect('dashboard')),
-    path('dashboard/', login_required(TemplateView.as_view(template_name='dashboard.html')), name='dashboard'),
+    path('dashboard/', dashboard, name='dashboard'),
+    path('diagnostico/queries/', diagnostico_consultas, name='diagnostico_consultas'),
     
     # Apps
     path('inventario/', include('apps.inventario.urls')),
@@ -0,0 +1,70 @@
+// ================================================
+// TRABAJOS EN SEGUNDO PLANO - JAVASCRIPT
+// ================================================
+// Uso: <a href="(exportación directa)" data-tipo-trabajo="ventas_excel"
+//         data-url-trabajo="{% url 'encolar_trabajo' %}"
+//         onclick="return exportarEnSegundoPlano(this)">
+// Los parámetros del href se envían al trabajo; si algo falla se sigue el enlace.
+
+const INTERVALO_SONDEO = 1500;
+
+function exportarEnSegundoPlano(enlace) {
+    const datos = new FormData();
+    datos.append('tipo', enlace.dataset.tipoTrabajo);
+    new URL(enlace.href, window.location.origin).searchParams.forEach((valor, clave) => {
+        datos.append(clave, valor);
+    });
+
+    const textoOriginal = enlace.innerHTML;
+    enlace.classList.add('disabled');
+    enlace.innerHTML = '<i class="bi bi-hourglass-split"></i> En cola...';
+
+    const restaurar = () => {
+        enlace.classList.remove('disabled');
+        enlace.innerHTML = textoOriginal;
+    };
+
+    fetch(enlace.dataset.urlTrabajo, {
+        method: 'POST',
+        headers: { 'X-CSRFToken': obtenerCookie('csrftoken') },
+        body: datos
+    })
+    .then(response => response.json())
+    .then(trabajo => {
+        if (!trabajo.success) {
+            throw new Error(trabajo.error);
+        }
+        sondearTrabajo(trabajo.url_estado, trabajo.url_descarga, enlace, restaurar);
+    })
+    .catch(error => {
+        restaurar();
+        alert('No se pudo generar la exportación: ' + error.message);
+    });
+
+    return false;
+}
+
+function sondearTrabajo(urlEstado, urlDescarga, enlace, restaurar) {
+    fetch(urlEstado)
+    .then(response => response.json())
+    .then(trabajo => {
+        if (trabajo.listo) {
+            restaurar();
+            window.location = urlDescarga;
+        } else if (trabajo.estado === 'error') {
+            restaurar();
+            alert('Error al generar la exportación: ' + trabajo.error);
+        } else {
+            enlace.innerHTML = `<i class="bi bi-hourglass-split"></i> Generando... ${trabajo.progreso}%`;
+            setTimeout(() => sondearTrabajo(urlEstado, urlDescarga, enlace, restaurar), INTERVALO_SONDEO);
+        }
+    })
+    .catch(() => setTimeout(() => sondearTrabajo(urlEstado, urlDescarga, enlace, restaurar), INTERVALO_SONDEO));
+}
+
+function obtenerCookie(nombre) {
+    const cookie = document.cookie.split(';')
+        .map(c => c.trim())
+        .find(c => c.startsWith(nombre + '='));
+    return cookie ? decodeURIComponent(cookie.substring(nombre.length + 1)) : null;
+}